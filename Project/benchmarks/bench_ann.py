@@ -0,0 +1,80 @@
+"""
+Recall@k and query latency of each ANN index type against the exact flat baseline.
+
+Vectors come from the saved faiss_index (any type that supports reconstruct,
+i.e. a flat index) or, with --synthetic N, from N clustered random unit vectors.
+Queries are perturbed corpus vectors.
+
+Usage (from Project/):
+    python -m benchmarks.bench_ann                       # use ./faiss_index
+    python -m benchmarks.bench_ann --synthetic 50000 --k 5
+"""
+import argparse
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from smart_contract_assistant.config import FAISS_DIR, TOP_K
+from smart_contract_assistant.src.ann_index import INDEX_TYPES, create_faiss_index
+
+
+def _synthetic(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _from_index(path):
+    index = faiss.read_index(f"{path}/index.faiss")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of the saved index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES))
+    args = parser.parse_args()
+
+    vectors = _synthetic(args.synthetic, args.dim) if args.synthetic else _from_index(FAISS_DIR)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    truth = None
+    print(f"\n{len(vectors)} vectors, dim {vectors.shape[1]}, {args.queries} queries, k={args.k}")
+    print(f"{'type':<6} {'build (s)':>9} {'size (MB)':>9} {f'recall@{args.k}':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch QPS':>10}")
+    for index_type in ["flat"] + [t for t in args.types if t != "flat"]:
+        start = time.perf_counter()
+        index = create_faiss_index(vectors.shape[1], index_type, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.search(q[None, :], args.k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        start = time.perf_counter()
+        _, ids = index.search(queries, args.k)
+        qps = len(queries) / (time.perf_counter() - start)
+
+        if truth is None:
+            truth = ids
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ids, truth)])
+        latencies.sort()
+        print(
+            f"{index_type:<6} {build:>9.2f} {size_mb:>9.1f} {recall:>9.3f} "
+            f"{statistics.median(latencies):>9.3f} {latencies[int(0.99 * (len(latencies) - 1))]:>9.3f} {qps:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
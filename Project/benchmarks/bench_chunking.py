@@ -0,0 +1,153 @@
+"""
+Index size and ingest cost: plain character chunking vs structure-aware
+chunking, with and without near-duplicate elimination.
+
+Each configuration ingests the same files into a fresh index:
+
+  plain              : each page character-split, DEDUP_THRESHOLD = 0
+  structured         : STRUCTURED_CHUNKING, DEDUP_THRESHOLD = 0
+  structured + dedup : STRUCTURED_CHUNKING, DEDUP_THRESHOLD = --threshold
+                       (default: the configured one; 1.0 = identical text only)
+
+and reports the chunks produced, the chunks embedded, the time spent
+chunking and embedding + indexing, and the index size on disk. Vectors come
+from the raw encoder (no embedding cache), or with --fake-embeddings from a
+deterministic stand-in (sizes and counts only).
+
+Without paths, a synthetic corpus of --contracts DOCX contracts is generated:
+standard definitions and boilerplate clauses shared across contracts with
+small edits (party names, dates), contract-specific clauses and a fee table.
+
+Usage (from Project/):
+    python -m benchmarks.bench_chunking path/to/contracts/ --fake-embeddings
+    python -m benchmarks.bench_chunking --contracts 40 --threshold 0.8
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import smart_contract_assistant.src.vector_store as vector_store_module
+from smart_contract_assistant.src.ingestion import iter_documents
+from smart_contract_assistant.src.vector_store import IndexManager
+
+BOILERPLATE = {
+    "1. Definitions": [
+        '"Agreement" means this agreement between {customer} and {supplier}, including its Schedules.',
+        '"Confidential Information" means all information disclosed by a party that is marked confidential '
+        "or would reasonably be regarded as confidential, excluding information that is publicly available.",
+        '"Business Day" means a day other than a Saturday, Sunday or public holiday in the place of performance.',
+        '"Intellectual Property Rights" means patents, copyright, trade marks, database rights and all similar '
+        "rights in any part of the world, whether registered or not.",
+    ],
+    "Force Majeure": [
+        "Neither party shall be liable for any failure or delay in performing its obligations under this "
+        "Agreement caused by events beyond its reasonable control, including acts of God, war, strike, flood, "
+        "fire or epidemic. The affected party shall notify the other party without undue delay and use "
+        "reasonable endeavours to mitigate the effect of the event.",
+    ],
+    "Confidentiality": [
+        "Each party shall keep the other party's Confidential Information confidential and shall not use it "
+        "except to perform this Agreement. These obligations survive termination for five years.",
+    ],
+    "Governing Law": [
+        "This Agreement is governed by the laws of {law}, and the courts of {law} have exclusive jurisdiction "
+        "over any dispute arising out of or in connection with it.",
+    ],
+}
+SPECIFIC = [
+    "The Supplier shall deliver the {item} to the Customer's site in {city} within {days} days of the order.",
+    "The Customer shall pay each invoice within {days} days of receipt. Late payments bear interest at {rate}% per year.",
+    "Either party may terminate this Agreement on {days} days' written notice if the other party commits a material breach.",
+    "The Supplier's aggregate liability is limited to {rate} times the fees paid in the preceding twelve months.",
+    "The Supplier shall maintain insurance cover of at least {amount} USD with a reputable insurer.",
+]
+
+
+def _synthetic_corpus(out_dir: str, contracts: int, seed: int = 0) -> list:
+    import docx
+
+    rng, paths = random.Random(seed), []
+    for n in range(contracts):
+        values = {
+            "customer": f"Customer {n} Ltd", "supplier": rng.choice(["Acme Corp", "Globex Inc", "Initech LLC"]),
+            "law": rng.choice(["England and Wales", "New York", "Ontario"]), "item": rng.choice(["servers", "licences", "parts"]),
+            "city": rng.choice(["Leeds", "Austin", "Toronto"]), "days": rng.choice([14, 30, 45, 60, 90]),
+            "rate": rng.choice([2, 3, 5]), "amount": rng.choice([1, 2, 5]) * 1_000_000,
+        }
+        document = docx.Document()
+        document.add_heading(f"MASTER SERVICES AGREEMENT No. {n}", level=0)
+        for heading, clauses in BOILERPLATE.items():
+            document.add_heading(heading, level=1)
+            for clause in clauses:
+                document.add_paragraph(clause.format(**values))
+        document.add_heading("Commercial Terms", level=1)
+        for clause in rng.sample(SPECIFIC, 4):
+            document.add_paragraph(f"{clause.format(**values)} This applies to order {n}-{rng.randint(100, 999)}.")
+        table = document.add_table(rows=1, cols=3)
+        for cell, text in zip(table.rows[0].cells, ("Service", "Fee (USD)", "Billing")):
+            cell.text = text
+        for i in range(rng.randint(10, 40)):
+            for cell, text in zip(table.add_row().cells, (f"Service {i}", str(rng.randint(1, 90) * 100), "monthly")):
+                cell.text = text
+        path = os.path.join(out_dir, f"contract_{n:03d}.docx")
+        document.save(path)
+        paths.append(path)
+    return paths
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _run(paths: list, structured: bool, threshold: float, index_dir: str) -> dict:
+    vector_store_module.DEDUP_THRESHOLD = threshold
+    start  = time.perf_counter()
+    docs   = list(iter_documents(paths, structured=structured))
+    chunk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = IndexManager(index_dir).upsert(docs)
+    return {
+        "chunks":   len(docs),
+        "embedded": stats["added"],
+        "chunk_s":  chunk_s,
+        "index_s":  time.perf_counter() - start,
+        "bytes":    _dir_bytes(index_dir),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="PDF/DOCX files or directories (default: synthetic corpus)")
+    parser.add_argument("--contracts", type=int, default=40, help="synthetic contracts generated")
+    parser.add_argument("--threshold", type=float, default=vector_store_module.DEDUP_THRESHOLD)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        model = DeterministicFakeEmbedding(size=384)
+    else:
+        model = vector_store_module.load_embedding_model()
+    vector_store_module.get_embeddings = lambda: model   # raw encoder: no cache hits between runs
+
+    threshold = args.threshold
+    configs   = [("plain", False, 0.0), ("structured", True, 0.0), ("structured + dedup", True, threshold)]
+    with tempfile.TemporaryDirectory() as workdir:
+        paths   = args.paths or _synthetic_corpus(workdir, args.contracts)
+        results = [(name, _run(paths, structured, t, os.path.join(workdir, f"index-{n}")))
+                   for n, (name, structured, t) in enumerate(configs)]
+
+    base = results[0][1]
+    print(f"\n{len(paths) if not args.paths else ' '.join(args.paths)}"
+          f"{' synthetic contracts' if not args.paths else ''}, dedup threshold {threshold}")
+    print(f"{'config':<20} {'chunks':>7} {'embedded':>9} {'chunk (s)':>9} {'embed+index (s)':>15} {'index (KB)':>10} {'vs plain':>8}")
+    for name, r in results:
+        print(f"{name:<20} {r['chunks']:>7} {r['embedded']:>9} {r['chunk_s']:>9.2f} {r['index_s']:>15.2f} "
+              f"{r['bytes'] / 1024:>10.0f} {r['bytes'] / max(base['bytes'], 1):>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Prompt context size: format_docs (one block per chunk) vs pack_context.
+
+A synthetic contract of work orders, each spanning a few chunks, is split
+with the ingestion splitter settings (CHUNK_SIZE / CHUNK_OVERLAP). Each
+question is about one work order and retrieves its top k chunks with BM25 (no
+embedding model needed), so neighbouring chunks, whose CHUNK_OVERLAP
+characters format_docs repeats, come back together as they do in practice.
+
+Reports, per k: mean prompt-context tokens before/after packing, tokens saved,
+passages per request and packing time; then, for each --budgets value, how
+many chunks had to be dropped or truncated to fit.
+
+Usage (from Project/):
+    python -m benchmarks.bench_context --queries 500 --budgets 500 1000 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from smart_contract_assistant.config import CHUNK_SIZE, CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET
+from smart_contract_assistant.src.context_packer import format_docs, pack_context
+from smart_contract_assistant.src.lexical_index import BM25Index
+from smart_contract_assistant.src.tokens import count_tokens
+
+CLAUSES = [
+    "Under {wo} the Supplier shall deliver the Services in accordance with the Service Levels set out in Schedule {n}.",
+    "Invoices under {wo} are payable within {d} days of receipt, and late payments accrue interest at {p} percent per annum.",
+    "Either party may terminate {wo} on {d} days written notice if the other party commits a material breach.",
+    "The Customer shall keep all Confidential Information disclosed under {wo} secret.",
+    "The aggregate liability of each party under {wo} shall not exceed {p} times the Charges paid in the preceding twelve months.",
+    "For {wo} the Supplier shall maintain professional indemnity insurance of not less than EUR {n} million per claim.",
+    "No party may assign or subcontract {wo} without the prior written consent of the other party.",
+    "Any dispute about {wo} shall first be referred to the Steering Committee, which shall meet within {d} days.",
+]
+TOPICS = ["service levels", "invoices", "termination", "confidential information", "liability", "insurance",
+          "subcontracting", "disputes"]
+
+
+def _document(sections, rng):
+    paragraphs = []
+    for s in range(1, sections + 1):
+        sentences = [rng.choice(CLAUSES).format(wo=f"Work Order WO-{s}", n=rng.randint(1, 9), d=rng.randint(5, 90),
+                                                p=rng.randint(2, 12))
+                     for _ in range(rng.randint(10, 40))]
+        paragraphs.append(f"{s}. Work Order WO-{s}. " + " ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[500, 1000, CONTEXT_TOKEN_BUDGET])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    text = _document(args.sections, rng)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=["\n\n", "\n", ".", " ", ""],
+    )
+    docs = [Document(page_content=c, metadata={"source": "contract.pdf", "chunk_index": i})
+            for i, c in enumerate(splitter.split_text(text))]
+    index = BM25Index()
+    index.add([str(i) for i in range(len(docs))], [d.page_content for d in docs])
+
+    queries = [f"What does Work Order WO-{rng.randint(1, args.sections)} say about {rng.choice(TOPICS)}?"
+               for _ in range(args.queries)]
+
+    print(f"\n{len(docs)} chunks of {CHUNK_SIZE} chars ({CHUNK_OVERLAP} overlap), {len(queries)} queries")
+    print(f"{'k':>3} {'raw tokens':>11} {'packed':>7} {'saved':>7} {'passages':>9} {'pack (us)':>10}")
+    for k in args.k:
+        hits = [[docs[int(i)] for i, _ in index.search(q, k)] for q in queries]
+        raw, packed, passages, times = [], [], [], []
+        for retrieved in hits:
+            start = time.perf_counter()
+            stats = pack_context(retrieved, budget=10 ** 9)["stats"]
+            times.append((time.perf_counter() - start) * 1e6)
+            raw.append(count_tokens(format_docs(retrieved)))
+            packed.append(stats["tokens"])
+            passages.append(stats["passages"])
+        saved = 1 - sum(packed) / sum(raw)
+        print(f"{k:>3} {statistics.mean(raw):>11.0f} {statistics.mean(packed):>7.0f} {saved:>7.1%} "
+              f"{statistics.mean(passages):>9.2f} {statistics.median(times):>10.0f}")
+
+    k = max(args.k)
+    hits = [[docs[int(i)] for i, _ in index.search(q, k)] for q in queries]
+    print(f"\nk={k} under a token budget")
+    print(f"{'budget':>7} {'mean tokens':>12} {'max tokens':>11} {'chunks dropped':>15} {'truncated':>10}")
+    for budget in args.budgets:
+        stats = [pack_context(retrieved, budget)["stats"] for retrieved in hits]
+        print(f"{budget:>7} {statistics.mean(s['tokens'] for s in stats):>12.0f} {max(s['tokens'] for s in stats):>11} "
+              f"{sum(s['dropped'] for s in stats) / sum(s['chunks'] for s in stats):>15.1%} "
+              f"{sum(s['truncated'] for s in stats):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+CPU embedding throughput (chunks/sec) across batch sizes and torch thread counts.
+
+Encodes the same chunks with the raw HuggingFace model (bypassing the
+embedding cache) through vector_store.embed_batches.
+
+Usage (from Project/):
+    python -m benchmarks.bench_embedding path/to/contract.pdf --batch-sizes 16 32 64 128 --threads 1 2 4
+"""
+import argparse
+import time
+
+from smart_contract_assistant.src.ingestion import iter_documents
+from smart_contract_assistant.src.vector_store import embed_batches, get_embeddings, set_torch_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF/DOCX files or directories")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--encode-threads", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=1000, help="max chunks to encode")
+    args = parser.parse_args()
+
+    texts = [d.page_content for d in iter_documents(args.paths)][:args.limit]
+    model = get_embeddings().underlying
+    model.embed_documents(texts[:8])  # warm-up
+
+    print(f"\n{len(texts)} chunks")
+    print(f"{'torch threads':>13} {'batch size':>10} {'chunks/s':>9}")
+    for threads in args.threads:
+        set_torch_threads(threads)
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            for _ in embed_batches(texts, model, batch_size, args.encode_threads):
+                pass
+            elapsed = time.perf_counter() - start
+            print(f"{threads:>13} {batch_size:>10} {len(texts) / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
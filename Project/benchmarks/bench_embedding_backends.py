@@ -0,0 +1,105 @@
+"""
+CPU embedding backends: torch fp32 vs ONNX fp32 vs ONNX int8.
+
+Each backend runs in its own subprocess (so peak RSS is its own) and encodes
+the same chunks with the raw encoder, bypassing the embedding cache:
+
+  load     : seconds to import and load the model
+  query    : single-query latency p50 / p99 (the request path)
+  batch    : chunks/s through vector_store.embed_batches (the ingest path)
+  peak RSS : the subprocess's max resident set size
+  parity   : cosine to the torch vectors for the same chunks (min / mean)
+
+The ONNX backends need an export first:
+    python -m smart_contract_assistant.src.onnx_embeddings
+
+Usage (from Project/):
+    python -m benchmarks.bench_embedding_backends path/to/contract.pdf --backends torch onnx onnx-int8
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _worker(backend: str, paths: list, limit: int, queries: int, batch_size: int):
+    from smart_contract_assistant.src.ingestion import iter_documents
+    from smart_contract_assistant.src.vector_store import embed_batches, load_embedding_model
+
+    texts = [d.page_content for d in iter_documents(paths)][:limit]
+    start = time.perf_counter()
+    model = load_embedding_model(backend)
+    load_s = time.perf_counter() - start
+    model.embed_documents(texts[:8])  # warm-up
+
+    latencies = []
+    for text in (texts * (queries // max(len(texts), 1) + 1))[:queries]:
+        start = time.perf_counter()
+        model.embed_query(text[:200])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    vectors = []
+    start   = time.perf_counter()
+    for _, batch in embed_batches(texts, model, batch_size):
+        vectors.extend(batch)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "backend":    backend,
+        "chunks":     len(texts),
+        "load_s":     load_s,
+        "query_p50":  statistics.median(latencies),
+        "query_p99":  latencies[int(0.99 * (len(latencies) - 1))],
+        "chunks_s":   len(texts) / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "vectors":    vectors,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF/DOCX files or directories")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--limit", type=int, default=1000, help="max chunks to encode")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return _worker(args.worker, args.paths, args.limit, args.queries, args.batch_size)
+
+    import numpy as np
+    from smart_contract_assistant.src.onnx_embeddings import cosine_agreement
+
+    results = []
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedding_backends", *args.paths, "--worker", backend,
+             "--limit", str(args.limit), "--queries", str(args.queries), "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = next((r["vectors"] for r in results if r["backend"] == "torch"), None)
+    print(f"\n{results[0]['chunks'] if results else 0} chunks, {args.queries} single queries, batch size {args.batch_size}")
+    print(f"{'backend':<10} {'load (s)':>8} {'q p50 (ms)':>10} {'q p99 (ms)':>10} {'chunks/s':>9} "
+          f"{'peak RSS (MB)':>13} {'parity min/mean':>16}")
+    for r in results:
+        parity = "-"
+        if reference is not None and r["backend"] != "torch":
+            agreement = cosine_agreement(np.asarray(r["vectors"]), np.asarray(reference))
+            parity    = f"{agreement['min_cosine']:.4f}/{agreement['mean_cosine']:.4f}"
+        print(f"{r['backend']:<10} {r['load_s']:>8.2f} {r['query_p50']:>10.2f} {r['query_p99']:>10.2f} "
+              f"{r['chunks_s']:>9.1f} {r['peak_rss_mb']:>13.0f} {parity:>16}")
+
+
+if __name__ == "__main__":
+    main()
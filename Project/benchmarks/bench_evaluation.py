@@ -0,0 +1,52 @@
+"""
+Evaluation suite wall time and throughput versus concurrency, against the fake LLM.
+
+Runs --questions labelled questions through evaluation.evaluate (the answer
+cache is disabled so every question reaches the LLM), then once more in
+retrieval-only mode to show the retrieval cache.
+
+Usage (from Project/):
+    python -m benchmarks.bench_evaluation --questions 200 --concurrency 1 8 32
+"""
+import argparse
+
+import smart_contract_assistant.src.rag_chain as rag_chain_module
+from smart_contract_assistant.src.evaluation import evaluate, parse_cases
+from smart_contract_assistant.src.rag_chain import build_rag_chain
+from benchmarks.bench_streaming import _fake_vector_store
+from benchmarks.fake_llm_server import start_fake_llm_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--prefill-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay)
+    rag_chain_module.HF_BASE_URL = base_url
+    rag_chain_module.HF_TOKEN = "fake"
+    rag_chain_module.ANSWER_CACHE_ENABLED = False
+
+    rag_chain, condense_chain, retriever = build_rag_chain(_fake_vector_store())
+    cases = parse_cases([
+        f"What does clause {i % 50} say about term {i}? || bench.pdf#{i % 50}" for i in range(args.questions)
+    ])
+
+    print(f"\n{'mode':<10} {'concurrency':>11} {'wall (s)':>9} {'q/s':>8} {'lat p50':>8} {'lat p99':>8} {'recall@k':>9} {'MRR':>6}")
+    runs = [("rag", n, False) for n in args.concurrency] + [("retrieval", max(args.concurrency), True)]
+    for mode, n, retrieval_only in runs:
+        s = evaluate(cases, rag_chain, condense_chain, retriever, concurrency=n, retrieval_only=retrieval_only)["summary"]
+        print(
+            f"{mode:<10} {n:>11} {s['wall_s']:>9.2f} {s['throughput_qps']:>8.1f} {s['latency_s']['p50']:>8.3f} "
+            f"{s['latency_s']['p99']:>8.3f} {s['recall_at_k']:>9.3f} {s['mrr']:>6.3f}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Retrieval under index hot-swaps: reader threads query the served snapshot
+while a writer upserts new documents, as POST /ingest or the UI would.
+
+Reports queries answered, failed queries, retrieval p50/p99 with and without
+swaps, and publish lag (index saved -> new version served by the watcher).
+
+Usage (from Project/):
+    python -m benchmarks.bench_hot_reload --readers 8 --swaps 10
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.rag_chain as rag_chain_module
+import smart_contract_assistant.src.vector_store as vector_store_module
+from smart_contract_assistant.src.index_service import IndexService
+from smart_contract_assistant.src.vector_store import IndexManager
+
+
+def _docs(source, n):
+    return [
+        Document(page_content=f"{source}: clause {i}. The Supplier shall give {i % 90 + 5} days notice of termination.",
+                 metadata={"source": source, "chunk_index": i})
+        for i in range(n)
+    ]
+
+
+def _read(service, stop, latencies, errors):
+    i = 0
+    while not stop.is_set():
+        snapshot = service.current
+        start = time.perf_counter()
+        try:
+            snapshot["retriever"].invoke(f"termination notice clause {i % 50}")
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            errors.append(1)
+        i += 1
+
+
+def _phase(service, readers, seconds, writer=None):
+    stop, latencies, errors = threading.Event(), [], []
+    threads = [threading.Thread(target=_read, args=(service, stop, latencies, errors)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    if writer:
+        writer()
+    else:
+        time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "queries": len(latencies), "errors": len(errors),
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99": latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--swaps", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks in the initial index")
+    parser.add_argument("--interval", type=float, default=0.2, help="watcher poll interval (s)")
+    parser.add_argument("--fake-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        fake = DeterministicFakeEmbedding(size=384)
+        vector_store_module.get_embeddings = lambda: fake
+
+    rag_chain_module.HF_TOKEN = rag_chain_module.HF_TOKEN or "unused"  # chains are built, but only retrieval runs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = f"{tmp}/faiss_index"
+        manager = IndexManager(index_dir)
+        manager.upsert(_docs("base.pdf", args.chunks))
+        service = IndexService(index_dir, mode="mmap", reload_interval=args.interval, warmup=False)
+        service.start(background=False)
+
+        lags = []
+
+        def writer():
+            for k in range(args.swaps):
+                manager.upsert(_docs(f"upload-{k}.pdf", 50))
+                saved, target = time.perf_counter(), manager.version["version"]
+                while service.current["version"]["version"] < target:
+                    time.sleep(0.005)
+                lags.append((time.perf_counter() - saved) * 1000)
+
+        steady = _phase(service, args.readers, 3.0)
+        swaps  = _phase(service, args.readers, 0, writer)
+        service.stop()
+
+    print(f"\n{args.readers} readers, {args.swaps} swaps, watcher every {args.interval}s")
+    print(f"{'phase':<8} {'queries':>8} {'failed':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for name, r in (("steady", steady), ("swapping", swaps)):
+        print(f"{name:<8} {r['queries']:>8} {r['errors']:>7} {r['p50']:>9.2f} {r['p99']:>9.2f}")
+    print(f"\npublish lag (saved -> served): p50 {statistics.median(lags):.0f} ms, max {max(lags):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
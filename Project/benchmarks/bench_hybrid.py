@@ -0,0 +1,116 @@
+"""
+Recall@k, MRR and latency of dense-only vs hybrid (BM25 + dense, RRF) retrieval.
+
+Builds an index over a synthetic contract whose sections differ mainly in
+clause numbers, party names and amounts: exactly the details questions
+hinge on. Queries cite a clause number or a party; the gold chunk is the one
+that contains it. Uses the configured embedding model; --fake-embeddings
+swaps in a deterministic random embedding for machines without it (the dense
+numbers are then meaningless, but the lexical path and latency are not).
+
+Usage (from Project/):
+    python -m benchmarks.bench_hybrid --sections 60 --queries 200
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.vector_store as vector_store_module
+from smart_contract_assistant.src.rag_chain import build_retriever
+from smart_contract_assistant.src.vector_store import IndexManager
+
+TOPICS = [
+    ("payment", "pay each undisputed invoice"),
+    ("termination", "give written notice of termination"),
+    ("confidentiality", "keep the Confidential Information secret"),
+    ("indemnity", "indemnify the other party against third-party claims"),
+    ("liability", "not be liable for indirect or consequential loss"),
+    ("insurance", "maintain professional indemnity insurance"),
+    ("audit", "allow an audit of its records"),
+    ("subcontracting", "not subcontract without prior written consent"),
+]
+PARTIES = ["Acme Logistics GmbH", "Borealis Freight Ltd", "Cobalt Systems Inc", "Dunmore Holdings plc", "Evergreen Data LLC"]
+
+
+def _corpus(sections, rng):
+    docs, gold = [], []
+    for s in range(1, sections + 1):
+        topic, duty = TOPICS[s % len(TOPICS)]
+        for sub, letter in ((1, "a"), (2, "b"), (3, "c")):
+            clause = f"{s}.{sub}({letter})"
+            party  = rng.choice(PARTIES)
+            text = (
+                f"Section {clause} ({topic.title()}). {party} shall {duty} within {rng.randint(5, 90)} days, "
+                f"subject to a cap of EUR {rng.randint(1, 99) * 1000}. This obligation survives expiry of the Agreement "
+                f"and applies to all Services delivered under Schedule {rng.randint(1, 9)}."
+            )
+            docs.append(Document(page_content=text, metadata={"source": "contract.pdf", "chunk_index": len(docs)}))
+            gold.append((clause, party, topic))
+    return docs, gold
+
+
+def _queries(gold, n, rng):
+    queries = []
+    for _ in range(n):
+        i = rng.randrange(len(gold))
+        clause, party, topic = gold[i]
+        template = rng.choice([
+            "What does Section {clause} require?",
+            "Summarize clause {clause} on {topic}.",
+            "Under section {clause}, what must {party} do?",
+        ])
+        queries.append((template.format(clause=clause, party=party, topic=topic), i))
+    return queries
+
+
+def _evaluate(retriever, queries):
+    recalls, rranks, latencies = [], [], []
+    for query, gold_index in queries:
+        start = time.perf_counter()
+        hits  = [d.metadata["chunk_index"] for d in retriever.invoke(query)]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(gold_index in hits)
+        rranks.append(1 / (hits.index(gold_index) + 1) if gold_index in hits else 0.0)
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "mrr": statistics.mean(rranks),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        fake = DeterministicFakeEmbedding(size=384)
+        vector_store_module.get_embeddings = lambda: fake
+
+    rng = random.Random(0)
+    docs, gold = _corpus(args.sections, rng)
+    queries = _queries(gold, args.queries, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = IndexManager(f"{tmp}/faiss_index")
+        manager.upsert(docs)
+        vs, lexical = manager.vector_store, manager.lexical
+
+        print(f"\n{len(docs)} chunks, {len(queries)} queries")
+        print(f"{'retriever':<10} {'recall@k':>9} {'MRR':>6} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+        for name, mode in (("dense", "dense"), ("hybrid", "hybrid")):
+            r = _evaluate(build_retriever(vs, lexical, mode=mode), queries)
+            print(f"{name:<10} {r['recall']:>9.3f} {r['mrr']:>6.3f} {r['p50']:>9.2f} {r['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Index load time and resident memory: legacy pickle vs in-memory SQLite docstore vs mmap.
+
+Each mode runs in a fresh subprocess. The embedding model is loaded before the
+measurement starts, so the numbers cover only the index and docstore.
+
+Usage (from Project/):
+    python -m benchmarks.bench_index_load --queries 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from smart_contract_assistant.config import FAISS_DIR
+
+_CHILD = r"""
+import json, sys, time
+import numpy as np
+from smart_contract_assistant.src.vector_store import get_embeddings, load_vector_store
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 / 1e6
+
+index_dir, mode, n_queries = sys.argv[1], sys.argv[2], int(sys.argv[3])
+get_embeddings()
+base = rss_mb()
+start = time.perf_counter()
+vs = load_vector_store(index_dir, mode=mode)
+load_s = time.perf_counter() - start
+after_load = rss_mb() - base
+
+rng = np.random.default_rng(0)
+start = time.perf_counter()
+for _ in range(n_queries):
+    vs.similarity_search_by_vector(rng.standard_normal(vs.index.d).astype("float32").tolist(), k=5)
+query_ms = (time.perf_counter() - start) / max(n_queries, 1) * 1000
+print(json.dumps({"load_s": load_s, "rss_load_mb": after_load, "rss_query_mb": rss_mb() - base, "query_ms": query_ms}))
+"""
+
+
+def _measure(index_dir, mode, queries):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, index_dir, mode, str(queries)],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default=FAISS_DIR)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    from smart_contract_assistant.src.vector_store import load_vector_store
+
+    with tempfile.TemporaryDirectory() as legacy_dir:
+        load_vector_store(args.index_dir, mode="memory").save_local(legacy_dir)
+
+        print(f"\n{'mode':<14} {'load (s)':>9} {'RSS load (MB)':>14} {'RSS +queries (MB)':>18} {'query (ms)':>11}")
+        for label, index_dir, mode in (
+            ("legacy pickle", legacy_dir, "memory"),
+            ("memory", args.index_dir, "memory"),
+            ("mmap", args.index_dir, "mmap"),
+        ):
+            r = _measure(index_dir, mode, args.queries)
+            print(f"{label:<14} {r['load_s']:>9.3f} {r['rss_load_mb']:>14.1f} {r['rss_query_mb']:>18.1f} {r['query_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
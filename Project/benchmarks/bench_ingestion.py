@@ -0,0 +1,47 @@
+"""
+Ingestion throughput (pages/sec) versus worker count.
+
+Also checks that every run produces exactly the same chunks as the first
+worker count given (the serial workers=1 path by default).
+
+Usage (from Project/):
+    python -m benchmarks.bench_ingestion path/to/contract.pdf --workers 1 2 4 8
+    python -m benchmarks.bench_ingestion path/to/corpus_dir/
+"""
+import argparse
+import time
+
+from smart_contract_assistant.src.ingestion import iter_documents, iter_pages
+
+
+def _run(paths, workers):
+    start = time.perf_counter()
+    n_pages = sum(1 for _ in iter_pages(paths, workers))
+    extract_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    docs = [(d.page_content, d.metadata) for d in iter_documents(paths, workers)]
+    ingest_elapsed = time.perf_counter() - start
+    return n_pages, extract_elapsed, ingest_elapsed, docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF/DOCX files or directories")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"\n{'workers':>7} {'pages':>6} {'extract pages/s':>16} {'ingest pages/s':>15} {'chunks':>7} {'identical':>9}")
+    for workers in args.workers:
+        n_pages, extract_elapsed, ingest_elapsed, docs = _run(args.paths, workers)
+        if baseline is None:
+            baseline = docs
+        print(
+            f"{workers:>7} {n_pages:>6} {n_pages / extract_elapsed:>16.1f} "
+            f"{n_pages / ingest_elapsed:>15.1f} {len(docs):>7} {str(docs == baseline):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
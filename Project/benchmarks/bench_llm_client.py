@@ -0,0 +1,96 @@
+"""
+Legacy per-build ChatOpenAI vs the pooled, shared client, against the fake LLM.
+
+  - rebuilds : --rebuilds chain rebuilds (one per upload/index load), each
+               followed by --calls sequential calls; TCP connections opened
+  - fan-out  : --fanout async calls at once via abatch; peak requests in flight
+               at the server and wall time
+  - errors   : the fan-out again with --error-rate of requests failing with 429;
+               calls that still failed after retries
+
+Usage (from Project/):
+    python -m benchmarks.bench_llm_client --fanout 64 --error-rate 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_community.chat_models import ChatOpenAI
+
+from smart_contract_assistant.config import LLM_MODEL, MAX_TOKENS, TEMPERATURE
+from smart_contract_assistant.src import llm_client
+from benchmarks.fake_llm_server import start_fake_llm_server
+
+PROMPT = "Summarize the termination clause."
+
+
+def _legacy(base_url):
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        openai_api_key="fake",
+        openai_api_base=base_url,
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE,
+    )
+
+
+def _pooled(base_url):
+    with llm_client._clients_lock:
+        llm_client._clients.clear()
+    return llm_client.get_chat_model(base_url, "fake")
+
+
+def _rebuilds(make_llm, args):
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay)
+    llm = _pooled(base_url) if make_llm is _pooled else None
+    start = time.perf_counter()
+    for _ in range(args.rebuilds):
+        if make_llm is _legacy:
+            llm = _legacy(base_url)
+        for _ in range(args.calls):
+            llm.invoke(PROMPT)
+    wall = time.perf_counter() - start
+    server.shutdown()
+    return {"wall": wall, **server.stats}
+
+
+def _fanout(make_llm, args, error_rate):
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay, error_rate)
+    llm = make_llm(base_url)
+    start = time.perf_counter()
+    results = asyncio.run(llm.abatch([PROMPT] * args.fanout, return_exceptions=True))
+    wall = time.perf_counter() - start
+    server.shutdown()
+    return {"wall": wall, "failed": sum(isinstance(r, Exception) for r in results), **server.stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuilds", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--fanout", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--prefill-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    llm_client.LLM_BACKOFF_BASE = 0.05  # keep the error run short; the jitter shape is unchanged
+
+    print(f"\n{'scenario':<10} {'client':<7} {'wall (s)':>9} {'requests':>9} {'conns':>6} {'peak in flight':>15} {'failed':>7}")
+    for name, make_llm in (("legacy", _legacy), ("pooled", _pooled)):
+        r = _rebuilds(make_llm, args)
+        print(f"{'rebuilds':<10} {name:<7} {r['wall']:>9.2f} {r['requests']:>9} {r['connections']:>6} {r['max_in_flight']:>15} {'-':>7}")
+    for scenario, error_rate in (("fan-out", 0.0), ("errors", args.error_rate)):
+        for name, make_llm in (("legacy", _legacy), ("pooled", _pooled)):
+            r = _fanout(make_llm, args, error_rate)
+            print(
+                f"{scenario:<10} {name:<7} {r['wall']:>9.2f} {r['requests']:>9} {r['connections']:>6} "
+                f"{r['max_in_flight']:>15} {r['failed']:>7}"
+            )
+
+    print(f"\npooled client metrics: {llm_client.llm_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Answer-context precision vs added latency of the cross-encoder rerank stage.
+
+The corpus is a synthetic contract in which every section pairs a topic with
+a party. Questions ask what one party must do about one topic; the relevant
+chunks are those with both. Context precision is the fraction of the TOP_K
+chunks sent to the LLM that are relevant (capped by how many exist).
+
+Runs retrieval without reranking, then reranks RERANK_FETCH_K candidates
+under each --budgets value (cold score cache), then repeats the last run warm.
+
+--fake-embeddings and --fake-scorer stand in for the sentence-transformers
+models on machines without them. The fake scorer counts query-term overlaps
+and sleeps --pair-ms per pair, so its latency is realistic but its precision
+only exercises the plumbing.
+
+Usage (from Project/):
+    python -m benchmarks.bench_rerank --budgets 25 50 150 1000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.vector_store as vector_store_module
+from smart_contract_assistant.config import TOP_K, RERANK_FETCH_K
+from smart_contract_assistant.src import reranker as reranker_module
+from smart_contract_assistant.src.rag_chain import build_retriever
+from smart_contract_assistant.src.vector_store import IndexManager
+
+TOPICS  = ["payment", "termination", "confidentiality", "indemnity", "liability", "insurance", "audit", "subcontracting"]
+PARTIES = ["Acme Logistics GmbH", "Borealis Freight Ltd", "Cobalt Systems Inc", "Dunmore Holdings plc", "Evergreen Data LLC"]
+
+
+def _corpus(sections, rng):
+    docs, labels = [], []
+    for s in range(1, sections + 1):
+        topic, party = TOPICS[s % len(TOPICS)], rng.choice(PARTIES)
+        for sub in range(1, 4):
+            text = (
+                f"Section {s}.{sub} ({topic.title()}). {party} shall comply with the {topic} provisions within "
+                f"{rng.randint(5, 90)} days. Notices under this clause go to the address in Schedule {rng.randint(1, 9)}, "
+                f"and the other party may rely on them. {rng.choice(PARTIES)} is copied on all correspondence."
+            )
+            docs.append(Document(page_content=text, metadata={"source": "contract.pdf", "chunk_index": len(docs)}))
+            labels.append((topic, party))
+    return docs, labels
+
+
+TEMPLATES = [
+    "What must {party} do about {topic}?",
+    "Summarize the {topic} obligations of {party}.",
+    "Which {topic} clauses bind {party}?",
+    "Does {party} have any duties regarding {topic}?",
+]
+
+
+def _queries(labels, n, rng):
+    """Distinct questions, so the cold runs never hit the score cache."""
+    candidates = [(t, topic, party) for t in TEMPLATES for topic, party in sorted(set(labels))]
+    queries = []
+    for template, topic, party in rng.sample(candidates, min(n, len(candidates))):
+        relevant = {i for i, label in enumerate(labels) if label == (topic, party)}
+        queries.append((template.format(party=party, topic=topic), relevant))
+    return queries
+
+
+def _fake_scorer(pair_ms):
+    def score(pairs):
+        time.sleep(pair_ms / 1000 * len(pairs))
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+    return score
+
+
+def _run(retriever, queries):
+    precisions, latencies = [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        hits  = [d.metadata["chunk_index"] for d in retriever.invoke(query)]
+        latencies.append((time.perf_counter() - start) * 1000)
+        precisions.append(len(relevant.intersection(hits)) / min(TOP_K, len(relevant)))
+    latencies.sort()
+    return {
+        "precision": statistics.mean(precisions),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=80)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--budgets", type=float, nargs="+", default=[25, 50, 150, 1000])
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--fake-scorer", action="store_true")
+    parser.add_argument("--pair-ms", type=float, default=2.0, help="simulated cost per pair for --fake-scorer")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        fake = DeterministicFakeEmbedding(size=384)
+        vector_store_module.get_embeddings = lambda: fake
+    reranker = (
+        reranker_module.CrossEncoderReranker(_fake_scorer(args.pair_ms)) if args.fake_scorer
+        else reranker_module.get_reranker()
+    )
+    reranker_module._reranker = reranker
+
+    rng = random.Random(0)
+    docs, labels = _corpus(args.sections, rng)
+    queries = _queries(labels, args.queries, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = IndexManager(f"{tmp}/faiss_index")
+        manager.upsert(docs)
+        vs, lexical = manager.vector_store, manager.lexical
+
+        print(f"\n{len(docs)} chunks, {len(queries)} queries, top {TOP_K} of {RERANK_FETCH_K} candidates")
+        print(f"{'run':<22} {'precision':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'fallbacks':>10}")
+        r = _run(build_retriever(vs, lexical, rerank=False), queries)
+        print(f"{'no rerank':<22} {r['precision']:>9.3f} {r['p50']:>9.2f} {r['p99']:>9.2f} {'-':>10}")
+
+        retriever = build_retriever(vs, lexical, rerank=True)
+        for budget in args.budgets:
+            reranker.budget_ms = budget
+            reranker._cache.clear()
+            before = reranker.stats()["fallbacks"]
+            r = _run(retriever, queries)
+            print(f"{f'rerank {budget:g} ms':<22} {r['precision']:>9.3f} {r['p50']:>9.2f} {r['p99']:>9.2f} "
+                  f"{reranker.stats()['fallbacks'] - before:>10}")
+
+        r = _run(retriever, queries)
+        print(f"{f'rerank {budget:g} ms, warm':<22} {r['precision']:>9.3f} {r['p50']:>9.2f} {r['p99']:>9.2f}")
+        print(f"\nreranker: {reranker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
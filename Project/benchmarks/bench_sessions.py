@@ -0,0 +1,92 @@
+"""
+Load test: N concurrent chat sessions driving ui_chat against the fake LLM.
+
+Each simulated session keeps its own history and session state and asks
+--turns questions back to back (follow-ups go through the condense step).
+Reports p50/p99 time-to-first-token and end-to-end latency, plus throughput.
+
+Usage (from Project/):
+    python -m benchmarks.bench_sessions --sessions 1 8 32 --turns 5
+"""
+import argparse
+import copy
+import statistics
+import threading
+import time
+
+import smart_contract_assistant.src.rag_chain as rag_chain_module
+import smart_contract_assistant.src.ui as ui
+from smart_contract_assistant.src.rag_chain import build_rag_chain, build_summary_chain
+from benchmarks.bench_streaming import _fake_vector_store
+from benchmarks.fake_llm_server import start_fake_llm_server
+
+QUESTIONS = [
+    "What is the termination clause?",
+    "What notice period does it require?",
+    "Who pays the fees mentioned there?",
+    "Is there a liability cap?",
+    "What happens on breach?",
+]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _session(turns, ttfts, latencies):
+    history, session = [], copy.deepcopy(ui.NEW_SESSION)
+    for turn in range(turns):
+        start, ttft = time.perf_counter(), None
+        for _, history, session in ui.ui_chat(QUESTIONS[turn % len(QUESTIONS)], history, session):
+            if ttft is None and history and history[-1]["content"]:
+                ttft = time.perf_counter() - start
+        latencies.append(time.perf_counter() - start)
+        ttfts.append(ttft or latencies[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--prefill-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay)
+    rag_chain_module.HF_BASE_URL = base_url
+    rag_chain_module.HF_TOKEN = "fake"
+    rag_chain_module.ANSWER_CACHE_ENABLED = False  # every run should reach the LLM
+
+    vector_store = _fake_vector_store()
+    rag_chain, condense_chain, retriever = build_rag_chain(vector_store)
+    ui._pipeline = {
+        "vector_store":   vector_store,
+        "rag_chain":      rag_chain,
+        "condense_chain": condense_chain,
+        "retriever":      retriever,
+        "summary_chain":  build_summary_chain(),
+        "summarize_memory": None,
+    }
+
+    print(f"\n{'sessions':>8} {'requests':>8} {'TTFT p50':>9} {'TTFT p99':>9} {'lat p50':>8} {'lat p99':>8} {'req/s':>7}")
+    for n in args.sessions:
+        ttfts, latencies = [], []
+        threads = [threading.Thread(target=_session, args=(args.turns, ttfts, latencies)) for _ in range(n)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        print(
+            f"{n:>8} {len(latencies):>8} {statistics.median(ttfts):>9.3f} {_percentile(ttfts, 0.99):>9.3f} "
+            f"{statistics.median(latencies):>8.3f} {_percentile(latencies, 0.99):>8.3f} {len(latencies) / wall:>7.1f}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
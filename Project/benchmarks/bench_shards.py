@@ -0,0 +1,136 @@
+"""
+Scoped retrieval: one index for every document vs one shard per document.
+
+Builds both layouts from the same synthetic chunks (--sources documents of
+--chunks each) and, per query scoped to one document, compares:
+
+  single + post-filter : search the whole index for fetch_k hits, keep the
+                         target document's (what a metadata filter on one
+                         FAISS index does)
+  sharded              : search only the document's shard
+
+Reports latency and how many of the k hits the scope got. Then checks
+unscoped search (all shards in parallel, merged) against the single index,
+and times cold (shard load) vs warm queries under a small SHARD_CACHE_MB.
+
+Usage (from Project/):
+    python -m benchmarks.bench_shards --sources 50 --chunks 400 --queries 300
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.vector_store as vector_store_module
+from smart_contract_assistant.config import TOP_K
+from smart_contract_assistant.src.shards import ShardedIndex
+from smart_contract_assistant.src.vector_store import IndexManager, load_vector_store
+
+
+def _docs(sources, chunks, rng):
+    words = ["supplier", "customer", "termination", "notice", "payment", "invoice", "liability", "warranty",
+             "confidential", "insurance", "clause", "schedule", "breach", "remedy", "term", "renewal"]
+    return [
+        Document(page_content=f"contract-{s}.pdf clause {i}: " + " ".join(rng.choice(words) for _ in range(30)),
+                 metadata={"source": f"contract-{s}.pdf", "chunk_index": i, "page": i // 10})
+        for s in range(sources) for i in range(chunks)
+    ]
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _post_filtered(vs, vector, source, k, fetch_k):
+    _, positions = vs.index.search(vector, fetch_k)
+    hits = []
+    for p in positions[0]:
+        if p < 0:
+            continue
+        doc = vs.docstore.search(vs.index_to_docstore_id[int(p)])
+        if doc.metadata["source"] == source:
+            hits.append(doc)
+            if len(hits) == k:
+                break
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=400, help="chunks per source")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[20, 100], help="post-filter candidate counts")
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    fake = DeterministicFakeEmbedding(size=384)
+    vector_store_module.get_embeddings = lambda: fake
+
+    rng  = random.Random(0)
+    docs = _docs(args.sources, args.chunks, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        IndexManager(f"{tmp}/faiss_index").upsert(docs)
+        ShardedIndex(f"{tmp}/shards", "source").upsert(docs)
+        single  = load_vector_store(f"{tmp}/faiss_index", mode="mmap")
+        sharded = ShardedIndex(f"{tmp}/shards", "source", mode="mmap")
+
+        queries = [(f"notice of termination {rng.random()}", f"contract-{rng.randrange(args.sources)}.pdf")
+                   for _ in range(args.queries)]
+        vectors = [np.asarray([fake.embed_query(q)], dtype=np.float32) for q, _ in queries]
+        for (q, source), vector in zip(queries, vectors):   # load every shard once before timing
+            sharded.search(q, vector, args.k, {"source": source})
+
+        print(f"\n{args.sources} sources x {args.chunks} chunks = {len(docs)} chunks, {len(queries)} scoped queries, k={args.k}")
+        print(f"{'layout':<28} {'p50 (ms)':>9} {'p99 (ms)':>9} {'hits/k':>7}")
+        rows = []
+        for fetch_k in args.fetch_k:
+            times, found = [], []
+            for (_, source), vector in zip(queries, vectors):
+                ms, hits = _ms(lambda: _post_filtered(single, vector, source, args.k, fetch_k))
+                times.append(ms)
+                found.append(len(hits) / args.k)
+            rows.append((f"single + post-filter ({fetch_k})", times, found))
+        times, found = [], []
+        for (q, source), vector in zip(queries, vectors):
+            ms, (dense, _) = _ms(lambda: sharded.search(q, vector, args.k, {"source": source}))
+            times.append(ms)
+            found.append(len(dense) / args.k)
+        rows.append(("sharded (one shard)", times, found))
+        for name, times, found in rows:
+            times.sort()
+            print(f"{name:<28} {statistics.median(times):>9.3f} {times[int(0.99 * (len(times) - 1))]:>9.3f} "
+                  f"{statistics.mean(found):>7.2f}")
+
+        same, single_ms, sharded_ms = 0, [], []
+        for (q, _), vector in zip(queries[:50], vectors[:50]):
+            ms, (_, positions) = _ms(lambda: single.index.search(vector, args.k))
+            single_ms.append(ms)
+            expected = {single.index_to_docstore_id[int(p)] for p in positions[0]}
+            ms, (dense, _) = _ms(lambda: sharded.search(q, vector, args.k))
+            sharded_ms.append(ms)
+            same += expected == {doc_id for _, _, doc_id in dense}
+        print(f"\nunscoped: single {statistics.median(single_ms):.2f} ms, all {args.sources} shards merged "
+              f"{statistics.median(sharded_ms):.2f} ms; identical top-{args.k}: {same}/50")
+
+        shard_mb = sum(s["bytes"] for s in sharded._loaded.values()) / len(sharded._loaded) / 2 ** 20
+        capped   = ShardedIndex(f"{tmp}/shards", "source", mode="mmap", cache_mb=shard_mb * 10)
+        cold, warm = [], []
+        for (q, source), vector in zip(queries, vectors):
+            was_loaded = capped.route({"source": source})[0][0] in capped._loaded
+            ms, _ = _ms(lambda: capped.search(q, vector, args.k, {"source": source}))
+            (warm if was_loaded else cold).append(ms)
+        print(f"LRU cap of ~10 shards ({shard_mb * 10:.1f} MB): {capped.stats()['loaded']} loaded at the end; "
+              f"cold (load) p50 {statistics.median(cold):.2f} ms over {len(cold)} queries, "
+              f"warm p50 {statistics.median(warm):.3f} ms over {len(warm)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cold start: import time per module, and API server time-to-listening / ready.
+
+1. Imports: each module is imported in a fresh interpreter; the time includes
+   everything it pulls in. Then the heaviest top-level packages under
+   `server`, from `python -X importtime`.
+
+2. Server: starts `uvicorn server:app` in a scratch directory holding an index
+   (--chunks synthetic chunks, embedded with the configured model, or a copy
+   of --index-dir) and polls until
+
+     listening : GET /health answers (the port is open)
+     ready     : GET /ready answers 200 (index loaded and, with
+                 STARTUP_WARMUP, the embedding model loaded and one search run)
+
+   and reads the per-step `startup_seconds` breakdown from GET /metrics.
+   Like the server itself, this needs HF_TOKEN set in config (no LLM call is
+   made).
+
+Usage (from Project/):
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+MODULES = [
+    "smart_contract_assistant.config",
+    "smart_contract_assistant.src.metrics",
+    "smart_contract_assistant.src.vector_store",
+    "smart_contract_assistant.src.ingestion",
+    "smart_contract_assistant.src.evaluation",
+    "smart_contract_assistant.src.llm_client",
+    "smart_contract_assistant.src.rag_chain",
+    "smart_contract_assistant.src.index_service",
+    "smart_contract_assistant.src.ui",
+    "server",
+]
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> dict:
+    return dict(os.environ, PYTHONPATH=PROJECT_DIR)
+
+
+def _import_ms(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env(), cwd=PROJECT_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def _heaviest(module: str, top: int) -> list:
+    """(package, ms) for the top-level packages `module` imports, heaviest first: self time of all their submodules."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=_env(), cwd=PROJECT_DIR)
+    totals = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)", line)
+        if match:
+            package = match.group(2).split(".")[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1)) / 1000
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, ""
+    except OSError:
+        return None, ""
+
+
+def _build_index(workdir: str, chunks: int, index_dir: str = None):
+    if index_dir:
+        shutil.copytree(index_dir, os.path.join(workdir, "faiss_index"))
+        return
+    from langchain_core.documents import Document
+    from smart_contract_assistant.src.vector_store import IndexManager
+    docs = [Document(page_content=f"Clause {i}: the Supplier shall give notice of termination within {i % 90} days.",
+                     metadata={"source": "contract.pdf", "chunk_index": i, "page": i // 10}) for i in range(chunks)]
+    IndexManager(os.path.join(workdir, "faiss_index")).upsert(docs)
+
+
+def _server_run(workdir: str, timeout: float) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", PROJECT_DIR, "--port", str(port)],
+        cwd=workdir, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"listening_s": None, "ready_s": None, "startup": {}}
+    try:
+        while time.perf_counter() - start < timeout and proc.poll() is None:
+            if result["listening_s"] is None and _status(f"{base}/health")[0] == 200:
+                result["listening_s"] = time.perf_counter() - start
+            if result["listening_s"] is not None and _status(f"{base}/ready")[0] == 200:
+                result["ready_s"] = time.perf_counter() - start
+                break
+            time.sleep(0.02)
+        _, body = _status(f"{base}/metrics")
+        for stage, seconds in re.findall(r'startup_seconds_sum\{stage="(\w+)"\} ([\d.e+-]+)', body):
+            result["startup"][stage] = float(seconds)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="server cold starts (median reported)")
+    parser.add_argument("--chunks", type=int, default=2000, help="synthetic index size")
+    parser.add_argument("--index-dir", help="serve a copy of this saved index instead")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages listed")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--skip-server", action="store_true")
+    args = parser.parse_args()
+
+    print(f"\n{'module (fresh interpreter)':<46} {'import (ms)':>11}")
+    for module in MODULES:
+        try:
+            print(f"{module:<46} {_import_ms(module):>11.0f}")
+        except RuntimeError as e:
+            print(f"{module:<46} {'failed':>11}  {e}")
+
+    print(f"\nheaviest packages under `server` (ms, summed over their modules)")
+    for name, ms in _heaviest("server", args.top):
+        print(f"  {name:<30} {ms:>8.0f}")
+
+    if args.skip_server:
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        _build_index(workdir, args.chunks, args.index_dir)
+        runs = [_server_run(workdir, args.timeout) for _ in range(args.runs)]
+    listening = [r["listening_s"] for r in runs if r["listening_s"] is not None]
+    ready     = [r["ready_s"] for r in runs if r["ready_s"] is not None]
+    print(f"\nAPI server, {args.runs} cold starts (median):")
+    print(f"  listening (GET /health) : {statistics.median(listening):.2f}s" if listening else "  listening : timed out")
+    print(f"  ready     (GET /ready)  : {statistics.median(ready):.2f}s" if ready else "  ready     : timed out")
+    for stage in ("index_load", "embedding_model", "warm_up"):
+        values = [r["startup"][stage] for r in runs if stage in r["startup"]]
+        if values:
+            print(f"    {stage:<22}: {statistics.median(values):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
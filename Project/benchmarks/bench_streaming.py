@@ -0,0 +1,78 @@
+"""
+Time-to-first-token and total latency: blocking run_rag vs streaming stream_rag.
+
+Runs against the local fake OpenAI-compatible server with a small in-memory
+FAISS index (deterministic fake embeddings), so only the LLM leg differs.
+
+Usage (from Project/):
+    python -m benchmarks.bench_streaming --runs 10 --tokens 300 --token-delay 0.01
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.documents import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import smart_contract_assistant.src.rag_chain as rag_chain_module
+from smart_contract_assistant.src.rag_chain import build_rag_chain, run_rag, stream_rag
+from benchmarks.fake_llm_server import start_fake_llm_server
+
+QUESTION = "What is the termination clause?"
+
+
+def _fake_vector_store():
+    docs = [
+        Document(page_content=f"Clause {i}. The parties agree to term {i}.", metadata={"source": "bench.pdf", "chunk_index": i})
+        for i in range(50)
+    ]
+    return FAISS.from_documents(docs, DeterministicFakeEmbedding(size=384))
+
+
+def _bench_blocking(rag_chain, condense_chain, retriever, runs):
+    totals = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_rag(rag_chain, condense_chain, retriever, QUESTION, "")
+        totals.append(time.perf_counter() - start)
+    return totals, totals
+
+
+def _bench_streaming(rag_chain, condense_chain, retriever, runs):
+    ttfts, totals = [], []
+    for _ in range(runs):
+        start, ttft = time.perf_counter(), None
+        for event in stream_rag(rag_chain, condense_chain, retriever, QUESTION, ""):
+            if event["type"] == "token" and ttft is None:
+                ttft = time.perf_counter() - start
+        totals.append(time.perf_counter() - start)
+        ttfts.append(ttft)
+    return ttfts, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--prefill-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay)
+    rag_chain_module.HF_BASE_URL = base_url
+    rag_chain_module.HF_TOKEN = "fake"
+    rag_chain_module.ANSWER_CACHE_ENABLED = False  # every run should reach the LLM
+
+    rag_chain, condense_chain, retriever = build_rag_chain(_fake_vector_store())
+
+    print(f"\n{'mode':<10} {'TTFT p50 (s)':>14} {'total p50 (s)':>14}")
+    for name, bench in (("blocking", _bench_blocking), ("streaming", _bench_streaming)):
+        ttfts, totals = bench(rag_chain, condense_chain, retriever, args.runs)
+        print(f"{name:<10} {statistics.median(ttfts):>14.3f} {statistics.median(totals):>14.3f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
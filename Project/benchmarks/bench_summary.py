@@ -0,0 +1,78 @@
+"""
+Map-reduce summary wall time: sequential vs concurrent map calls, and a re-summary
+after an incremental upload, against the fake LLM.
+
+The corpus is --files synthetic contracts of --chunks chunks each (about the
+size the splitter produces). The incremental step edits one chunk of the first
+file and adds a new file, then summarizes again with the same summarizer so
+unchanged groups come from its cache.
+
+Usage (from Project/):
+    python -m benchmarks.bench_summary --files 3 --chunks 60 --concurrency 8
+"""
+import argparse
+import time
+
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.rag_chain as rag_chain_module
+from smart_contract_assistant.src.rag_chain import build_summary_chain, get_llm
+from smart_contract_assistant.src.summarization import MapReduceSummarizer
+from benchmarks.fake_llm_server import start_fake_llm_server
+
+
+def _contract(name, n_chunks):
+    return [
+        Document(
+            page_content=" ".join(
+                f"Clause {name}.{i}.{j}: the Supplier shall deliver item {j} within {i + j} days of the order date."
+                for j in range(12)
+            ),
+            metadata={"source": name, "chunk_index": i},
+        )
+        for i in range(n_chunks)
+    ]
+
+
+def _run(summarizer, summary_chain, docs, concurrency):
+    start = time.perf_counter()
+    summarizer.summarize(summary_chain, docs, concurrency=concurrency)
+    return time.perf_counter() - start, summarizer.last_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--chunks", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--prefill-delay", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_llm_server(0, args.tokens, args.token_delay, args.prefill_delay)
+    rag_chain_module.HF_BASE_URL = base_url
+    rag_chain_module.HF_TOKEN = "fake"
+    summary_chain = build_summary_chain()
+
+    docs = [d for f in range(args.files) for d in _contract(f"contract_{f}.pdf", args.chunks)]
+    edited = list(docs)
+    edited[3] = Document(page_content=edited[3].page_content + " Amended by addendum 1.", metadata=edited[3].metadata)
+    edited += _contract("addendum.pdf", args.chunks // 4)
+
+    print(f"\n{len(docs)} chunks; first-six-chunks summary covers {min(6, len(docs)) / len(docs):.0%} of them")
+    print(f"\n{'run':<26} {'wall (s)':>9} {'map calls':>10} {'map cached':>11} {'reduce calls':>13}")
+    concurrent = MapReduceSummarizer(get_llm())
+    for name, summarizer, corpus, n in (
+        ("sequential",             MapReduceSummarizer(get_llm()), docs, 1),
+        (f"concurrent ({args.concurrency})", concurrent, docs, args.concurrency),
+        ("incremental re-summary", concurrent, edited, args.concurrency),
+    ):
+        wall, stats = _run(summarizer, summary_chain, corpus, n)
+        print(f"{name:<26} {wall:>9.2f} {stats.get('map_calls', 0):>10} {stats.get('map_cached', 0):>11} {stats.get('reduce_calls', 0):>13}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
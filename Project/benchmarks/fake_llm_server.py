@@ -0,0 +1,152 @@
+"""
+Local fake OpenAI-compatible LLM server for benchmarks.
+
+Serves POST /v1/chat/completions (streaming and non-streaming) with a
+configurable prefill delay and per-token delay, so latency numbers measure
+our pipeline rather than a remote endpoint. `error_rate` makes that share of
+requests fail with `error_status` (e.g. 429) to exercise retries, and
+`server.stats` counts requests, TCP connections and peak concurrency.
+
+Usage:
+    python -m benchmarks.fake_llm_server --port 8001 --tokens 200 --token-delay 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_handler(n_tokens: int, token_delay: float, prefill_delay: float, error_rate: float, error_status: int, stats: dict):
+    lock = threading.Lock()
+
+    def count(key, delta=1):
+        with lock:
+            stats[key] += delta
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            count("connections")
+
+        def do_POST(self):
+            count("requests")
+            count("in_flight")
+            try:
+                self._complete()
+            finally:
+                count("in_flight", -1)
+
+        def _complete(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            if error_rate and random.random() < error_rate:
+                count("errors")
+                payload = json.dumps({"error": {"message": "injected failure", "type": "rate_limit_error"}}).encode()
+                self.send_response(error_status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            model = body.get("model", "fake")
+            max_tokens = min(body.get("max_tokens") or n_tokens, n_tokens)
+            tokens = [f"tok{i} " for i in range(max_tokens)]
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            time.sleep(prefill_delay)
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for tok in tokens:
+                    self._chunk(completion_id, model, {"content": tok}, None)
+                    time.sleep(token_delay)
+                self._chunk(completion_id, model, {}, "stop")
+                self._write(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                return
+
+            time.sleep(token_delay * len(tokens))
+            payload = json.dumps({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": sum(len(m.get("content", "").split()) for m in body.get("messages", [])),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": len(tokens),
+                },
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _chunk(self, completion_id, model, delta, finish_reason):
+            data = json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+            self._write(f"data: {data}\n\n".encode())
+
+        def _write(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_fake_llm_server(port: int = 0, n_tokens: int = 200, token_delay: float = 0.01, prefill_delay: float = 0.05,
+                          error_rate: float = 0.0, error_status: int = 429):
+    """Starts the server in a daemon thread. Returns (server, base_url)."""
+    stats = {"requests": 0, "connections": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), _make_handler(n_tokens, token_delay, prefill_delay, error_rate, error_status, stats)
+    )
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--prefill-delay", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+
+    server, url = start_fake_llm_server(
+        args.port, args.tokens, args.token_delay, args.prefill_delay, args.error_rate, args.error_status
+    )
+    print(f"[FakeLLM] Serving OpenAI-compatible API at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,15 +1,26 @@
 
-from smart_contract_assistant.src.ui import build_app
 import os
+import threading
 import traceback
-from smart_contract_assistant.config import HF_TOKEN
+from smart_contract_assistant.config import HF_TOKEN, STARTUP_WARMUP
+
+def warm_up():
+    from smart_contract_assistant.src.vector_store import warm_up_embeddings
+    try:
+        warm_up_embeddings()
+    except Exception as e:
+        print(f"[Startup] Embedding warm-up failed: {e}")
 
 if __name__ == "__main__":
     print("Starting Smart Contract Assistant...")
     print(f"Using HF Token: {HF_TOKEN[:4]}...{HF_TOKEN[-4:]}")
     
     try:
+        from smart_contract_assistant.src.ui import build_app   # gradio + LangChain: the bulk of startup
         app = build_app()
+        if STARTUP_WARMUP:
+            # Loads the embedding model while the UI comes up, instead of on the first upload or question.
+            threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
         app.launch(show_error=True)
     except Exception:
         traceback.print_exc()
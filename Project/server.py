@@ -1,18 +1,40 @@
-
 import os
+import json
+import pathlib
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
 from langserve import add_routes
 
-from smart_contract_assistant.src.rag_chain import build_rag_chain, build_summary_chain
-from smart_contract_assistant.src.vector_store import load_vector_store
-from smart_contract_assistant.config import HF_TOKEN
+from smart_contract_assistant.src.rag_chain import build_summary_chain, astream_rag
+from smart_contract_assistant.src.index_service import get_index_service
+from smart_contract_assistant.src.metrics import render_prometheus
+from smart_contract_assistant.config import HF_TOKEN, SERVER_WORKERS, SHARD_BY
+
+# One index snapshot per worker process, memory-mapped (INDEX_LOAD_MODE) so the
+# pages are shared between workers, and swapped in place when a new version is
+# saved: by POST /ingest in any worker, or by the Gradio UI.
+service = get_index_service()
+
+# start() returns at once: the index loads and warms up on a background thread,
+# so uvicorn is listening (and /health answers) before the embedding model loads.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    service.start()
+    yield
+    service.stop()
 
 app = FastAPI(
     title="Smart Contract Assistant API",
     version="1.0",
-    description="A LangServe API for the Smart Contract Assistant"
+    description="A LangServe API for the Smart Contract Assistant",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -23,42 +45,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-rag_chain = None
-summary_chain = None
-
-@app.on_event("startup")
-async def startup_event():
-    global rag_chain, summary_chain
-    try:
-        print("[Server] Loading vector store...")
-        vector_store = load_vector_store()
-        
-        built_rag, _, _ = build_rag_chain(vector_store)
-        rag_chain = built_rag
-        
-        summary_chain = build_summary_chain()
-        print("[Server] Chains loaded successfully.")
-    except Exception as e:
-        print(f"[Server] Warning: Could not load index on startup. {e}")
-        print("[Server] Please create an index first using the Gradio UI.")
+class ChatRequest(BaseModel):
+    question: str
+    chat_history: str = ""
+    sources: list[str] | None = None   # search only these documents (needs SHARD_BY)
+    tenant: str | None = None          # search only this tenant's documents (needs SHARD_BY)
+
+def _search_filter(request: ChatRequest):
+    search_filter = {"tenant": request.tenant, "source": request.sources}
+    search_filter = {field: value for field, value in search_filter.items() if value}
+    if search_filter and not SHARD_BY:
+        raise HTTPException(status_code=400, detail="Scoped search (sources / tenant) needs a sharded index: set SHARD_BY.")
+    return search_filter or None
+
+def require_index() -> dict:
+    """The current snapshot; 503 until an index has been loaded."""
+    snapshot = service.current
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="No index loaded. Ingest documents via POST /ingest or the Gradio UI.")
+    return snapshot
 
 @app.get("/")
 async def redirect_root_to_docs():
     return {"message": "Welcome to Smart Contract Assistant API. Go to /docs for API docs or /rag/playground for RAG."}
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up, with or without an index."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 with the served index version and size once an index is loaded and warmed up, else 503."""
+    status = service.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, request outcomes,
+    token counts, cache hit/miss counters and LLM client state for this worker.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/ingest", status_code=202)
+async def ingest(files: list[UploadFile] = File(...), tenant: str | None = Form(None)):
+    """
+    Upload PDF/DOCX files and index them in the background. Returns a job id
+    for GET /ingest/{job_id}; the new index version is served when it finishes.
+    An optional `tenant` form field tags the chunks (and picks their shard
+    when SHARD_BY="tenant").
+    """
+    upload_dir = tempfile.mkdtemp(prefix="ingest-")
+    paths = []
+    for upload in files:
+        path = os.path.join(upload_dir, pathlib.Path(upload.filename or "upload").name)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload.file, f)
+        paths.append(path)
+    return {"job_id": service.submit_ingest(paths, cleanup_dir=upload_dir, tenant=tenant)}
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    job = service.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job
+
+def _sse(event: dict) -> str:
+    content = event["content"]
+    if event["type"] == "sources":
+        content = [{"page_content": d.page_content, "metadata": d.metadata} for d in content]
+    return f"event: {event['type']}\ndata: {json.dumps(content)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, snapshot: dict = Depends(require_index)):
+    """
+    Server-Sent Events stream of the condensed question, the retrieved sources,
+    then the answer tokens as the LLM produces them. The whole request is
+    answered from the snapshot current when it arrived. `sources` / `tenant`
+    restrict retrieval to those shards (and chunks) on a sharded index.
+    """
+    search_filter = _search_filter(request)
+
+    async def events():
+        async for event in astream_rag(snapshot["rag_chain"], snapshot["condense_chain"], snapshot["retriever"],
+                                       request.question, request.chat_history, search_filter):
+            yield _sse(event)
+        yield "event: end\ndata: null\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 
-try:
-    if os.path.exists("faiss_index"):
-        vs = load_vector_store()
-        r_chain, _, _ = build_rag_chain(vs)
-        s_chain = build_summary_chain()
-        
-        add_routes(app, r_chain, path="/rag")
-        add_routes(app, s_chain, path="/summary")
-    else:
-        print("[Server] 'faiss_index' not found. Routes /rag and /summary will not be available until restart after data ingestion.")
-except Exception as e:
-    print(f"[Server] Error setting up routes: {e}")
+# Registered once; each call is delegated to the snapshot current at that moment
+# (a RunnableLambda that returns a Runnable invokes or streams it).
+current_rag_chain = RunnableLambda(lambda _: require_index()["rag_chain"], name="rag_chain").with_types(input_type=str)
+add_routes(app, current_rag_chain, path="/rag", dependencies=[Depends(require_index)])
+add_routes(app, build_summary_chain(), path="/summary")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("server:app", host="0.0.0.0", port=8000, workers=SERVER_WORKERS)
@@ -5,10 +5,83 @@ LLM_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 CHUNK_SIZE = 1200
 CHUNK_OVERLAP = 150
+STRUCTURED_CHUNKING = True  # chunk within sections (headings kept as metadata), DOCX tables row-wise, repeated page headers/footers dropped
+DEDUP_THRESHOLD = 1.0       # 1.0 = store chunks with identical text once, with references; < 1 also merges near-duplicates (estimated Jaccard of word shingles), whose own wording is lost; 0 = off
+DEDUP_SHINGLE = 5           # words per shingle
+DEDUP_NUM_PERM = 128        # MinHash permutations per chunk
+DEDUP_BANDS = 32            # LSH bands (NUM_PERM / BANDS rows each); more bands find more candidates to verify
 TOP_K = 5
+RETRIEVAL_MODE = "hybrid"    # hybrid (BM25 + dense, RRF-fused) | dense
+HYBRID_FETCH_K = 20         # candidates taken from each retriever before fusion
+RRF_K = 60                  # reciprocal rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+RERANK_ENABLED = False      # cross-encoder rerank of RERANK_FETCH_K candidates down to TOP_K
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_K = 20         # candidates retrieved for reranking
+RERANK_BATCH_SIZE = 8       # pairs per cross-encoder call; the budget is checked between calls
+RERANK_BUDGET_MS = 150      # per query; unfinished reranks fall back to retrieval order
+RERANK_CACHE_SIZE = 8192    # cached (query, chunk) scores
+RERANK_PAIR_COST_MS = 10.0  # assumed cost per pair until a batch has been timed (the first rerank is the coldest)
+INGEST_WORKERS = 4         # PDF extraction processes; 1 = serial, in-process
+PDF_PAGES_PER_TASK = 8     # pages per extraction task sent to a worker
+UI_CONCURRENCY = 16        # Gradio events processed in parallel per handler
 MAX_TOKENS = 700
 TEMPERATURE = 0.2
+LLM_CONTEXT_WINDOW = 8192   # tokens the endpoint accepts (prompt + answer)
+CONTEXT_TOKEN_BUDGET = 2000 # tokens of document excerpts per prompt, after merging adjacent chunks
+LLM_MAX_CONCURRENCY = 16    # LLM requests in flight per process (threads and event loops together)
+LLM_POOL_CONNECTIONS = 16   # keep-alive HTTP connections to the LLM endpoint
+LLM_TIMEOUT = 60.0          # seconds per request
+LLM_MAX_RETRIES = 3         # retries on 429/5xx/connection errors
+LLM_BACKOFF_BASE = 0.5      # seconds; full-jitter exponential backoff
+LLM_BACKOFF_MAX = 20.0
+MEMORY_TOKEN_BUDGET = 800   # chat history tokens sent to the condense step
+MEMORY_SUMMARIZE = False    # fold turns that leave the window into a running summary (extra LLM call)
+SUMMARY_MODE = "map_reduce"      # map_reduce (whole document) | stuff (first chunks only, one call)
+SUMMARY_CONCURRENCY = 8          # map/reduce LLM calls in flight at once
+SUMMARY_GROUP_TOKENS = 3000      # chunk tokens per map call
+SUMMARY_REDUCE_TOKENS = 6000     # partial-summary tokens per reduce call and for the final summary
+SUMMARY_CACHE_SIZE = 4096        # cached map/reduce outputs, keyed by input hash
+GUARDRAIL_CACHE_SIZE = 4096       # memoized guardrail verdicts
+GUARDRAIL_LOG_SAMPLE_RATE = 0.01  # fraction of allowed queries logged (blocked ones always are)
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL = 3600     # seconds
+ANSWER_CACHE_SIMILARITY = 0.95  # cosine threshold for the semantic (embedding) tier
+EVAL_CONCURRENCY = 8        # evaluation questions in flight at once
+EVAL_RETRIEVAL_CACHE_SIZE = 2048  # retrieved chunk lists kept for retrieval-only re-runs
 FAISS_DIR = "faiss_index"
+INDEX_TYPE = "flat"         # flat | ivf | hnsw | ivfpq
+IVF_NLIST = 256             # IVF centroids (capped by training set size)
+IVF_NPROBE = 16             # IVF lists scanned per query
+IVF_TRAIN_SIZE = 10000      # vectors collected before training a new IVF index
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+PQ_M = 16                   # PQ sub-quantizers; must divide the embedding dim (384)
+PQ_NBITS = 8
+INDEX_LOAD_MODE = "mmap"    # read-only loads (API server): mmap | memory
+SHARD_BY = ""               # "" = one index in FAISS_DIR; "source" (one shard per document) | "tenant"
+SHARDS_DIR = "faiss_shards"
+SHARD_CACHE_MB = 1024       # loaded shards (estimated from their size on disk) before the least recently used is unloaded
+SHARD_SEARCH_THREADS = 4    # shards searched in parallel per query
+INDEX_RELOAD_INTERVAL = 5.0 # seconds between API server checks for a newer saved index; 0 = off
+INGEST_JOB_HISTORY = 100    # finished ingest jobs kept for GET /ingest/{job_id}
+SERVER_WORKERS = 1          # uvicorn worker processes; each maps the same index read-only
+STARTUP_WARMUP = True       # after start, load the embedding model and run one embed + search in the background
+WARMUP_QUERY = "What is the termination notice period?"
+PROFILE_LOG = ""            # JSONL file receiving every request's stage timings; "" = off
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite3"
+QUERY_CACHE_SIZE = 1024
+EMBED_BATCH_SIZE = 64       # chunks per encode call
+EMBED_ENCODE_THREADS = 2    # batches encoded concurrently (overlaps tokenization with encoding)
+EMBED_TORCH_THREADS = 0     # torch intra-op threads; 0 = torch default
+EMBEDDING_BACKEND = "torch"  # torch (sentence-transformers, fp32) | onnx | onnx-int8 (onnxruntime, no torch import)
+EMBEDDING_ONNX_PATH = "models/all-MiniLM-L6-v2-onnx"  # export: python -m smart_contract_assistant.src.onnx_embeddings
+EMBEDDING_MAX_LENGTH = 256  # tokens per text for the ONNX backends (the model's max_seq_length)
+EMBED_ONNX_THREADS = 0      # onnxruntime intra-op threads; 0 = onnxruntime default
+EMBED_PARITY_MIN = 0.99     # lowest cosine to the exported fp32 reference vectors accepted when an ONNX model loads
 
 
 QA_SYSTEM_PROMPT = """You are a helpful document assistant and teacher.
@@ -30,4 +103,15 @@ Chat History: {chat_history}
 Follow-up: {question}
 Standalone question:"""
 
+MEMORY_SUMMARY_TEMPLATE = """Progressively summarize the conversation between a user and a document assistant.
+Keep the names, clauses and facts a follow-up question might refer to. Reply in at most 3 sentences.
+
+Current summary: {summary}
+New lines of conversation: {turns}
+New summary:"""
+
 SUMMARY_SYSTEM_PROMPT = "You are a document summarizer. Summarize in 5 clear bullet points covering the main topics, key concepts, and important details."
+
+SUMMARY_MAP_PROMPT = "You are summarizing one section of a longer document. Summarize it in a short paragraph, keeping parties, obligations, dates, amounts and clause numbers."
+
+SUMMARY_REDUCE_PROMPT = "Merge these partial summaries of consecutive sections of one document into a single concise summary. Keep parties, obligations, dates, amounts and clause numbers."
@@ -0,0 +1,90 @@
+
+import faiss
+import numpy as np
+from ..config import (
+    INDEX_TYPE, IVF_NLIST, IVF_NPROBE, IVF_TRAIN_SIZE,
+    HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, PQ_M, PQ_NBITS
+)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+# FAISS warns below ~39 training points per centroid.
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def train_size(index_type: str = INDEX_TYPE) -> int:
+    """Number of vectors to collect before the index can be created (1 = no training)."""
+    return IVF_TRAIN_SIZE if index_type in ("ivf", "ivfpq") else 1
+
+def create_faiss_index(dim: int, index_type: str = INDEX_TYPE, train_vectors=None):
+    """
+    Build an empty (trained, if needed) FAISS index. All types use L2 distance,
+    like LangChain's default IndexFlatL2, so relevance scores stay comparable.
+
+      flat  : exact linear scan (the only type that deletes in place)
+      ivf   : inverted lists over k-means centroids trained on `train_vectors`
+      hnsw  : graph index, no training
+      ivfpq : IVF with product-quantized codes, lowest memory
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch       = HNSW_EF_SEARCH
+        return index
+
+    train_vectors = np.asarray(train_vectors, dtype=np.float32)
+    n_train = len(train_vectors)
+    nlist   = max(1, min(IVF_NLIST, n_train // _MIN_POINTS_PER_CENTROID))
+
+    if index_type == "ivfpq" and n_train < 2 ** PQ_NBITS:
+        print(f"[ANN] {n_train} vectors are too few to train PQ codebooks; using 'ivf' instead.")
+        index_type = "ivf"
+
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS)
+    index.train(train_vectors)
+    index.nprobe = min(IVF_NPROBE, nlist)
+    print(f"[ANN] Trained {index_type} index: nlist={nlist} on {n_train} vectors.")
+    return index
+
+def index_type_of(index) -> str:
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+def supports_removal(index) -> bool:
+    """
+    Whether LangChain's `FAISS.delete` is safe: it renumbers the positions in
+    `index_to_docstore_id`, which only a flat index's `remove_ids` matches.
+    IVF keeps the original labels and HNSW cannot remove, so both are rebuilt.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+def search_params(index, selector):
+    """Query-time parameters restricting a search to the ids accepted by `selector` (filtered during the scan)."""
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def apply_search_params(index):
+    """Apply the configured query-time knobs (nprobe / efSearch) to a loaded index."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(IVF_NPROBE, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
@@ -0,0 +1,129 @@
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from . import metrics
+from ..config import (
+    ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY,
+    LLM_MODEL, MAX_TOKENS, TEMPERATURE, TOP_K, QA_SYSTEM_PROMPT, RERANK_ENABLED, RERANK_MODEL,
+    CONTEXT_TOKEN_BUDGET
+)
+
+# Anything that changes the answer for the same question and index.
+_CONFIG_FINGERPRINT = hashlib.sha256(
+    f"{LLM_MODEL}\x00{MAX_TOKENS}\x00{TEMPERATURE}\x00{TOP_K}\x00{QA_SYSTEM_PROMPT}\x00{RERANK_ENABLED and RERANK_MODEL}\x00{CONTEXT_TOKEN_BUDGET}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+
+class AnswerCache:
+    """
+    Two-tier cache of RAG results, scoped to an index fingerprint and the
+    prompt/model config:
+
+      - exact   : normalized standalone question
+      - semantic: cosine similarity of query embeddings >= `threshold`
+
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted beyond `max_entries`. `invalidate()` drops everything; the index
+    manager calls it whenever the vector store changes.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.threshold   = threshold
+        self._entries    = OrderedDict()
+        self._lock       = threading.Lock()
+        self._counts     = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _scope(index_fingerprint: str) -> str:
+        return f"{index_fingerprint}:{_CONFIG_FINGERPRINT}"
+
+    def lookup(self, question: str, index_fingerprint: str, vector=None):
+        """Returns (result, tier) where tier is 'exact' or 'semantic', or (None, None)."""
+        scope = self._scope(index_fingerprint)
+        key   = (scope, normalize_question(question))
+        now   = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counts["exact_hits"] += 1
+                return entry["result"], "exact"
+
+            if vector is not None:
+                candidates = [(k, e) for k, e in self._entries.items() if k[0] == scope and e["vector"] is not None]
+                if candidates:
+                    matrix = np.stack([e["vector"] for _, e in candidates])
+                    sims   = matrix @ _unit(vector)
+                    best   = int(np.argmax(sims))
+                    if sims[best] >= self.threshold:
+                        best_key, best_entry = candidates[best]
+                        self._entries.move_to_end(best_key)
+                        self._counts["semantic_hits"] += 1
+                        return best_entry["result"], "semantic"
+
+            self._counts["misses"] += 1
+            return None, None
+
+    def store(self, question: str, index_fingerprint: str, result: dict, vector=None):
+        key = (self._scope(index_fingerprint), normalize_question(question))
+        with self._lock:
+            self._entries[key] = {
+                "result":  result,
+                "vector":  _unit(vector) if vector is not None else None,
+                "expires": time.monotonic() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._counts["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts, entries=len(self._entries))
+        lookups = counts["exact_hits"] + counts["semantic_hits"] + counts["misses"]
+        counts["hit_rate"] = round((counts["exact_hits"] + counts["semantic_hits"]) / lookups, 3) if lookups else 0.0
+        return counts
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if e["expires"] <= now]
+        for k in expired:
+            del self._entries[k]
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+_answer_cache = None
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        from .vector_store import on_index_change
+        _answer_cache = AnswerCache()
+        on_index_change(_answer_cache.invalidate)
+        metrics.register_collector(_collect)
+    return _answer_cache
+
+def _collect() -> list:
+    stats = _answer_cache.stats()
+    return metrics.cache_metrics("answer", stats["exact_hits"] + stats["semantic_hits"], stats["misses"])
@@ -0,0 +1,124 @@
+
+from .tokens import count_tokens, truncate_tokens
+from ..config import CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET, LLM_CONTEXT_WINDOW, MAX_TOKENS, QA_SYSTEM_PROMPT
+
+_SEPARATOR          = "\n\n---\n\n"
+_MIN_OVERLAP        = 16    # shorter suffix/prefix matches are treated as coincidence
+_MIN_PARTIAL_TOKENS = 64    # a passage is truncated into the leftover budget only if this much is left
+_PROMPT_TOKENS      = count_tokens(QA_SYSTEM_PROMPT)
+
+
+def format_docs(docs: list) -> str:
+    """Format retrieved docs into a single context string, one block per chunk (no merging or budget)."""
+    return _SEPARATOR.join(
+        f"[Chunk {d.metadata.get('chunk_index','?')} | {d.metadata.get('source','?')}]\n{d.page_content}"
+        for d in docs
+    )
+
+
+def overlap_length(prev: str, nxt: str, limit: int = 2 * CHUNK_OVERLAP) -> int:
+    """Length of the longest suffix of `prev` that is a prefix of `nxt` (0 if under _MIN_OVERLAP)."""
+    tail  = prev[-limit:]
+    probe = nxt[:_MIN_OVERLAP]
+    if len(probe) < _MIN_OVERLAP:
+        return 0
+    pos = tail.find(probe)
+    while pos != -1:
+        if nxt.startswith(tail[pos:]):
+            return len(tail) - pos
+        pos = tail.find(probe, pos + 1)
+    return 0
+
+
+def _passages(docs: list) -> list:
+    """
+    Merge chunks with consecutive `chunk_index` from the same source into one
+    passage, dropping the text they share. Each passage keeps the best
+    (lowest) retrieval rank of its chunks.
+    """
+    seen, ranked = set(), []
+    for rank, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("chunk_index"))
+        if key not in seen:
+            seen.add(key)
+            ranked.append((rank, doc))
+
+    mergeable = sorted(
+        ((d.metadata.get("source", ""), d.metadata["chunk_index"], rank, d)
+         for rank, d in ranked if isinstance(d.metadata.get("chunk_index"), int)),
+        key=lambda item: (str(item[0]), item[1]),
+    )
+    passages = []
+    for source, index, rank, doc in mergeable:
+        last = passages[-1] if passages else None
+        if last and last["source"] == source and last["last"] == index - 1:
+            cut = overlap_length(last["text"], doc.page_content)
+            last["text"] += doc.page_content[cut:] if cut else "\n\n" + doc.page_content
+            last["last"], last["rank"] = index, min(last["rank"], rank)
+            last["docs"].append(doc)
+        else:
+            passages.append({"source": source, "first": index, "last": index, "rank": rank,
+                             "text": doc.page_content, "docs": [doc]})
+    passages += [
+        {"source": d.metadata.get("source", "?"), "first": d.metadata.get("chunk_index", "?"), "last": None,
+         "rank": rank, "text": d.page_content, "docs": [d]}
+        for rank, d in ranked if not isinstance(d.metadata.get("chunk_index"), int)
+    ]
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+def _header(p: dict) -> str:
+    if p["last"] is not None and p["last"] != p["first"]:
+        return f"[Chunks {p['first']}-{p['last']} | {p['source']}]"
+    return f"[Chunk {p['first']} | {p['source']}]"
+
+
+def context_budget(question: str = "") -> int:
+    """Tokens left for excerpts: CONTEXT_TOKEN_BUDGET, capped by what the window leaves after prompt and answer."""
+    return max(0, min(CONTEXT_TOKEN_BUDGET, LLM_CONTEXT_WINDOW - MAX_TOKENS - _PROMPT_TOKENS - count_tokens(question)))
+
+
+def pack_context(docs: list, budget: int) -> dict:
+    """
+    Build the prompt context from retrieved chunks (best first).
+
+    Adjacent chunks are merged without their overlap, then passages are
+    added in retrieval order while they fit `budget` tokens; the first passage
+    that does not fit is truncated into the remainder if enough is left.
+
+    Returns {"text", "documents" (the chunks that made it in, in retrieval
+    order), "stats"}.
+    """
+    parts, used, kept, dropped, truncated = [], 0, [], 0, 0
+    sep_tokens = count_tokens(_SEPARATOR)
+    for p in _passages(docs):
+        header  = _header(p)
+        cost    = (sep_tokens if parts else 0) + count_tokens(header)
+        tokens  = count_tokens(p["text"])
+        left    = budget - used - cost
+        if tokens <= left:
+            text = p["text"]
+        elif left >= _MIN_PARTIAL_TOKENS or not parts and left > 0:
+            text, tokens = truncate_tokens(p["text"], left), left
+            truncated += 1
+        else:
+            dropped += len(p["docs"])
+            continue
+        parts.append(f"{header}\n{text}")
+        used += cost + tokens
+        kept += p["docs"]
+
+    rank = {}
+    for i, doc in enumerate(docs):
+        rank.setdefault(id(doc), i)
+    kept.sort(key=lambda doc: rank[id(doc)])   # passages list their chunks in document order
+
+    raw = count_tokens(format_docs(docs))
+    return {
+        "text": _SEPARATOR.join(parts),
+        "documents": kept,
+        "stats": {
+            "chunks": len(docs), "passages": len(parts), "dropped": dropped, "truncated": truncated,
+            "tokens": used, "tokens_raw": raw, "tokens_saved": raw - used, "budget": budget,
+        },
+    }
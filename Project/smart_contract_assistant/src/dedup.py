@@ -0,0 +1,118 @@
+
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from ..config import DEDUP_THRESHOLD, DEDUP_SHINGLE, DEDUP_NUM_PERM, DEDUP_BANDS
+
+MINHASH_FILE = "minhash.npz"
+DUPLICATES   = "duplicates"   # metadata key: metadata of the (near-)duplicate chunks stored as this one
+
+_WORD_RE = re.compile(r"\w+")
+
+# Fixed seed: signatures are saved with the index and compared across processes.
+_rng = np.random.default_rng(0x5CA)
+_A   = _rng.integers(1, 2 ** 63, size=DEDUP_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B   = _rng.integers(0, 2 ** 63, size=DEDUP_NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE) -> np.ndarray:
+    """crc32 of each distinct lowercased word `size`-gram (the whole text if it is shorter)."""
+    words = _WORD_RE.findall(text.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+def same_text(a: str, b: str) -> bool:
+    """Equal up to whitespace."""
+    return a.split() == b.split()
+
+def minhash(text: str) -> np.ndarray:
+    """DEDUP_NUM_PERM-value MinHash signature (multiply-shift hashes of the shingles)."""
+    with np.errstate(over="ignore"):
+        hashed = (shingles(text)[:, None] * _A + _B) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+class MinHashIndex:
+    """
+    Near-duplicate lookup over chunk signatures: LSH banding proposes
+    candidates, the share of equal signature values (an estimate of their
+    Jaccard similarity) confirms them. Kept in step with the FAISS docstore
+    by the index manager and saved next to it, like the BM25 index.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = DEDUP_BANDS):
+        self.threshold   = threshold
+        self.bands       = bands
+        self.rows        = DEDUP_NUM_PERM // bands
+        self._signatures = {}                          # doc_id -> signature
+        self._buckets    = [{} for _ in range(bands)]  # band -> {band bytes: set of doc_ids}
+        self._lock       = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, signature: np.ndarray):
+        for b in range(self.bands):
+            yield b, signature[b * self.rows:(b + 1) * self.rows].tobytes()
+
+    def add(self, doc_id: str, signature: np.ndarray):
+        with self._lock:
+            self.remove([doc_id])
+            self._signatures[doc_id] = signature
+            for b, key in self._bands(signature):
+                self._buckets[b].setdefault(key, set()).add(doc_id)
+
+    def remove(self, ids: list):
+        with self._lock:
+            for doc_id in ids:
+                signature = self._signatures.pop(doc_id, None)
+                if signature is None:
+                    continue
+                for b, key in self._bands(signature):
+                    bucket = self._buckets[b][key]
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self._buckets[b][key]
+
+    def query(self, signature: np.ndarray) -> list:
+        """(doc_id, estimated Jaccard) of the indexed chunks at or above the threshold, most similar first."""
+        with self._lock:
+            candidates = set()
+            for b, key in self._bands(signature):
+                candidates |= self._buckets[b].get(key, set())
+            matches = []
+            for doc_id in candidates:
+                similarity = float(np.count_nonzero(self._signatures[doc_id] == signature)) / len(signature)
+                if similarity >= self.threshold:
+                    matches.append((doc_id, similarity))
+        return sorted(matches, key=lambda m: -m[1])
+
+    def save(self, index_dir: str):
+        with self._lock:
+            ids = list(self._signatures)
+            signatures = np.stack([self._signatures[i] for i in ids]) if ids else np.zeros((0, DEDUP_NUM_PERM), np.uint32)
+        np.savez_compressed(os.path.join(index_dir, MINHASH_FILE), ids=np.asarray(ids, dtype=str), signatures=signatures)
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """The saved index, or None if `index_dir` has none (saved before dedup, or with it off)."""
+        path = os.path.join(index_dir, MINHASH_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as payload:
+            if payload["signatures"].shape[1] != DEDUP_NUM_PERM:
+                return None   # DEDUP_NUM_PERM changed: rebuild
+            index = cls()
+            for doc_id, signature in zip(payload["ids"].tolist(), payload["signatures"]):
+                index.add(doc_id, signature)
+        return index
+
+    @classmethod
+    def from_vector_store(cls, vs):
+        """Build from every chunk in a FAISS store's docstore."""
+        index = cls()
+        for doc_id in vs.index_to_docstore_id.values():
+            index.add(doc_id, minhash(vs.docstore.search(doc_id).page_content))
+        return index
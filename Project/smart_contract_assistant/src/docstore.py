@@ -0,0 +1,132 @@
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+from .dedup import DUPLICATES
+
+DOCSTORE_FILE = "docstore.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS index_map (pos INTEGER PRIMARY KEY, id TEXT NOT NULL);
+"""
+
+
+def _connect(path: str, read_only: bool) -> sqlite3.Connection:
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Chunk text and metadata stored in SQLite and read lazily, one row per
+    search hit, instead of unpickling the whole docstore into RAM.
+    """
+
+    def __init__(self, path: str, read_only: bool = True):
+        self.path  = path
+        self._conn = _connect(path, read_only)
+        self._lock = threading.Lock()
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: dict) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+                [(doc_id, d.page_content, json.dumps(d.metadata)) for doc_id, d in texts.items()],
+            )
+            self._conn.commit()
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def positions_where(self, metadata_filter: dict) -> list:
+        """
+        (FAISS position, id) of every chunk whose metadata matches `{field: [values]}`,
+        on the chunk itself or on one of its `duplicates` (see metadata_matches).
+        """
+        clauses, params = [], []
+        for field, values in metadata_filter.items():
+            marks = ", ".join("?" * len(values))
+            clauses.append(
+                f"(json_extract(d.metadata, ?) IN ({marks}) OR EXISTS ("
+                f"SELECT 1 FROM json_each(d.metadata, '$.{DUPLICATES}') r WHERE json_extract(r.value, ?) IN ({marks})))"
+            )
+            params += [f'$."{field}"', *values, f'$."{field}"', *values]
+        sql = "SELECT m.pos, m.id FROM index_map m JOIN docs d ON d.id = m.id WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+def metadata_matches(metadata: dict, metadata_filter: dict) -> bool:
+    """Each `{field: [values]}` matches the chunk's metadata or that of a duplicate stored as it."""
+    candidates = [metadata, *metadata.get(DUPLICATES, [])]
+    return all(any(m.get(field) in values for m in candidates) for field, values in metadata_filter.items())
+
+
+class SQLiteIndexMap(Mapping):
+    """Read-only FAISS position -> docstore id mapping, resolved per lookup."""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._conn = docstore._conn
+        self._lock = docstore._lock
+
+    def __getitem__(self, pos: int) -> str:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM index_map WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self):
+        with self._lock:
+            positions = [r[0] for r in self._conn.execute("SELECT pos FROM index_map ORDER BY pos")]
+        return iter(positions)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM index_map").fetchone()[0]
+
+
+def write_docstore(path: str, docstore, index_to_docstore_id: dict):
+    """Write every indexed chunk and the position -> id map to a fresh SQLite file."""
+    conn = _connect(path, read_only=False)
+    with conn:
+        conn.executemany(
+            "INSERT INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+            (
+                (doc_id, d.page_content, json.dumps(d.metadata))
+                for doc_id, d in ((i, docstore.search(i)) for i in index_to_docstore_id.values())
+            ),
+        )
+        conn.executemany("INSERT INTO index_map (pos, id) VALUES (?, ?)", index_to_docstore_id.items())
+    conn.close()
+
+def read_docstore(path: str):
+    """Load the whole SQLite docstore into memory. Returns (docs by id, index_to_docstore_id)."""
+    conn = _connect(path, read_only=True)
+    docs = {
+        doc_id: Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+        for doc_id, content, metadata in conn.execute("SELECT id, content, metadata FROM docs")
+    }
+    index_map = dict(conn.execute("SELECT pos, id FROM index_map"))
+    conn.close()
+    return docs, index_map
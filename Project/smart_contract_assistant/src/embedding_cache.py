@@ -0,0 +1,113 @@
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from ..config import EMBEDDING_CACHE_PATH, QUERY_CACHE_SIZE
+
+_SQL_BATCH = 500
+
+
+def _as_float32(vectors: list) -> list:
+    """Round to float32 so fresh and cached vectors are bit-identical."""
+    return np.asarray(vectors, dtype=np.float32).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an Embeddings model.
+
+      - Disk tier : SQLite table of document embeddings (float32 blobs keyed
+                    by sha256(model + text)), reused across processes and runs.
+      - Query tier: bounded in-memory LRU of query embeddings. Queries are never
+                    written to disk, so user questions do not grow the table
+                    or add a write to the request path.
+
+    Document and query embeddings are keyed separately, since some models
+    embed them differently. Hit/miss counters are available via `stats()`.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str,
+                 path: str = EMBEDDING_CACHE_PATH, query_cache_size: int = QUERY_CACHE_SIZE):
+        self.underlying       = underlying
+        self.model_name       = model_name
+        self.query_cache_size = query_cache_size
+        self._query_lru       = OrderedDict()
+        self._lock            = threading.Lock()
+        self._counts          = {"doc_hits": 0, "doc_misses": 0, "query_hits": 0, "query_misses": 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self._conn.commit()
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _load(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items: list):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: list) -> list:
+        keys   = [self._key("doc", t) for t in texts]
+        cached = self._load(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = _as_float32(self.underlying.embed_documents(list(missing.values())))
+            computed = list(zip(missing.keys(), vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        with self._lock:
+            self._counts["doc_hits"]   += len(texts) - len(missing)
+            self._counts["doc_misses"] += len(missing)
+        return [cached[k] for k in keys]
+
+    def embed_query(self, text: str) -> list:
+        key = self._key("query", text)
+        with self._lock:
+            vec = self._query_lru.get(key)
+            if vec is not None:
+                self._query_lru.move_to_end(key)
+                self._counts["query_hits"] += 1
+                return vec
+
+        vec = _as_float32([self.underlying.embed_query(text)])[0]
+        with self._lock:
+            self._counts["query_misses"] += 1
+            self._query_lru[key] = vec
+            if len(self._query_lru) > self.query_cache_size:
+                self._query_lru.popitem(last=False)
+        return vec
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        for kind in ("doc", "query"):
+            total = counts[f"{kind}_hits"] + counts[f"{kind}_misses"]
+            counts[f"{kind}_hit_rate"] = round(counts[f"{kind}_hits"] / total, 3) if total else 0.0
+        return counts
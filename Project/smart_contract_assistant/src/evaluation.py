@@ -1,34 +1,251 @@
 
+import asyncio
+import json
+import threading
 import time
+from collections import OrderedDict
+import numpy as np
+from .dedup import DUPLICATES
+from ..config import EVAL_CONCURRENCY, EVAL_RETRIEVAL_CACHE_SIZE
 
-def evaluate(questions: list, rag_chain, condense_chain, retriever) -> str:
-    lines      = ["=" * 55, "  EVALUATION REPORT", "=" * 55]
-    total_time = 0
+PERCENTILES = (50, 90, 99)
 
-    chat_history_str = ""
+# Retrieved chunks per (index fingerprint, question), shared across runs so a
+# regression suite re-run against an unchanged index skips retrieval.
+_retrieval_cache      = OrderedDict()
+_retrieval_cache_lock = threading.Lock()
+_retrieval_listening  = False
 
-    from .rag_chain import run_rag
 
-    for i, question in enumerate(questions, 1):
-        start   = time.time()
-        answer, sources, _ = run_rag(rag_chain, condense_chain, retriever, question, chat_history_str)
-        elapsed = round(time.time() - start, 2)
-        total_time += elapsed
+def chunk_key(doc) -> str:
+    """Label for a chunk in gold sets and reports: `<source>#<chunk_index>`."""
+    return f"{doc.metadata.get('source', '?')}#{doc.metadata.get('chunk_index', '?')}"
 
-        src_words = set(" ".join(d.page_content for d in sources).lower().split())
-        ans_words = set(answer.content.lower().split()) if hasattr(answer, 'content') else set(str(answer).lower().split())
-        
-        faith     = round(len(ans_words & src_words) / max(len(ans_words), 1), 2)
+def chunk_keys(doc) -> set:
+    """The chunk's key plus those of the duplicates stored as it (see IndexManager)."""
+    refs = doc.metadata.get(DUPLICATES, ())
+    return {chunk_key(doc), *(f"{r.get('source', '?')}#{r.get('chunk_index', '?')}" for r in refs)}
 
-        lines.append(f"\nQ{i}: {question}")
-        lines.append(f"  Answer      : {str(answer)[:150]}...")
-        lines.append(f"  Time        : {elapsed}s")
-        lines.append(f"  Faithfulness: {faith}")
-        lines.append(f"  Chunks used : {len(sources)}")
 
+def parse_cases(lines: list) -> list:
+    """
+    One case per line: `question` or `question || source#chunk, source#chunk`.
+    Gold chunks are optional; recall@k and MRR are computed over labelled cases only.
+    """
+    cases = []
+    for line in lines:
+        question, _, gold = line.partition("||")
+        if question.strip():
+            cases.append({
+                "question": question.strip(),
+                "gold":     [g.strip() for g in gold.split(",") if g.strip()],
+            })
+    return cases
+
+
+def overlap_scores(answers: list, sources: list) -> np.ndarray:
+    """
+    Share of each answer's distinct words that also occur in its sources
+    (the grounding score), for the whole batch in one sparse product.
+    """
+    if not answers:
+        return np.zeros(0)
+    from sklearn.feature_extraction.text import CountVectorizer   # ~1.5s import; only evaluation needs it
+    vectorizer = CountVectorizer(tokenizer=str.split, lowercase=True, binary=True, token_pattern=None)
+    vectorizer.fit(answers + sources)
+    a = vectorizer.transform(answers)
+    s = vectorizer.transform(sources)
+    shared = np.asarray(a.multiply(s).sum(axis=1)).ravel()
+    return shared / np.maximum(np.asarray(a.sum(axis=1)).ravel(), 1)
+
+
+def retrieval_metrics(retrieved: list, gold: list) -> tuple:
+    """
+    Returns (recall@k, reciprocal rank) of the gold chunk keys within `retrieved`:
+    one key, or a set of keys (a chunk and its duplicates), per rank.
+    """
+    gold  = set(gold)
+    ranks = [keys if isinstance(keys, (set, frozenset)) else {keys} for keys in retrieved]
+    hits  = [rank for rank, keys in enumerate(ranks, 1) if keys & gold]
+    found = set().union(*ranks) & gold
+    return len(found) / len(gold), (1 / hits[0] if hits else 0.0)
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    return {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def _fingerprint(retriever) -> str:
+    from .rag_chain import _index_fingerprint
+    return _index_fingerprint(retriever)
+
+
+def _cached_retrieval(key):
+    with _retrieval_cache_lock:
+        docs = _retrieval_cache.get(key)
+        if docs is not None:
+            _retrieval_cache.move_to_end(key)
+        return docs
+
+
+def _remember_retrieval(key, docs: list):
+    global _retrieval_listening
+    with _retrieval_cache_lock:
+        if not _retrieval_listening:
+            from .vector_store import on_index_change
+            on_index_change(clear_retrieval_cache)
+            _retrieval_listening = True
+        _retrieval_cache[key] = docs
+        _retrieval_cache.move_to_end(key)
+        while len(_retrieval_cache) > EVAL_RETRIEVAL_CACHE_SIZE:
+            _retrieval_cache.popitem(last=False)
+
+
+def clear_retrieval_cache():
+    with _retrieval_cache_lock:
+        _retrieval_cache.clear()
+
+
+async def _run_case(case: dict, rag_chain, condense_chain, retriever, retrieval_only: bool) -> dict:
+    from .rag_chain import arun_rag
+
+    key   = (_fingerprint(retriever), case["question"])
+    start = time.perf_counter()
+    try:
+        if retrieval_only:
+            docs = _cached_retrieval(key)
+            cache_hit = "retrieval" if docs is not None else None
+            if docs is None:
+                docs = await retriever.ainvoke(case["question"])
+                _remember_retrieval(key, docs)
+            result = {"answer": "", "source_documents": docs, "cache_hit": cache_hit,
+                      "timings": {"retrieve": (time.perf_counter() - start) * 1000}}
+        else:
+            # Bypass the answer cache: a cached answer would report ~0 ms and skew the latency percentiles.
+            result = await arun_rag(rag_chain, condense_chain, retriever, case["question"], "", use_cache=False)
+            if result["source_documents"]:
+                _remember_retrieval(key, result["source_documents"])
+    except Exception as e:
+        result = {"answer": "", "source_documents": [], "cache_hit": None, "timings": {}, "error": str(e)}
+    result["latency"] = time.perf_counter() - start
+    return result
+
+
+async def aevaluate(cases: list, rag_chain, condense_chain, retriever,
+                    concurrency: int = EVAL_CONCURRENCY, retrieval_only: bool = False) -> dict:
+    """
+    Runs every case through `arun_rag`, bypassing the answer cache (or the
+    retriever alone when `retrieval_only`), at most `concurrency` at a time,
+    and returns the JSON-serializable report.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(case):
+        async with semaphore:
+            return await _run_case(case, rag_chain, condense_chain, retriever, retrieval_only)
+
+    wall_start = time.perf_counter()
+    results    = await asyncio.gather(*(bounded(c) for c in cases))
+    wall       = time.perf_counter() - wall_start
+
+    answers = [str(r["answer"]) for r in results]
+    # Faithfulness is judged against what the LLM was given; answers cached before
+    # `context_documents` existed fall back to the retrieved chunks.
+    sources = [" ".join(d.page_content for d in r.get("context_documents", r["source_documents"])) for r in results]
+    faith   = overlap_scores(answers, sources) if not retrieval_only else np.zeros(len(results))
+
+    rows, recalls, rranks, stage_ms = [], [], [], {}
+    for case, result, answer, score in zip(cases, results, answers, faith):
+        retrieved = [chunk_key(d) for d in result["source_documents"]]
+        row = {
+            "question":    case["question"],
+            "answer":      answer,
+            "latency_s":   round(result["latency"], 3),
+            "timings_ms":  {k: round(v, 3) for k, v in result["timings"].items()},
+            "cache_hit":   result["cache_hit"],
+            "chunks_used": len(retrieved),
+            "retrieved":   retrieved,
+        }
+        if not retrieval_only:
+            row["faithfulness"] = round(float(score), 3)
+        if case["gold"]:
+            recall, rr = retrieval_metrics([chunk_keys(d) for d in result["source_documents"]], case["gold"])
+            recalls.append(recall)
+            rranks.append(rr)
+            row.update(gold=case["gold"], recall_at_k=round(recall, 3), reciprocal_rank=round(rr, 3))
+        if "error" in result:
+            row["error"] = result["error"]
+        else:
+            for stage, ms in result["timings"].items():
+                stage_ms.setdefault(stage, []).append(ms)
+        rows.append(row)
+
+    ok = [r for r in rows if "error" not in r]
+    summary = {
+        "questions":       len(rows),
+        "errors":          len(rows) - len(ok),
+        "mode":            "retrieval" if retrieval_only else "rag",
+        "concurrency":     concurrency,
+        "wall_s":          round(wall, 3),
+        "throughput_qps":  round(len(rows) / wall, 3) if wall > 0 else 0.0,
+        "latency_s":       _percentiles([r["latency_s"] for r in ok]),
+        "stage_ms":        {stage: _percentiles(values) for stage, values in stage_ms.items()},
+        "cache_hits":      sum(1 for r in ok if r["cache_hit"]),
+    }
+    if not retrieval_only:
+        summary["faithfulness_mean"] = round(float(np.mean([r["faithfulness"] for r in ok])), 3) if ok else 0.0
+    if recalls:
+        summary.update(labelled=len(recalls), k=max(r["chunks_used"] for r in rows),
+                       recall_at_k=round(float(np.mean(recalls)), 3), mrr=round(float(np.mean(rranks)), 3))
+    return {"summary": summary, "results": rows}
+
+
+def evaluate(cases: list, rag_chain, condense_chain, retriever,
+             concurrency: int = EVAL_CONCURRENCY, retrieval_only: bool = False) -> dict:
+    """Blocking wrapper around `aevaluate`. `cases` may be plain question strings."""
+    cases = [parse_cases([c])[0] if isinstance(c, str) else c for c in cases]
+    return asyncio.run(aevaluate(cases, rag_chain, condense_chain, retriever, concurrency, retrieval_only))
+
+
+def save_report(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def format_report(report: dict) -> str:
+    """The human-readable text report shown in the Evaluate tab."""
+    summary = report["summary"]
+    lines   = ["=" * 55, "  EVALUATION REPORT", "=" * 55]
+
+    for i, row in enumerate(report["results"], 1):
+        lines.append(f"\nQ{i}: {row['question']}")
+        if "error" in row:
+            lines.append(f"  Error       : {row['error']}")
+            continue
+        if row["answer"]:
+            lines.append(f"  Answer      : {row['answer'][:150]}...")
+        lines.append(f"  Time        : {row['latency_s']}s" + (f" (cache: {row['cache_hit']})" if row["cache_hit"] else ""))
+        if "faithfulness" in row:
+            lines.append(f"  Faithfulness: {row['faithfulness']}")
+        lines.append(f"  Chunks used : {row['chunks_used']}")
+        if "recall_at_k" in row:
+            lines.append(f"  Recall@k    : {row['recall_at_k']}  RR: {row['reciprocal_rank']}")
+
+    latency = summary["latency_s"]
     lines += [
         "\n" + "-" * 55,
-        f"  Avg time: {round(total_time / max(len(questions), 1), 2)}s",
-        "=" * 55,
+        f"  Questions : {summary['questions']} ({summary['errors']} errors), concurrency {summary['concurrency']}",
+        f"  Wall time : {summary['wall_s']}s, {summary['throughput_qps']} questions/s",
     ]
+    if latency:
+        lines.append(f"  Latency   : p50 {latency['p50']}s  p90 {latency['p90']}s  p99 {latency['p99']}s")
+    for stage, pct in summary["stage_ms"].items():
+        lines.append(f"  {stage:<10}: p50 {pct['p50']}ms  p90 {pct['p90']}ms  p99 {pct['p99']}ms")
+    if "faithfulness_mean" in summary:
+        lines.append(f"  Faithfulness (mean): {summary['faithfulness_mean']}")
+    if "recall_at_k" in summary:
+        lines.append(f"  Recall@{summary['k']}: {summary['recall_at_k']}  MRR: {summary['mrr']}  ({summary['labelled']} labelled)")
+    lines.append("=" * 55)
     return "\n".join(lines)
@@ -1,34 +1,81 @@
+import logging
+import random
 import re
+from functools import lru_cache
+from . import metrics
+from ..config import GUARDRAIL_CACHE_SIZE, GUARDRAIL_LOG_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
 
 HARD_BLOCK_PATTERNS = [
-    r"ignore\s+(previous|all|your|prior)\s+(instructions?|prompts?|rules?|context)",
-    r"(you are now|pretend you are|act as if you are|forget you are)",
-    r"(jailbreak|bypass|override|disable)\s+(your|the|all)?\s*(safety|filter|guardrail|restriction|rule)",
-    r"(generate|write|create|produce)\s+.{0,30}(malware|virus|exploit|ransomware|keylogger|trojan)",
-    r"(hack|exploit|attack|crack|break into)\s+\w+",
-    r"how\s+(do\s+i|to)\s+(make|build|create|synthesize)\s+.{0,30}(bomb|weapon|explosive|poison|drug)",
-    r"(give me|show me|provide)\s+.{0,30}(illegal|stolen|confidential|classified)\s+(data|info|document|access)",
+    ("ignore_instructions", r"ignore\s+(previous|all|your|prior)\s+(instructions?|prompts?|rules?|context)"),
+    ("persona_override",    r"(you are now|pretend you are|act as if you are|forget you are)"),
+    ("disable_safety",      r"(jailbreak|bypass|override|disable)\s+(your|the|all)?\s*(safety|filter|guardrail|restriction|rule)"),
+    ("malware",             r"(generate|write|create|produce)\s+.{0,30}(malware|virus|exploit|ransomware|keylogger|trojan)"),
+    ("hacking",             r"(hack|exploit|attack|crack|break into)\s+\w+"),
+    ("weapons",             r"how\s+(do\s+i|to)\s+(make|build|create|synthesize)\s+.{0,30}(bomb|weapon|explosive|poison|drug)"),
+    ("illicit_data",        r"(give me|show me|provide)\s+.{0,30}(illegal|stolen|confidential|classified)\s+(data|info|document|access)"),
 ]
 
 CHIT_CHAT_PATTERNS = [
-    r"^(hi+|hello+|hey+|sup|yo|howdy|hiya|what'?s\s+up)[!?.]*$",
-    r"^(good\s+(morning|afternoon|evening|night))[!?.]*$",
-    r"(tell\s+me\s+a\s+joke|make\s+me\s+laugh|say\s+something\s+funny)",
-    r"(sing\s+(me\s+)?a\s+song|write\s+(me\s+)?a\s+poem|write\s+(me\s+)?a\s+haiku)",
-    r"(what'?s?\s+(the\s+)?(current\s+)?(weather|temperature|forecast)\s+(in|today|now|like))",
-    r"(what\s+(time|day|date)\s+is\s+it)",
-    r"(who\s+(are\s+you|made\s+you|created\s+you|built\s+you|is\s+your\s+(creator|developer|maker)))",
-    r"(what'?s?\s+your\s+(name|favorite|opinion\s+on|hobby|age))",
-    r"(do\s+you\s+(like|love|hate|enjoy|have\s+feelings|feel))",
-    r"(are\s+you\s+(human|a\s+robot|sentient|alive|conscious|real))",
-    r"(recommend\s+(me\s+)?(a\s+)?(movie|show|series|game|book|song|restaurant)\s+to)",
-    r"(how\s+(do\s+i\s+)?(cook|bake|make|prepare)\s+\w+)",   # cooking questions
-    r"(what'?s?\s+the\s+(score|result)\s+of\s+.{0,30}(game|match|fight))",
-    r"(who\s+won\s+the\s+(super\s+bowl|world\s+cup|championship|election))",
-    r"(translate\s+.{0,30}\s+to\s+(arabic|french|spanish|german|chinese|japanese))",
+    ("greeting",        r"^(hi+|hello+|hey+|sup|yo|howdy|hiya|what'?s\s+up)[!?.]*$"),
+    ("time_greeting",   r"^(good\s+(morning|afternoon|evening|night))[!?.]*$"),
+    ("joke",            r"(tell\s+me\s+a\s+joke|make\s+me\s+laugh|say\s+something\s+funny)"),
+    ("creative",        r"(sing\s+(me\s+)?a\s+song|write\s+(me\s+)?a\s+poem|write\s+(me\s+)?a\s+haiku)"),
+    ("weather",         r"(what'?s?\s+(the\s+)?(current\s+)?(weather|temperature|forecast)\s+(in|today|now|like))"),
+    ("time",            r"(what\s+(time|day|date)\s+is\s+it)"),
+    ("identity",        r"(who\s+(are\s+you|made\s+you|created\s+you|built\s+you|is\s+your\s+(creator|developer|maker)))"),
+    ("personal",        r"(what'?s?\s+your\s+(name|favorite|opinion\s+on|hobby|age))"),
+    ("feelings",        r"(do\s+you\s+(like|love|hate|enjoy|have\s+feelings|feel))"),
+    ("sentience",       r"(are\s+you\s+(human|a\s+robot|sentient|alive|conscious|real))"),
+    ("recommendation",  r"(recommend\s+(me\s+)?(a\s+)?(movie|show|series|game|book|song|restaurant)\s+to)"),
+    ("cooking",         r"(how\s+(do\s+i\s+)?(cook|bake|make|prepare)\s+\w+)"),
+    ("sports_score",    r"(what'?s?\s+the\s+(score|result)\s+of\s+.{0,30}(game|match|fight))"),
+    ("sports_winner",   r"(who\s+won\s+the\s+(super\s+bowl|world\s+cup|championship|election))"),
+    ("translation",     r"(translate\s+.{0,30}\s+to\s+(arabic|french|spanish|german|chinese|japanese))"),
 ]
 
 
+def _compile(rules: list) -> list:
+    """
+    Precompile each rule once. Rules stay separate rather than being joined into
+    one alternation: a single big alternation defeats the regex engine's
+    literal-prefix scan and is several times slower on unseen queries.
+    """
+    return [(name, re.compile(pattern)) for name, pattern in rules]
+
+
+_HARD_BLOCK_RULES = _compile(HARD_BLOCK_PATTERNS)
+_CHIT_CHAT_RULES  = _compile(CHIT_CHAT_PATTERNS)
+
+_VERDICTS = {
+    None: (True, "Query allowed — will be answered from document context."),
+    "hard_block": (False, "Query contains harmful, adversarial, or prompt-injection content."),
+    "chit_chat": (False, (
+        "Your question appears to be general chit-chat unrelated to the document. "
+        "Please ask something about the uploaded document."
+    )),
+}
+
+
+@lru_cache(maxsize=GUARDRAIL_CACHE_SIZE)
+def _classify(q: str) -> tuple:
+    """Returns (category, rule) for a normalized query; (None, None) if allowed."""
+    for category, rules in (("hard_block", _HARD_BLOCK_RULES), ("chit_chat", _CHIT_CHAT_RULES)):
+        for name, regex in rules:
+            if regex.search(q):
+                return category, name
+    return None, None
+
+
+def _collect() -> list:
+    info = _classify.cache_info()
+    return metrics.cache_metrics("guardrail", info.hits, info.misses)
+
+
+metrics.register_collector(_collect)
+
+
 class SemanticGuardrail:
     """
     A lightweight, document-agnostic guardrail that uses regex pattern matching
@@ -52,44 +99,38 @@ class SemanticGuardrail:
                 - is_allowed (bool)
                 - score      (float: 0.0 = blocked, 1.0 = allowed)
                 - reason     (str: human-readable explanation)
+                - category   (str | None: "hard_block", "chit_chat" or None)
+                - rule       (str | None: name of the rule that matched)
         """
         if not query or not query.strip():
             return {
                 "is_allowed": True,
                 "score": 1.0,
                 "reason": "Empty query passed through.",
+                "category": None,
+                "rule": None,
             }
 
-        q = query.lower().strip()
-
-        for pattern in HARD_BLOCK_PATTERNS:
-            if re.search(pattern, q):
-                print(f"[Guardrails] HARD BLOCK matched pattern '{pattern}' on query: '{query}'")
-                return {
-                    "is_allowed": False,
-                    "score": 0.0,
-                    "reason": "Query contains harmful, adversarial, or prompt-injection content.",
-                }
-
-        for pattern in CHIT_CHAT_PATTERNS:
-            if re.search(pattern, q):
-                print(f"[Guardrails] CHIT-CHAT matched pattern '{pattern}' on query: '{query}'")
-                return {
-                    "is_allowed": False,
-                    "score": 0.0,
-                    "reason": (
-                        "Your question appears to be general chit-chat unrelated to the document. "
-                        "Please ask something about the uploaded document."
-                    ),
-                }
-
-        print(f"[Guardrails] ALLOWED query: '{query}'")
+        category, rule = _classify(query.lower().strip())
+        is_allowed, reason = _VERDICTS[category]
+
+        if not is_allowed:
+            logger.info("guardrail verdict=blocked category=%s rule=%s query=%r", category, rule, query)
+        elif GUARDRAIL_LOG_SAMPLE_RATE and random.random() < GUARDRAIL_LOG_SAMPLE_RATE:
+            logger.info("guardrail verdict=allowed sampled=%s query=%r", GUARDRAIL_LOG_SAMPLE_RATE, query)
+
         return {
-            "is_allowed": True,
-            "score": 1.0,
-            "reason": "Query allowed — will be answered from document context.",
+            "is_allowed": is_allowed,
+            "score": 1.0 if is_allowed else 0.0,
+            "reason": reason,
+            "category": category,
+            "rule": rule,
         }
 
+    def check_many(self, queries: list) -> list:
+        """Batch form of `check`, e.g. for screening an evaluation question set."""
+        return [self.check(q) for q in queries]
+
 
 _guardrail_instance = None
 
@@ -98,5 +139,6 @@ def get_guardrail() -> SemanticGuardrail:
     global _guardrail_instance
     if _guardrail_instance is None:
         _guardrail_instance = SemanticGuardrail()
-        print("[Guardrails] Pattern-based guardrail initialized (no training required).")
+        logger.info("Pattern-based guardrail initialized (%d hard-block, %d chit-chat rules).",
+                    len(HARD_BLOCK_PATTERNS), len(CHIT_CHAT_PATTERNS))
     return _guardrail_instance
\ No newline at end of file
@@ -0,0 +1,66 @@
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from ..config import TOP_K, HYBRID_FETCH_K, RRF_K
+
+_lexical_pool = None
+
+
+def reciprocal_rank_fusion(rankings: list, k: int, rrf_k: int = RRF_K) -> list:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank). Returns the top `k` ids."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense (FAISS) and lexical (BM25) retrieval over the same chunks, fused with
+    reciprocal rank fusion. Both searches run concurrently and return chunk
+    ids only; the docstore is read for the `k` fused hits alone.
+
+    Exposes `vectorstore` like the plain FAISS retriever, so answer-cache
+    fingerprinting and query-embedding reuse work unchanged.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    lexical: Any
+    k: int = TOP_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+
+    def _dense_ids(self, query: str) -> list:
+        vs = self.vectorstore
+        vector = np.asarray([vs.embeddings.embed_query(query)], dtype=np.float32)
+        _, positions = vs.index.search(vector, self.fetch_k)
+        return [vs.index_to_docstore_id[int(p)] for p in positions[0] if p >= 0]
+
+    def _lexical_ids(self, query: str) -> list:
+        return [doc_id for doc_id, _ in self.lexical.search(query, self.fetch_k)]
+
+    def _documents(self, dense: list, lexical: list) -> list:
+        docstore = self.vectorstore.docstore
+        return [docstore.search(doc_id) for doc_id in reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> list:
+        global _lexical_pool
+        if _lexical_pool is None:
+            _lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+        lexical = _lexical_pool.submit(self._lexical_ids, query)
+        dense   = self._dense_ids(query)
+        return self._documents(dense, lexical.result())
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        dense, lexical = await asyncio.gather(
+            asyncio.to_thread(self._dense_ids, query),
+            asyncio.to_thread(self._lexical_ids, query),
+        )
+        return self._documents(dense, lexical)
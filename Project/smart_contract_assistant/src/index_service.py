@@ -0,0 +1,230 @@
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .ingestion import ingest_documents
+from .rag_chain import build_rag_chain
+from .shards import ShardedIndex
+from .vector_store import (
+    IndexManager, current_index_dir, load_vector_store, load_lexical_index, read_index_version, warm_up_embeddings,
+)
+from ..config import (
+    FAISS_DIR, INDEX_LOAD_MODE, INDEX_RELOAD_INTERVAL, INGEST_JOB_HISTORY, SHARD_BY, SHARDS_DIR, STARTUP_WARMUP,
+    WARMUP_QUERY
+)
+
+
+class IndexService:
+    """
+    The read-only index snapshot a server process answers from, plus
+    background ingestion.
+
+    A snapshot is the loaded index and the chains built over it, published by
+    swapping one reference: requests take `current` once and finish on that
+    snapshot even if a newer one is published meanwhile. New versions come
+    from this process's ingest jobs or, via a poll of `version.json`, from
+    any other process that saved the index (other workers, the Gradio UI).
+
+    With SHARD_BY set, the snapshot is a ShardedIndex over SHARDS_DIR: shards
+    load lazily, and a new manifest version keeps unchanged shards loaded.
+
+    `start()` returns at once; the first load and the warm-up (embedding model
+    plus one search) run on a background thread, so the server is listening
+    meanwhile and reports ready only once they are done.
+    """
+
+    def __init__(self, index_dir: str = None, mode: str = INDEX_LOAD_MODE,
+                 reload_interval: float = INDEX_RELOAD_INTERVAL, shard_by: str = SHARD_BY,
+                 warmup: bool = STARTUP_WARMUP):
+        self.shard_by        = shard_by
+        self.index_dir       = index_dir or (SHARDS_DIR if shard_by else FAISS_DIR)
+        self.mode            = mode
+        self.reload_interval = reload_interval
+        self.warmup          = warmup
+        self.current         = None
+        self._started        = threading.Event()   # first load (and warm-up) finished
+        self._load_lock      = threading.Lock()
+        self._jobs           = {}
+        self._jobs_lock      = threading.Lock()
+        self._executor       = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+        self._stop           = threading.Event()
+        self._watcher        = None
+        self._manager        = None   # writable in-memory copy, loaded by the first ingest job
+
+    def start(self, background: bool = True):
+        """Load the saved index if there is one, warm up, and start watching for new versions."""
+        if background:
+            threading.Thread(target=self._startup, name="index-startup", daemon=True).start()
+        else:
+            self._startup()
+        if self.reload_interval > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="index-watcher", daemon=True)
+            self._watcher.start()
+
+    def _startup(self):
+        start = time.perf_counter()
+        try:
+            self.reload()
+            metrics.observe("index_load", time.perf_counter() - start, family="startup_seconds")
+        except Exception as e:
+            print(f"[IndexService] Could not load '{self.index_dir}': {e}")
+        if self.warmup:
+            self.warm_up()
+        self._started.set()
+
+    def warm_up(self):
+        """Load the embedding model and run one search on the current snapshot, so the first request pays neither."""
+        start = time.perf_counter()
+        try:
+            warm_up_embeddings()
+            snapshot = self.current
+            if snapshot is not None:
+                snapshot["retriever"].invoke(WARMUP_QUERY)
+        except Exception as e:
+            print(f"[IndexService] Warm-up failed: {e}")
+            return
+        metrics.observe("warm_up", time.perf_counter() - start, family="startup_seconds")
+        print(f"[IndexService] Warmed up in {time.perf_counter() - start:.2f}s.")
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[IndexService] Reload failed, still serving the previous snapshot: {e}")
+
+    def reload(self, force: bool = False) -> bool:
+        """Publish the saved index if its version differs from the current snapshot's. Returns True if swapped."""
+        with self._load_lock:
+            path    = self.index_dir if self.shard_by else current_index_dir(self.index_dir)
+            version = read_index_version(path)
+            if version is None:
+                return False
+            current = self.current
+            if not force and current is not None and current["version"] == version:
+                return False
+
+            start = time.perf_counter()
+            if self.shard_by:
+                previous     = current["vector_store"] if current else None
+                vector_store = ShardedIndex(self.index_dir, self.shard_by, mode=self.mode, reuse=previous)
+                lexical      = None
+            else:
+                vector_store = load_vector_store(path, mode=self.mode)
+                lexical      = load_lexical_index(path, vector_store)
+            rag_chain, condense_chain, retriever = build_rag_chain(vector_store, lexical)
+            self.current = {
+                "version":        version,
+                "vector_store":   vector_store,
+                "rag_chain":      rag_chain,
+                "condense_chain": condense_chain,
+                "retriever":      retriever,
+                "loaded_at":      time.time(),
+            }
+        print(f"[IndexService] Serving index version {version.get('version')} "
+              f"({_chunks(self.current)} chunks), loaded in {time.perf_counter() - start:.2f}s.")
+        return True
+
+    def status(self) -> dict:
+        """Readiness report: whether an index is served, its version and size."""
+        snapshot = self.current
+        with self._jobs_lock:
+            running = sum(job["status"] in ("queued", "running") for job in self._jobs.values())
+        if snapshot is None or not self._started.is_set():
+            return {"ready": False, "starting": not self._started.is_set(), "ingest_jobs_running": running}
+        status = {
+            "ready":               True,
+            "version":             snapshot["version"].get("version"),
+            "saved_at":            snapshot["version"].get("saved_at"),
+            "index_type":          snapshot["version"].get("index_type"),
+            "chunks":              _chunks(snapshot),
+            "load_mode":           self.mode,
+            "loaded_at":           snapshot["loaded_at"],
+            "ingest_jobs_running": running,
+        }
+        if self.shard_by:
+            stats = snapshot["vector_store"].stats()
+            status.update(shard_by=self.shard_by, shards=stats["shards"], shards_loaded=stats["loaded"],
+                          shards_loaded_mb=stats["loaded_mb"])
+        return status
+
+    def submit_ingest(self, paths: list, cleanup_dir: str = None, tenant: str = None) -> str:
+        """
+        Queue ingestion of `paths` into the saved index; jobs run one at a time
+        in the background and publish the new version when done. `cleanup_dir`
+        (e.g. the upload temp dir) is removed afterwards. `tenant` is stored in
+        the chunks' metadata (and picks the shard when SHARD_BY="tenant").
+        Returns the job id.
+        """
+        job_id = uuid.uuid4().hex
+        with self._jobs_lock:
+            self._jobs[job_id] = {"id": job_id, "status": "queued", "files": [os.path.basename(p) for p in paths],
+                                  "submitted_at": time.time()}
+            finished = [i for i, job in self._jobs.items() if job["status"] in ("done", "failed")]
+            for old in finished[:max(0, len(self._jobs) - INGEST_JOB_HISTORY)]:
+                del self._jobs[old]
+        self._executor.submit(self._ingest, job_id, paths, cleanup_dir, tenant)
+        return job_id
+
+    def _ingest(self, job_id: str, paths: list, cleanup_dir: str, tenant: str = None):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            docs  = ingest_documents(paths)
+            if tenant:
+                for d in docs:
+                    d.metadata["tenant"] = tenant
+            if self._manager is None:
+                self._manager = ShardedIndex(self.index_dir, self.shard_by) if self.shard_by else IndexManager(self.index_dir)
+            stats = self._manager.upsert(docs)
+            self.reload()
+            self._update(job_id, status="done", chunks=len(docs), **stats)
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            self._update(job_id, finished_at=time.time())
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _update(self, job_id: str, **fields):
+        with self._jobs_lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def job(self, job_id: str):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+def _chunks(snapshot: dict) -> int:
+    vs = snapshot["vector_store"]
+    return vs.ntotal if isinstance(vs, ShardedIndex) else vs.index.ntotal
+
+
+_service = None
+
+def get_index_service() -> IndexService:
+    global _service
+    if _service is None:
+        _service = IndexService()
+        metrics.register_collector(_collect)
+    return _service
+
+def _collect() -> list:
+    status = _service.status()
+    return [
+        ("index_ready",        "gauge", "1 once an index snapshot is served.", [({}, int(status["ready"]))]),
+        ("index_version",      "gauge", "Version of the served index.",        [({}, status.get("version", 0))]),
+        ("index_chunks",       "gauge", "Chunks in the served index.",         [({}, status.get("chunks", 0))]),
+        ("index_shards",       "gauge", "Shards in the served index (0 = unsharded).", [({}, status.get("shards", 0))]),
+        ("index_shards_loaded", "gauge", "Shards currently loaded in this worker.",     [({}, status.get("shards_loaded", 0))]),
+        ("ingest_jobs_running", "gauge", "Queued or running ingest jobs.",      [({}, status["ingest_jobs_running"])]),
+    ]
@@ -1,53 +1,361 @@
-
+import itertools
+import os
 import pathlib
-import pdfplumber
-from docx import Document as DocxDocument
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.runnables import RunnableLambda
-from ..config import CHUNK_SIZE, CHUNK_OVERLAP
+from . import metrics
+from ..config import CHUNK_SIZE, CHUNK_OVERLAP, INGEST_WORKERS, PDF_PAGES_PER_TASK, STRUCTURED_CHUNKING
 
-def extract_text(file_path: str) -> str:
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+# pdfplumber and python-docx are imported by the functions that parse files,
+# so importing this module (e.g. at server start) does not load them.
+
+# Headings (see is_heading): a label - "ARTICLE IV", "Schedule 3", "Annex B", "Clause 12.1",
+# "4.", "4.2" - followed by a short title, or an all-caps title on its own.
+_HEADING_LABEL_RE = re.compile(
+    r"(?:(?i:article|section|clause|schedule|annex|appendix|exhibit|part)\s+(?:\d+(?:\.\d+)*[A-Z]?|[IVXLC]+|[A-Z])"
+    r"|(?P<number>\d{1,2}(?:\.\d{1,2})*\.|\d{1,2}(?:\.\d{1,2})+))"
+    r"(?=[\s.:-]|$)"
+)
+_CAPS_TITLE_RE  = re.compile(r"[A-Z][A-Z&()'/ -]{3,}")   # "TERMINATION", "FORCE MAJEURE"; no digits or commas
+_BARE_NUMBER_RE = re.compile(r"\d{1,2}\s+")             # "12 NOTICES": only before an all-caps title
+_SMALL_WORDS    = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+_TITLE_MAX_WORDS = 8
+_HEADING_MAX = 80
+_EDGE_LINES  = 2     # lines at the top and bottom of a page checked for running headers/footers
+_RUNNING_SHARE = 0.5  # ... which are dropped when they recur on more than this share of the sampled pages
+_RUNNING_SAMPLE = 12  # first pages of each PDF sampled (and buffered) to find them
+# "Page 3", "page 3 of 12", "3 / 12", "- 3 -": normalized so page numbers do not make running lines differ.
+_PAGE_NUMBER_RE = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?|^[\W_]*\d+(?:\s*(?:of|/)\s*\d+)?[\W_]*$")
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> list:
+    """Extract pages [start, stop) as (page_number, "text", text) blocks. Runs in a worker process."""
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [(i + 1, "text", pdf.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def _table_text(table) -> str:
+    """One line per row, cells joined by " | "; a merged cell (repeated by python-docx) appears once."""
+    lines = []
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            text = " ".join(cell.text.split())
+            if not cells or text != cells[-1]:
+                cells.append(text)
+        if any(cells):
+            lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+def _extract_docx(file_path: str) -> list:
+    """Paragraphs and tables in document order as (None, kind, text) blocks; kind is heading, text or table."""
+    from docx import Document as DocxDocument
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    doc, blocks = DocxDocument(file_path), []
+    for element in doc.element.body.iterchildren():
+        if element.tag.endswith("}tbl"):
+            text = _table_text(Table(element, doc))
+            if text:
+                blocks.append((None, "table", text))
+        elif element.tag.endswith("}p"):
+            paragraph = Paragraph(element, doc)
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            style = paragraph.style.name if paragraph.style is not None else ""
+            blocks.append((None, "heading" if style.startswith("Heading") or style == "Title" else "text", text))
+    return blocks
+
+def _page_tasks(file_path: str):
+    """Split one file into extraction tasks of at most PDF_PAGES_PER_TASK pages."""
     ext = pathlib.Path(file_path).suffix.lower()
     if ext == ".pdf":
-        pages = []
+        import pdfplumber
         with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                t = page.extract_text()
-                if t:
-                    pages.append(t)
-        return "\n\n".join(pages)
+            n_pages = len(pdf.pages)
+        for start in range(0, n_pages, PDF_PAGES_PER_TASK):
+            yield _extract_pdf_pages, (file_path, start, min(start + PDF_PAGES_PER_TASK, n_pages))
     elif ext == ".docx":
-        doc = DocxDocument(file_path)
-        return "\n\n".join(p.text for p in doc.paragraphs if p.text.strip())
+        yield _extract_docx, (file_path,)
     else:
         raise ValueError(f"Unsupported file: {ext}")
 
+def _expand_paths(paths) -> list:
+    """Accept a file, a directory, or a list of either."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for p in map(pathlib.Path, paths):
+        if p.is_dir():
+            files += sorted(f for f in p.iterdir() if f.suffix.lower() in SUPPORTED_EXTENSIONS)
+        else:
+            files.append(p)
+    return [str(f) for f in files]
 
-def ingest_document(file_path: str) -> list:
+def iter_blocks(paths, workers: int = INGEST_WORKERS):
     """
-    LCEL Ingestion Pipeline:
-    raw_text → splitter | Document wrapper
+    Yields (file_path, page_number, kind, text) in document order: one "text"
+    block per PDF page; heading, text and table blocks for a DOCX (no pages).
+
+    workers <= 1 extracts serially in-process. Otherwise page ranges are
+    extracted by a process pool with at most 2 * workers tasks in flight, so
+    memory stays bounded no matter how large the document is. Both paths run
+    the same extraction code in the same order, so their output is identical.
     """
-    filename = pathlib.Path(file_path).name
-    raw_text = extract_text(file_path)
-    if not raw_text.strip():
-        raise ValueError(f"No text extracted from '{filename}'.")
+    tasks = ((file_path, fn, args) for file_path in _expand_paths(paths) for fn, args in _page_tasks(file_path))
+
+    if workers <= 1:
+        for file_path, fn, args in tasks:
+            for page, kind, text in fn(*args):
+                yield file_path, page, kind, text
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for file_path, fn, args in tasks:
+            in_flight.append((file_path, executor.submit(fn, *args)))
+            if len(in_flight) >= 2 * workers:
+                done_path, future = in_flight.popleft()
+                for page, kind, text in future.result():
+                    yield done_path, page, kind, text
+        while in_flight:
+            done_path, future = in_flight.popleft()
+            for page, kind, text in future.result():
+                yield done_path, page, kind, text
+
+def iter_pages(paths, workers: int = INGEST_WORKERS):
+    """Yields (file_path, page_number, text) in document order; a DOCX is one page with its blocks joined."""
+    current, parts = None, []
+    for file_path, page, _, text in iter_blocks(paths, workers):
+        if (file_path, page) != current:
+            if current is not None:
+                yield (*current, "\n\n".join(parts))
+            current, parts = (file_path, page), []
+        parts.append(text)
+    if current is not None:
+        yield (*current, "\n\n".join(parts))
+
+def extract_text(file_path: str) -> str:
+    return "\n\n".join(text for _, _, text in iter_pages(file_path, workers=1) if text)
+
+
+def _is_title(text: str) -> bool:
+    """"Payment Terms", "Limitation of Liability": capitalized words, not a wrapped sentence."""
+    words = text.split()
+    if not words or len(words) > _TITLE_MAX_WORDS or text[-1] in ",;" or words[-1].lower() in _SMALL_WORDS:
+        return False
+    return words[0][0].isupper() and all(
+        word[0].isupper() or word[0].isdigit() or word[0] in "(\"'" or word in _SMALL_WORDS for word in words
+    )
+
+def is_heading(line: str) -> bool:
+    """
+    A short line on its own that reads like a contract heading: "ARTICLE IV",
+    "Schedule 3 - Pricing", "4. Payment Terms", "12.1 Notices", "TERMINATION".
+    Wrapped body lines are not: "30 Business Days after receipt of the", "USD 10,000".
+    """
+    line = line.strip()
+    if not 0 < len(line) <= _HEADING_MAX:
+        return False
+    if _CAPS_TITLE_RE.fullmatch(line):
+        return True
+    label = _HEADING_LABEL_RE.match(line)
+    if label is None:
+        bare = _BARE_NUMBER_RE.match(line)
+        return bare is not None and _CAPS_TITLE_RE.fullmatch(line[bare.end():]) is not None
+    title = line[label.end():].strip(" .:-\u2013\u2014")
+    if not title:
+        return label.group("number") is None   # "ARTICLE 4" alone, but not a bare "4.2"
+    return _is_title(title) or _CAPS_TITLE_RE.fullmatch(title) is not None
+
+def _units(blocks):
+    """Merge consecutive heading/text blocks of one page (or DOCX) into a unit: (file_path, page, kind, [(text, is_heading)])."""
+    unit = None
+    for file_path, page, kind, text in blocks:
+        if unit and kind != "table" and unit[2] != "table" and unit[:2] == (file_path, page):
+            unit[3].append((text, kind == "heading"))
+            continue
+        if unit:
+            yield unit
+        unit = (file_path, page, "table" if kind == "table" else "text", [(text, kind == "heading")])
+    if unit:
+        yield unit
 
+def _edge_keys(lines: list) -> dict:
+    """{line index: (edge, key)} for the short lines at a page's top and bottom; only page numbers are normalized."""
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    edges   = {**{i: "bottom" for i in content[-_EDGE_LINES:]}, **{i: "top" for i in content[:_EDGE_LINES]}}
+    return {
+        i: (edge, _PAGE_NUMBER_RE.sub("#", " ".join(lines[i].split()).lower()))
+        for i, edge in edges.items() if len(lines[i].strip()) <= _HEADING_MAX
+    }
+
+def _without_running_lines(units):
+    """
+    Drop running headers and footers from PDFs: short lines at the same edge
+    of more than _RUNNING_SHARE of the first _RUNNING_SAMPLE pages of a file,
+    with the same text apart from page numbers ("Page 3 of 12"). Only that
+    sample is buffered; the rest of the file streams through.
+    """
+    for _, group in itertools.groupby(units, key=lambda unit: unit[0]):
+        first = next(group)
+        if first[1] is None:   # DOCX: no pages
+            yield first
+            yield from group
+            continue
+        sample  = [first, *itertools.islice(group, _RUNNING_SAMPLE - 1)]
+        counts  = Counter(key for unit in sample for key in set(_edge_keys(unit[3][0][0].split("\n")).values()))
+        limit   = max(2, int(_RUNNING_SHARE * len(sample)) + 1)
+        running = {key for key, n in counts.items() if n >= limit}
+        for file_path, page, kind, items in itertools.chain(sample, group):
+            lines = items[0][0].split("\n")
+            keys  = _edge_keys(lines)
+            kept  = [line for i, line in enumerate(lines) if keys.get(i) not in running]
+            yield file_path, page, kind, [("\n".join(kept), False)]
+
+def _sections(lines: list, section, sep: str) -> tuple:
+    """
+    Split (line, is_heading) pairs at headings into (section, text) segments,
+    each heading opening the text it titles. Returns (segments, the section
+    still open at the end), so a section carries over to the next page.
+    """
+    segments, body, has_body = [], [], False
+    for line, heading in lines:
+        if heading:
+            if has_body:
+                segments.append((section, sep.join(body)))
+                body, has_body = [], False
+            section = f"{section} {line.strip()}" if body and section else line.strip()   # "ARTICLE 4" + "PAYMENT"
+        elif line.strip():
+            has_body = True
+        body.append(line)
+    if has_body or body:
+        segments.append((section, sep.join(body)))
+    return segments, section
+
+def _pack(segments: list, splitter) -> list:
+    """
+    (section, chunk) pairs of at most CHUNK_SIZE characters: long segments are
+    split, consecutive short ones packed into one chunk named by the first.
+    """
+    chunks, parts, size, section = [], [], 0, None
+    for seg_section, text in segments:
+        pieces = [text.strip()] if len(text) <= CHUNK_SIZE else splitter.split_text(text)
+        for piece in filter(None, pieces):
+            if parts and size + len(piece) > CHUNK_SIZE:
+                chunks.append((section, "\n\n".join(parts)))
+                parts, size = [], 0
+            if not parts:
+                section = seg_section
+            parts.append(piece)
+            size += len(piece) + 2
+    if parts:
+        chunks.append((section, "\n\n".join(parts)))
+    return chunks
+
+def _table_chunks(text: str) -> list:
+    """Groups of rows of at most CHUNK_SIZE characters; each group after the first repeats the header row."""
+    header, *rows = text.split("\n")
+    chunks, current, size = [], [header], len(header)
+    for row in rows:
+        if len(current) > 1 and size + len(row) + 1 > CHUNK_SIZE:
+            chunks.append("\n".join(current))
+            current, size = [header], len(header)
+        current.append(row)
+        size += len(row) + 1
+    chunks.append("\n".join(current))
+    return chunks
+
+
+def iter_documents(paths, workers: int = INGEST_WORKERS, structured: bool = STRUCTURED_CHUNKING):
+    """
+    Streaming ingestion pipeline:
+    blocks (serial or process pool) -> chunker -> Document wrapper
+
+    Chunks carry `source`, `chunk_index` (per file) and `page` (PDF only)
+    metadata. With `structured` (STRUCTURED_CHUNKING), chunking follows the
+    document's structure:
+      - headings (DOCX heading styles, or a line passing is_heading) start
+        a new chunk unless sections are short: long sections are split on
+        their own and carry their heading as `section`; short consecutive
+        ones on a page are packed into one chunk, named by the first,
+      - DOCX tables are chunked by rows, repeating the header row, with
+        `content_type: "table"`,
+      - short lines repeated at the top or bottom of most pages of a PDF
+        (running headers, footers, page numbers) are dropped.
+    Otherwise each page is character-split as it is.
+
+    Time spent waiting for pages and splitting them is recorded as the
+    "extract" and "split" ingest stages; time the consumer spends between
+    chunks is not.
+    """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", ".", " ", ""],
     )
 
-    split_fn   = RunnableLambda(lambda text: splitter.split_text(text))
-    wrap_fn    = RunnableLambda(lambda chunks: [
-        Document(page_content=c, metadata={"source": filename, "chunk_index": i})
-        for i, c in enumerate(chunks)
-    ])
+    if structured:
+        units = _without_running_lines(_units(iter_blocks(paths, workers)))
+    else:
+        units = ((file_path, page, "text", [(text, False)]) for file_path, page, text in iter_pages(paths, workers))
+    current, chunk_index, section = None, 0, None
+    while True:
+        with metrics.span("extract"):
+            item = next(units, None)
+        if item is None:
+            break
+        file_path, page, kind, items = item
+        if file_path != current:
+            current, chunk_index, section = file_path, 0, None
+        if not any(text.strip() for text, _ in items):
+            continue
+        filename = pathlib.Path(file_path).name
+        with metrics.span("split"):
+            if not structured:
+                chunks = [(None, chunk) for chunk in splitter.split_text(items[0][0])]
+            elif kind == "table":
+                chunks = [(section, chunk) for chunk in _table_chunks(items[0][0])]
+            elif page is not None:
+                lines  = items[0][0].split("\n")
+                segments, section = _sections([(line, is_heading(line)) for line in lines], section, "\n")
+                chunks = _pack(segments, splitter)
+            else:   # DOCX paragraphs
+                segments, section = _sections([(text, heading or is_heading(text)) for text, heading in items],
+                                              section, "\n\n")
+                chunks = _pack(segments, splitter)
+        for chunk_section, chunk in chunks:
+            metadata = {"source": filename, "chunk_index": chunk_index}
+            if page is not None:
+                metadata["page"] = page
+            if chunk_section:
+                metadata["section"] = chunk_section
+            if structured and kind == "table":
+                metadata["content_type"] = "table"
+            yield Document(page_content=chunk, metadata=metadata)
+            chunk_index += 1
 
-    ingestion_chain = split_fn | wrap_fn
-    docs = ingestion_chain.invoke(raw_text)
+
+def ingest_document(file_path: str, workers: int = INGEST_WORKERS) -> list:
+    filename = pathlib.Path(file_path).name
+    docs = list(iter_documents(file_path, workers))
+    if not docs:
+        raise ValueError(f"No text extracted from '{filename}'.")
 
     print(f"[Ingestion] '{filename}' → {len(docs)} chunks")
     return docs
+
+def ingest_documents(paths, workers: int = INGEST_WORKERS) -> list:
+    """Ingest a directory or a list of files, sharing one worker pool across files."""
+    docs = list(iter_documents(paths, workers))
+    if not docs:
+        raise ValueError("No text extracted from the given files.")
+
+    print(f"[Ingestion] {len({d.metadata['source'] for d in docs})} files → {len(docs)} chunks")
+    return docs
@@ -0,0 +1,124 @@
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from ..config import BM25_K1, BM25_B
+
+LEXICAL_FILE = "bm25.json.gz"
+
+# Clause references ("4.2(b)", "12.3") stay whole, so "Section 4.2(b)" matches
+# exactly; everything else is split into words.
+_TOKEN_RE  = re.compile(r"\d+(?:\.\d+)+(?:\([a-z0-9]{1,4}\))*|\d+(?:\([a-z0-9]{1,4}\))+|\w+")
+_SUBCLAUSE = re.compile(r"\(([a-z0-9]{1,4})\)")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased words and clause numbers; "4.2(b)" also indexes its parent "4.2"."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if "(" in token:
+            tokens.append(_SUBCLAUSE.sub("", token))
+    return tokens
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring over the same chunk ids
+    as the FAISS docstore. Chunks are added and removed incrementally as the
+    index manager updates FAISS, and the postings are saved next to it.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1         = k1
+        self.b          = b
+        self._postings  = {}   # term -> {doc_id: term frequency}
+        self._doc_len   = {}   # doc_id -> tokens
+        self._doc_terms = {}   # doc_id -> distinct terms, for removal (rebuilt on load)
+        self._total     = 0
+        self._lock      = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, ids: list, texts: list):
+        """Index chunks; an id that is already indexed is replaced."""
+        with self._lock:
+            self.remove([i for i in ids if i in self._doc_len])
+            for doc_id, text in zip(ids, texts):
+                tf = Counter(tokenize(text))
+                for term, n in tf.items():
+                    self._postings.setdefault(term, {})[doc_id] = n
+                length = sum(tf.values())
+                self._doc_len[doc_id]   = length
+                self._doc_terms[doc_id] = list(tf)
+                self._total += length
+
+    def remove(self, ids: list):
+        with self._lock:
+            for doc_id in ids:
+                length = self._doc_len.pop(doc_id, None)
+                if length is None:
+                    continue
+                self._total -= length
+                for term in self._doc_terms.pop(doc_id):
+                    postings = self._postings[term]
+                    del postings[doc_id]
+                    if not postings:
+                        del self._postings[term]
+
+    def search(self, query: str, k: int, allowed=None) -> list:
+        """Returns up to `k` (doc_id, score) pairs, best first; only ids in `allowed` if given."""
+        with self._lock:
+            n = len(self._doc_len)
+            if not n:
+                return []
+            avg_len = self._total / n
+            scores  = Counter()
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, index_dir: str):
+        with self._lock:
+            payload = {"k1": self.k1, "b": self.b, "doc_len": self._doc_len, "postings": self._postings}
+            with gzip.open(os.path.join(index_dir, LEXICAL_FILE), "wt", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """The saved index, or None if `index_dir` predates the lexical index."""
+        path = os.path.join(index_dir, LEXICAL_FILE)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(payload["k1"], payload["b"])
+        index._doc_len  = payload["doc_len"]
+        index._postings = payload["postings"]
+        index._total    = sum(index._doc_len.values())
+        for term, postings in index._postings.items():
+            for doc_id in postings:
+                index._doc_terms.setdefault(doc_id, []).append(term)
+        return index
+
+    @classmethod
+    def from_vector_store(cls, vs):
+        """Build from every chunk in a FAISS store's docstore (for indexes saved without one)."""
+        index = cls()
+        ids   = list(vs.index_to_docstore_id.values())
+        index.add(ids, [vs.docstore.search(i).page_content for i in ids])
+        return index
@@ -0,0 +1,346 @@
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+import httpx
+import numpy as np
+import openai
+from langchain_community.chat_models import ChatOpenAI
+from . import metrics
+from .tokens import count_tokens
+from ..config import (
+    LLM_MODEL, MAX_TOKENS, TEMPERATURE,
+    LLM_MAX_CONCURRENCY, LLM_POOL_CONNECTIONS, LLM_TIMEOUT,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX
+)
+
+# 429, 5xx, dropped connections and timeouts; anything else (4xx) is final.
+_RETRYABLE = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+_LATENCY_WINDOW = 2048
+
+
+class ConcurrencyLimiter:
+    """
+    Process-wide cap on in-flight LLM requests, shared by worker threads and
+    by any number of event loops (each `asyncio.run` creates a new one, so an
+    `asyncio.Semaphore` cannot be shared). Slots are handed to waiters FIFO.
+    """
+
+    def __init__(self, limit: int):
+        self.limit    = limit
+        self._lock    = threading.Lock()
+        self._active  = 0
+        self._waiters = deque()
+
+    def acquire(self):
+        with self._lock:
+            if self._active < self.limit:
+                self._active += 1
+                return
+            ready = threading.Event()
+            self._waiters.append(ready.set)
+        ready.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit:
+                self._active += 1
+                return
+            granted = loop.create_future()
+
+            def wake():
+                # Cancelled after release() picked it: pass the slot on instead of leaking it.
+                if granted.done():
+                    self.release()
+                else:
+                    granted.set_result(None)
+
+            def notify():
+                try:
+                    loop.call_soon_threadsafe(wake)
+                except RuntimeError:   # the waiter's event loop is closed; nobody will take the slot
+                    self.release()
+
+            self._waiters.append(notify)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = notify in self._waiters
+                if queued:
+                    self._waiters.remove(notify)
+            if not queued and granted.done() and not granted.cancelled():
+                self.release()   # cancelled after the slot was granted, before resuming
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._active -= 1
+                return
+            wake = self._waiters.popleft()
+        wake()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": self._active, "waiting": len(self._waiters), "limit": self.limit}
+
+
+class LLMMetrics:
+    """Per-call latency and token counters for every request through the pooled client."""
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._counts    = {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, latency: float, prompt_tokens: int, completion_tokens: int, retries: int, error: bool):
+        with self._lock:
+            self._latencies.append(latency)
+            self._counts["calls"]             += 1
+            self._counts["errors"]            += int(error)
+            self._counts["retries"]           += retries
+            self._counts["prompt_tokens"]     += prompt_tokens
+            self._counts["completion_tokens"] += completion_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts    = dict(self._counts)
+            latencies = list(self._latencies)
+        if latencies:
+            p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) * 1000
+            counts.update(latency_ms_p50=round(float(p50), 1), latency_ms_p95=round(float(p95), 1), latency_ms_p99=round(float(p99), 1))
+        return counts
+
+
+_limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY)
+_metrics = LLMMetrics()
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, stretched to the server's Retry-After if it sent one."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+    response = getattr(error, "response", None)
+    try:
+        retry_after = float(response.headers.get("retry-after")) if response is not None else 0.0
+    except (TypeError, ValueError):
+        retry_after = 0.0
+    return min(max(delay, retry_after), LLM_BACKOFF_MAX)
+
+
+def _prompt_tokens(messages: list) -> int:
+    return sum(count_tokens(str(m.content)) for m in messages)
+
+
+def _usage(result) -> tuple:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    completion = usage.get("completion_tokens")
+    if completion is None:
+        completion = sum(count_tokens(g.text) for g in result.generations)
+    return usage.get("prompt_tokens"), completion
+
+
+class _LoopLocalCompletions:
+    """
+    Stands in for `AsyncOpenAI(...).chat.completions`: httpx async pools are
+    bound to the event loop that opened them, so each running loop gets its own
+    keep-alive pool. The pool is closed when its loop shuts down (asyncio.run,
+    uvicorn and asyncio.Runner all finalize async generators on exit), so
+    short-lived loops such as evaluation runs do not leak connections.
+    """
+
+    def __init__(self, make_client):
+        self._make_client = make_client
+        self._clients     = weakref.WeakKeyDictionary()   # loop -> (client, closer)
+        self._lock        = threading.Lock()
+
+    async def _close_at_shutdown(self, loop, client):
+        """Parked at its yield until `loop` shuts down its async generators, then closes `client` there."""
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._clients.pop(loop, None)   # the closer references its loop; let both be collected
+            await client.close()
+
+    async def create(self, **kwargs):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry  = self._clients.get(loop)
+            closer = None
+            if entry is None:
+                for closed in [other for other in self._clients if other.is_closed()]:
+                    del self._clients[closed]   # closed without finalizing async generators
+                client = self._make_client()
+                closer = self._close_at_shutdown(loop, client)
+                entry  = self._clients[loop] = (client, closer)
+        if closer is not None:
+            await closer.__anext__()   # first iteration registers it with the loop's shutdown_asyncgens
+        return await entry[0].chat.completions.create(**kwargs)
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose requests all pass through the process-wide concurrency
+    limiter, retry 429/5xx with jittered backoff and record metrics. Streams
+    are retried only until their first chunk arrives.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+        generate = super()._generate
+        if stream if stream is not None else self.streaming:
+            return generate(messages, stop=stop, run_manager=run_manager, stream=True, **kwargs)
+
+        start, retries, result = time.perf_counter(), 0, None
+        _limiter.acquire()
+        try:
+            while True:
+                try:
+                    result = generate(messages, stop=stop, run_manager=run_manager, stream=False, **kwargs)
+                    return result
+                except _RETRYABLE as e:
+                    if retries >= LLM_MAX_RETRIES:
+                        raise
+                    time.sleep(_retry_delay(retries, e))
+                    retries += 1
+        finally:
+            _limiter.release()
+            self._record(start, messages, result, retries)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+        agenerate = super()._agenerate
+        if stream if stream is not None else self.streaming:
+            return await agenerate(messages, stop=stop, run_manager=run_manager, stream=True, **kwargs)
+
+        start, retries, result = time.perf_counter(), 0, None
+        await _limiter.aacquire()
+        try:
+            while True:
+                try:
+                    result = await agenerate(messages, stop=stop, run_manager=run_manager, stream=False, **kwargs)
+                    return result
+                except _RETRYABLE as e:
+                    if retries >= LLM_MAX_RETRIES:
+                        raise
+                    await asyncio.sleep(_retry_delay(retries, e))
+                    retries += 1
+        finally:
+            _limiter.release()
+            self._record(start, messages, result, retries)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        stream = super()._stream
+        start, retries, chunks, ok = time.perf_counter(), 0, 0, False
+        _limiter.acquire()
+        try:
+            while True:
+                chunk_iter = stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+                try:
+                    first = next(chunk_iter, None)
+                    break
+                except _RETRYABLE as e:
+                    if retries >= LLM_MAX_RETRIES:
+                        raise
+                    time.sleep(_retry_delay(retries, e))
+                    retries += 1
+            if first is not None:
+                chunks += 1
+                yield first
+            for chunk in chunk_iter:
+                chunks += 1
+                yield chunk
+            ok = True
+        finally:
+            _limiter.release()
+            _metrics.record(time.perf_counter() - start, _prompt_tokens(messages), chunks, retries, not ok)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        astream = super()._astream
+        start, retries, chunks, ok = time.perf_counter(), 0, 0, False
+        await _limiter.aacquire()
+        try:
+            while True:
+                chunk_iter = astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+                try:
+                    first = await chunk_iter.__anext__()
+                    break
+                except StopAsyncIteration:
+                    first = None
+                    break
+                except _RETRYABLE as e:
+                    if retries >= LLM_MAX_RETRIES:
+                        raise
+                    await asyncio.sleep(_retry_delay(retries, e))
+                    retries += 1
+            if first is not None:
+                chunks += 1
+                yield first
+                async for chunk in chunk_iter:
+                    chunks += 1
+                    yield chunk
+            ok = True
+        finally:
+            _limiter.release()
+            _metrics.record(time.perf_counter() - start, _prompt_tokens(messages), chunks, retries, not ok)
+
+    @staticmethod
+    def _record(start: float, messages: list, result, retries: int):
+        prompt, completion = _usage(result) if result is not None else (None, 0)
+        _metrics.record(time.perf_counter() - start, prompt or _prompt_tokens(messages), completion, retries, result is None)
+
+
+_clients      = {}
+_clients_lock = threading.Lock()
+
+def get_chat_model(base_url: str, api_key: str) -> PooledChatOpenAI:
+    """
+    The shared chat model for an endpoint. One keep-alive connection pool per
+    process (per event loop for async calls); the openai client's own retries
+    are off because PooledChatOpenAI retries.
+    """
+    with _clients_lock:
+        llm = _clients.get((base_url, api_key))
+        if llm is None:
+            limits = httpx.Limits(max_connections=LLM_POOL_CONNECTIONS, max_keepalive_connections=LLM_POOL_CONNECTIONS)
+            params = {"api_key": api_key, "base_url": base_url, "timeout": LLM_TIMEOUT, "max_retries": 0}
+            llm = _clients[(base_url, api_key)] = PooledChatOpenAI(
+                model=LLM_MODEL,
+                openai_api_key=api_key,
+                openai_api_base=base_url,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                request_timeout=LLM_TIMEOUT,
+                max_retries=0,
+                client=openai.OpenAI(**params, http_client=httpx.Client(limits=limits)).chat.completions,
+                async_client=_LoopLocalCompletions(
+                    lambda: openai.AsyncOpenAI(**params, http_client=httpx.AsyncClient(limits=limits))
+                ),
+            )
+            print(f"[LLM] Pooled client for {base_url}: {LLM_MAX_CONCURRENCY} concurrent requests, "
+                  f"{LLM_POOL_CONNECTIONS} keep-alive connections, {LLM_MAX_RETRIES} retries")
+        return llm
+
+
+def llm_stats() -> dict:
+    """Call, error, retry and token counters, latency percentiles and limiter state."""
+    return {**_metrics.stats(), **_limiter.stats()}
+
+
+def _collect() -> list:
+    stats = llm_stats()
+    return [
+        ("llm_requests_total", "counter", "LLM calls through the pooled client.", [({}, stats["calls"])]),
+        ("llm_errors_total",   "counter", "LLM calls that failed after retries.", [({}, stats["errors"])]),
+        ("llm_retries_total",  "counter", "LLM call retries.",                    [({}, stats["retries"])]),
+        ("llm_tokens_total",   "counter", "LLM tokens by kind.",
+         [({"kind": "prompt"}, stats["prompt_tokens"]), ({"kind": "completion"}, stats["completion_tokens"])]),
+        ("llm_in_flight",      "gauge",   "LLM calls in flight.",                 [({}, stats["in_flight"])]),
+        ("llm_waiting",        "gauge",   "LLM calls waiting for a slot.",        [({}, stats["waiting"])]),
+    ]
+
+metrics.register_collector(_collect)
@@ -0,0 +1,77 @@
+
+import re
+from .tokens import count_tokens, truncate_tokens
+from ..config import MEMORY_TOKEN_BUDGET
+
+_SOURCES_BLOCK = re.compile(r"\s*\*\*Sources\*\*:.*", re.S)
+
+# Pronouns and connectives that point back into the conversation.
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his|"
+    r"there|above|previous|earlier|former|latter|same|such|else|also|too)\b"
+    r"|^\s*(and|but|so|or|what about|how about|why not)\b",
+    re.IGNORECASE,
+)
+
+
+def strip_citations(text: str) -> str:
+    """Drop the rendered '**Sources**:' block that ui_chat appends to answers."""
+    return _SOURCES_BLOCK.sub("", text).strip()
+
+def is_standalone(question: str) -> bool:
+    """
+    True when the question can be answered without the chat history, so the
+    condense LLM call can be skipped. Conservative: anything that looks like
+    a reference back into the conversation is sent to condense.
+    """
+    return len(question.split()) >= 4 and not _FOLLOW_UP.search(question)
+
+
+class ConversationMemory:
+    """
+    Chat history for the condense step, bounded by a token budget.
+
+      - Keeps a sliding window of the most recent (question, answer) turns.
+      - Citation blocks are stripped before a turn is stored.
+      - Turns that fall out of the window can be folded into a running
+        summary by passing `summarize(summary, evicted_text) -> str`.
+    """
+
+    def __init__(self, token_budget: int = MEMORY_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.turns        = []
+        self.summary      = ""
+
+    def add_turn(self, question: str, answer: str, summarize=None):
+        self.turns.append((question, strip_citations(answer)))
+
+        evicted = []
+        while len(self.turns) > 1 and self._tokens() > self.token_budget:
+            evicted.append(self.turns.pop(0))
+
+        if self._tokens() > self.token_budget:
+            q, a = self.turns[0]
+            self.turns[0] = (q, truncate_tokens(a, max(self.token_budget - self._tokens(summary_only=True) - count_tokens(q), 0)))
+
+        if evicted and summarize is not None:
+            self.summary = summarize(self.summary, self._format(evicted))
+
+    def clear(self):
+        self.turns   = []
+        self.summary = ""
+
+    def render(self) -> str:
+        history = self._format(self.turns)
+        if self.summary:
+            history = f"Summary of earlier conversation: {self.summary}\n{history}"
+        return history
+
+    def _tokens(self, summary_only: bool = False) -> int:
+        summary_tokens = count_tokens(self.summary)
+        if summary_only:
+            return summary_tokens
+        return summary_tokens + sum(count_tokens(q) + count_tokens(a) for q, a in self.turns)
+
+    @staticmethod
+    def _format(turns: list) -> str:
+        return "".join(f"\nHuman: {q}\nAssistant: {a}" for q, a in turns)
@@ -0,0 +1,162 @@
+
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from ..config import PROFILE_LOG
+
+# Seconds; spans from sub-millisecond cache hits to minute-long ingestions.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_FAMILY_HELP = {
+    "request_stage_seconds": "Seconds per RAG request stage (guardrail, condense, embed, cache, retrieve, rerank, generate, total).",
+    "ingest_stage_seconds":  "Seconds per ingestion stage (extract, split, dedup, embed, index_add, index_save).",
+    "requests_total":        "RAG requests by outcome (generated, blocked, cache_exact, cache_semantic).",
+    "context_tokens_total":  "Prompt-context tokens sent to the LLM, and saved by context packing.",
+    "startup_seconds":       "Seconds per startup step (embedding_model, index_load, warm_up).",
+}
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed buckets; one lock-protected update per observation."""
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self._sum    = 0.0
+        self._lock   = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum       += value
+
+    def snapshot(self) -> tuple:
+        """(cumulative bucket counts incl. +Inf, sum, count)."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+_histograms    = {}   # (family, stage) -> Histogram
+_counters      = {}   # (name, labels) -> value
+_registry_lock = threading.Lock()
+_collectors    = []
+_profile_hook  = None
+
+
+def observe(stage: str, seconds: float, family: str = "request_stage_seconds"):
+    """Record one `stage` duration (seconds) in a stage histogram family."""
+    histogram = _histograms.get((family, stage))
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault((family, stage), Histogram())
+    histogram.observe(seconds)
+
+
+@contextmanager
+def span(stage: str, family: str = "ingest_stage_seconds"):
+    """Time the enclosed block into the `stage` histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, family)
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add `value` to the counter `name` with the given labels."""
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def register_collector(collect):
+    """
+    Register `collect() -> [(name, type, help, [(labels dict, value), ...]), ...]`,
+    called on every scrape to export stats kept elsewhere (caches, LLM client).
+    """
+    _collectors.append(collect)
+
+
+def cache_metrics(cache: str, hits: int, misses: int) -> list:
+    """Collector families for one cache's hit and miss counters."""
+    return [
+        ("cache_hits_total",   "counter", "Cache lookups answered from the cache.", [({"cache": cache}, hits)]),
+        ("cache_misses_total", "counter", "Cache lookups that had to compute.",     [({"cache": cache}, misses)]),
+    ]
+
+
+def set_profile_hook(hook):
+    """`hook(record)` receives every request's stage breakdown; None disables it."""
+    global _profile_hook
+    _profile_hook = hook
+
+
+def record_request(timings_ms: dict, **fields):
+    """Feed one request's per-stage timings (ms) into the histograms and the profile hook."""
+    for stage, ms in timings_ms.items():
+        observe(stage, ms / 1000)
+    if _profile_hook is not None:
+        _profile_hook({"ts": time.time(), "timings_ms": timings_ms, **fields})
+
+
+def jsonl_profile_hook(path: str):
+    """A profile hook appending one JSON line per request to `path`."""
+    lock = threading.Lock()
+
+    def write(record: dict):
+        line = json.dumps(record, default=str)
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return write
+
+
+if PROFILE_LOG:
+    set_profile_hook(jsonl_profile_hook(PROFILE_LOG))
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def render_prometheus(prefix: str = "sca") -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    families = {}
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+        counters   = sorted(_counters.items())
+    for (family, stage), histogram in histograms:
+        cumulative, total, count = histogram.snapshot()
+        samples = families.setdefault(family, ("histogram", _FAMILY_HELP.get(family, family), []))[2]
+        for bound, n in zip([*histogram.buckets, "+Inf"], cumulative):
+            samples.append((f"{family}_bucket", {"stage": stage, "le": bound}, n))
+        samples.append((f"{family}_sum", {"stage": stage}, total))
+        samples.append((f"{family}_count", {"stage": stage}, count))
+    for (name, labels), value in counters:
+        families.setdefault(name, ("counter", _FAMILY_HELP.get(name, name), []))[2].append((name, dict(labels), value))
+
+    for collect in _collectors:
+        try:
+            collected = collect()
+        except Exception as e:
+            print(f"[Metrics] Collector {getattr(collect, '__name__', collect)} failed: {e}")
+            continue
+        for name, kind, help_text, samples in collected:
+            families.setdefault(name, (kind, help_text, []))[2].extend((name, labels, v) for labels, v in samples)
+
+    lines = []
+    for family, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {prefix}_{family} {help_text}")
+        lines.append(f"# TYPE {prefix}_{family} {kind}")
+        lines.extend(f"{prefix}_{name}{_labels(labels)} {value}" for name, labels, value in samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,161 @@
+
+import json
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from ..config import (
+    EMBEDDING_MODEL, EMBEDDING_ONNX_PATH, EMBEDDING_MAX_LENGTH, EMBED_ONNX_THREADS, EMBED_BATCH_SIZE,
+    EMBED_PARITY_MIN
+)
+
+MODEL_FILE     = "model.onnx"
+QUANTIZED_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+PARITY_FILE    = "parity.json"
+
+# Embedded with the fp32 sentence-transformers model at export time; an ONNX
+# model must reproduce them (cosine >= EMBED_PARITY_MIN) before it is used.
+PARITY_TEXTS = [
+    "The Supplier shall give ninety (90) days written notice of termination.",
+    "Invoices are payable within thirty days of receipt.",
+    "Section 4.2(b) limits the aggregate liability of each party.",
+    "Confidential Information excludes information that is publicly available.",
+    "Neither party may assign this Agreement without prior written consent.",
+    "The Customer may audit the Supplier's records once per calendar year.",
+    "What is the notice period for termination?",
+    "Who owns the intellectual property created under the Statement of Work?",
+    "force majeure",
+    "governing law and jurisdiction",
+    "Schedule 3 sets out the Service Levels and the Service Credits payable for each failure. " * 12,
+]
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an ONNX export (fp32 or int8-quantized) of
+    EMBEDDING_MODEL, run on CPU with onnxruntime and the model's
+    `tokenizer.json`, without importing torch or transformers.
+
+    Reproduces the sentence-transformers pipeline the torch backend runs:
+    truncate to EMBEDDING_MAX_LENGTH tokens, mean-pool the last hidden state
+    over the attention mask, L2-normalize. Texts are sorted by length before
+    batching so each batch pads to similar lengths.
+    """
+
+    def __init__(self, model_dir: str = EMBEDDING_ONNX_PATH, quantized: bool = False,
+                 max_length: int = EMBEDDING_MAX_LENGTH, threads: int = EMBED_ONNX_THREADS,
+                 batch_size: int = EMBED_BATCH_SIZE, parity_min: float = EMBED_PARITY_MIN):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = os.path.join(model_dir, QUANTIZED_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No ONNX model at '{path}'. Export one with: python -m smart_contract_assistant.src.onnx_embeddings {model_dir}"
+            )
+        self.model_path = path
+        self.batch_size = batch_size
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self._tokenizer.token_to_id("[PAD]")
+        self._tokenizer.enable_padding(pad_id=pad_id or 0, pad_token="[PAD]" if pad_id is not None else "<pad>")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._inputs  = {i.name for i in self._session.get_inputs()}
+
+        self.parity = check_parity(self, model_dir)
+        if self.parity is None:
+            print(f"[Embeddings] No {PARITY_FILE} in '{model_dir}'; skipping the parity check.")
+        elif self.parity["min_cosine"] < parity_min:
+            raise ValueError(
+                f"ONNX model '{path}' disagrees with the fp32 reference vectors "
+                f"(min cosine {self.parity['min_cosine']:.4f} < {parity_min}). Re-export it or use EMBEDDING_BACKEND='torch'."
+            )
+        else:
+            print(f"[Embeddings] ONNX parity: min cosine {self.parity['min_cosine']:.4f}, "
+                  f"mean {self.parity['mean_cosine']:.4f} over {self.parity['texts']} texts.")
+
+    def _encode(self, texts: list) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        ids  = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        hidden  = self._session.run(None, feed)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled  = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: list) -> list:
+        order   = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        return self._encode([text])[0].tolist()
+
+
+def cosine_agreement(vectors, reference) -> dict:
+    """Row-wise cosine between two sets of vectors for the same texts."""
+    a = np.asarray(vectors, dtype=np.float32)
+    b = np.asarray(reference, dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / np.clip(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12, None)
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean()), "texts": len(cosines)}
+
+def check_parity(embeddings: Embeddings, model_dir: str = EMBEDDING_ONNX_PATH):
+    """Cosine agreement of `embeddings` with the fp32 vectors saved at export; None if there are none."""
+    path = os.path.join(model_dir, PARITY_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        reference = json.load(f)
+    return cosine_agreement(embeddings.embed_documents(reference["texts"]), reference["vectors"])
+
+
+def export_onnx(model_name: str = EMBEDDING_MODEL, out_dir: str = EMBEDDING_ONNX_PATH, opset: int = 17):
+    """
+    One-off export (needs torch, transformers, sentence-transformers and
+    onnxruntime): the fp32 graph, a dynamically int8-quantized copy, the
+    tokenizer and the fp32 reference vectors for the parity check.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model     = AutoModel.from_pretrained(model_name).eval()
+    sample    = tokenizer(["The Supplier shall give notice.", "Termination"], padding=True, return_tensors="pt")
+    names     = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    axes      = {n: {0: "batch", 1: "sequence"} for n in [*names, "last_hidden_state"]}
+
+    fp32_path = os.path.join(out_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[n] for n in names), fp32_path, input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=opset)
+    quantize_dynamic(fp32_path, os.path.join(out_dir, QUANTIZED_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(out_dir)
+
+    reference = SentenceTransformer(model_name, device="cpu").encode(PARITY_TEXTS, normalize_embeddings=True)
+    with open(os.path.join(out_dir, PARITY_FILE), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "texts": PARITY_TEXTS, "vectors": reference.tolist()}, f)
+    print(f"[Embeddings] Exported {model_name} to '{out_dir}' ({MODEL_FILE}, {QUANTIZED_FILE}).")
+
+    for quantized in (False, True):
+        OnnxEmbeddings(out_dir, quantized=quantized)   # runs and reports the parity check
+
+
+if __name__ == "__main__":
+    import sys
+    export_onnx(out_dir=sys.argv[1] if len(sys.argv) > 1 else EMBEDDING_ONNX_PATH)
@@ -1,12 +1,24 @@
 
+import asyncio
+import json
 import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from operator import itemgetter
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain_community.chat_models import ChatOpenAI
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda, RunnableParallel
+from . import metrics
+from .answer_cache import get_answer_cache
+from .context_packer import context_budget, format_docs, pack_context
+from .llm_client import get_chat_model
+from .memory import is_standalone
 from ..config import (
-    LLM_MODEL, HF_TOKEN, HF_BASE_URL, MAX_TOKENS, TEMPERATURE, TOP_K,
-    QA_SYSTEM_PROMPT, CONDENSE_TEMPLATE, SUMMARY_SYSTEM_PROMPT
+    ANSWER_CACHE_ENABLED, SUMMARY_MODE, RETRIEVAL_MODE, RERANK_ENABLED, RERANK_FETCH_K,
+    HF_TOKEN, HF_BASE_URL, TOP_K,
+    QA_SYSTEM_PROMPT, CONDENSE_TEMPLATE, SUMMARY_SYSTEM_PROMPT, MEMORY_SUMMARY_TEMPLATE
 )
 
 os.environ["HF_TOKEN"]        = HF_TOKEN
@@ -14,29 +26,48 @@ os.environ["OPENAI_API_KEY"]  = HF_TOKEN
 os.environ["OPENAI_API_BASE"] = HF_BASE_URL
 
 def get_llm():
-    return ChatOpenAI(
-        model=LLM_MODEL,
-        openai_api_key=HF_TOKEN,
-        openai_api_base=HF_BASE_URL,
-        max_tokens=MAX_TOKENS,
-        temperature=TEMPERATURE,
-    )
+    """The process-wide pooled chat model (see llm_client.get_chat_model)."""
+    return get_chat_model(HF_BASE_URL, HF_TOKEN)
 
-def format_docs(docs: list) -> str:
-    """Format retrieved docs into a single context string."""
-    return "\n\n---\n\n".join(
-        f"[Chunk {d.metadata.get('chunk_index','?')} | {d.metadata.get('source','?')}]\n{d.page_content}"
-        for d in docs
-    )
+def _pack(inputs: dict) -> dict:
+    packed = pack_context(inputs["source_documents"], context_budget(inputs["standalone_question"]))
+    return {**inputs, "context_documents": packed["documents"], "context": packed["text"], "context_stats": packed["stats"]}
+
+def build_retriever(vector_store, lexical_index=None, mode: str = RETRIEVAL_MODE, rerank: bool = RERANK_ENABLED):
+    """
+    Hybrid BM25 + dense retriever when a lexical index is available and enabled,
+    else dense only; a ShardedIndex gets a ShardedRetriever (per-shard BM25).
+    With `rerank`, it fetches RERANK_FETCH_K candidates and a cross-encoder
+    keeps the best TOP_K.
+    """
+    from .shards import ShardedIndex, ShardedRetriever
+    k = RERANK_FETCH_K if rerank else TOP_K
+    if isinstance(vector_store, ShardedIndex):
+        retriever = ShardedRetriever(vectorstore=vector_store, k=k, mode=mode)
+    elif mode == "hybrid" and lexical_index is not None:
+        from .hybrid_retriever import HybridRetriever
+        retriever = HybridRetriever(vectorstore=vector_store, lexical=lexical_index, k=k)
+    else:
+        retriever = vector_store.as_retriever(search_kwargs={"k": k})
+    if rerank:
+        from .reranker import RerankingRetriever
+        retriever = RerankingRetriever(base=retriever, k=TOP_K)   # cross-encoder loads on the first query
+    return retriever
 
-def build_rag_chain(vector_store):
+def build_rag_chain(vector_store, lexical_index=None):
     """
-    LCEL RAG Chain:
-    {context: retriever | format_docs, question: passthrough}
-    | QA_PROMPT | llm | StrOutputParser
+    LCEL RAG Chain (single retrieval pass):
+    {standalone_question: passthrough, source_documents: retriever}
+    | pack_context (merge adjacent chunks, fit CONTEXT_TOKEN_BUDGET)
+    | assign(answer: QA_PROMPT | llm | StrOutputParser)
+
+    Returns a dict with `answer`, `context_documents` (the chunks packed into
+    the prompt: the citations), `source_documents` (the retriever's full
+    ranked list, for evaluation's recall@k / MRR), `standalone_question` and
+    `context_stats`.
     """
     llm       = get_llm()
-    retriever = vector_store.as_retriever(search_kwargs={"k": TOP_K})
+    retriever = build_retriever(vector_store, lexical_index)
 
     qa_prompt = ChatPromptTemplate.from_messages([
         ("system", QA_SYSTEM_PROMPT),
@@ -45,23 +76,34 @@ def build_rag_chain(vector_store):
 
     condense_prompt = PromptTemplate.from_template(CONDENSE_TEMPLATE)
 
-    rag_chain = (
+    answer_chain = (
         {
-            "context":  retriever | RunnableLambda(format_docs),
-            "question": RunnablePassthrough(),
+            "context":  itemgetter("context"),
+            "question": itemgetter("standalone_question"),
         }
         | qa_prompt
         | llm
         | StrOutputParser()
     )
 
+    rag_chain = (
+        RunnableParallel(
+            standalone_question=RunnablePassthrough(),
+            source_documents=retriever,
+        )
+        | RunnableLambda(_pack)
+        | RunnablePassthrough.assign(answer=answer_chain).pick(
+            ["standalone_question", "source_documents", "context_documents", "context_stats", "answer"]
+        )
+    )
+
     condense_chain = (
         condense_prompt
         | llm
         | StrOutputParser()
     )
 
-    print("[RAG] LCEL chain built: retriever | format_docs | prompt | llm | StrOutputParser")
+    print("[RAG] LCEL chain built: retriever -> pack_context -> {source_documents, prompt | llm | StrOutputParser}")
     return rag_chain, condense_chain, retriever
 
 def build_summary_chain():
@@ -84,33 +126,325 @@ def build_summary_chain():
     print("[Summary] LCEL chain built: SUMMARY_PROMPT | llm | StrOutputParser")
     return summary_chain
 
-def run_rag(rag_chain, condense_chain, retriever, question: str, chat_history_str: str) -> tuple:
+def build_memory_summarizer():
+    """
+    LCEL chain that folds evicted chat turns into the running summary kept by
+    ConversationMemory. Returns a `summarize(summary, turns_text) -> str` callable.
+    """
+    chain = PromptTemplate.from_template(MEMORY_SUMMARY_TEMPLATE) | get_llm() | StrOutputParser()
+    return lambda summary, turns: chain.invoke({"summary": summary or "(none)", "turns": turns})
 
-    if chat_history_str.strip():
-        standalone = condense_chain.invoke({
-            "chat_history": chat_history_str,
-            "question": question,
-        })
-    else:
-        standalone = question
+class StageTimer(BaseCallbackHandler):
+    """
+    Per-stage wall-clock timings for one request, in milliseconds.
+
+    Pipeline stages are timed with `stage(name)`; retrieval and generation run
+    inside the LCEL chain, so the timer is also passed as a callback and picks
+    them up from the retriever and chat-model run events. `finish()` reports
+    the request to the metrics registry (and the profile hook, if set).
+    """
 
+    run_inline = True
+
+    def __init__(self):
+        self.timings = {}
+        self.outcome = "generated"   # or "blocked", "cache_exact", "cache_semantic"
+        self.context = None          # context_stats of the packed prompt
+        self._start  = time.perf_counter()
+        self._runs   = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start)
+
+    def _add(self, name: str, start: float):
+        self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._runs[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._add("retrieve", self._runs.pop(run_id, time.perf_counter()))
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        # Reranking happens inside the retriever run, so it is moved out of "retrieve".
+        if name == "rerank":
+            self.timings["retrieve"] = self.timings.get("retrieve", 0.0) - data["ms"]
+            self.timings["rerank"]   = self.timings.get("rerank", 0.0) + data["ms"]
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if isinstance(outputs, dict) and "context_stats" in outputs:
+            self.context = outputs["context_stats"]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._runs[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._runs[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._add("generate", self._runs.pop(run_id, time.perf_counter()))
+
+    def finish(self) -> dict:
+        self.timings["total"] = (time.perf_counter() - self._start) * 1000
+        timings = {name: round(ms, 3) for name, ms in self.timings.items()}
+        metrics.inc("requests_total", outcome=self.outcome)
+        if self.context:
+            metrics.inc("context_tokens_total", self.context["tokens"], kind="sent")
+            metrics.inc("context_tokens_total", self.context["tokens_saved"], kind="saved")
+        metrics.record_request(timings, outcome=self.outcome, context=self.context)
+        return timings
+
+def _needs_condense(question: str, chat_history_str: str) -> bool:
+    return bool(chat_history_str.strip()) and not is_standalone(question)
+
+def _condense_inputs(question: str, chat_history_str: str) -> dict:
+    return {"chat_history": chat_history_str, "question": question}
+
+def _check_guardrail(query: str):
+    """Returns the blocked-answer text, or None if the query is allowed."""
     from .guardrails import get_guardrail
     guard = get_guardrail()
-    check_result = guard.check(standalone)
-    
+    check_result = guard.check(query)
+
     if not check_result["is_allowed"]:
-        return (
-            f"🚫 **Guardrail Blocked**: I cannot answer this query because it seems off-topic or irrelevant to smart contracts. (Confidence: {check_result['score']:.2f})",
-            [], 
-            standalone
-        )
+        return f"🚫 **Guardrail Blocked**: I cannot answer this query because it seems off-topic or irrelevant to smart contracts. (Confidence: {check_result['score']:.2f})"
+    return None
+
+def _index_fingerprint(retriever, search_filter=None) -> str:
+    """Identifies the index contents (and search scope) a cached answer was produced from."""
+    vs   = retriever.vectorstore
+    size = vs.ntotal if hasattr(vs, "ntotal") else vs.index.ntotal
+    if search_filter:
+        return f"{id(vs)}:{size}:{json.dumps(search_filter, sort_keys=True, default=str)}"
+    return f"{id(vs)}:{size}"
+
+def _embed_query(retriever, standalone: str):
+    # Memoized by CachedEmbeddings, so the retriever reuses this vector.
+    return retriever.vectorstore.embeddings.embed_query(standalone)
 
-    source_docs = retriever.invoke(standalone)
+_prefetch_pool = None
 
-    answer = rag_chain.invoke(standalone)
+def _prefetch_embedding(retriever, standalone: str) -> Future:
+    """Starts the query embedding in the background while the caller keeps screening."""
+    global _prefetch_pool
+    if _prefetch_pool is None:
+        _prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+    return _prefetch_pool.submit(_embed_query, retriever, standalone)
 
-    return answer, source_docs, standalone
+def _cache_lookup(retriever, standalone: str, vector, search_filter=None, use_cache: bool = True):
+    """Returns (cached result or None, tier, fingerprint); the fingerprint is None when the cache is bypassed."""
+    if not (ANSWER_CACHE_ENABLED and use_cache):
+        return None, None, None
+    fingerprint  = _index_fingerprint(retriever, search_filter)
+    result, tier = get_answer_cache().lookup(standalone, fingerprint, vector)
+    return result, tier, fingerprint
 
-def run_summary(summary_chain, docs: list) -> str:
+def _blocked_result(standalone: str, blocked: str) -> dict:
+    return {"answer": blocked, "source_documents": [], "context_documents": [], "standalone_question": standalone,
+            "cache_hit": None}
+
+def _prepare(condense_chain, retriever, question: str, chat_history_str: str, timer: StageTimer,
+             search_filter=None, use_cache: bool = True):
+    """
+    Everything before generation, cheapest first:
+
+      1. screen the raw question (a blocked query never reaches the LLM)
+      2. condense, only for follow-ups with history
+      3. start the query embedding and screen the condensed text meanwhile
+      4. answer-cache lookup with the embedding (unless `use_cache` is False)
+
+    Returns (standalone, early result or None, cache fingerprint, query vector).
+    """
+    with timer.stage("guardrail"):
+        blocked = _check_guardrail(question)
+    if blocked is not None:
+        timer.outcome = "blocked"
+        return question, _blocked_result(question, blocked), None, None
+
+    standalone = question
+    if _needs_condense(question, chat_history_str):
+        with timer.stage("condense"):
+            standalone = condense_chain.invoke(_condense_inputs(question, chat_history_str))
+
+    embedding = _prefetch_embedding(retriever, standalone)
+    if standalone != question:
+        with timer.stage("guardrail"):
+            blocked = _check_guardrail(standalone)
+        if blocked is not None:
+            timer.outcome = "blocked"
+            return standalone, _blocked_result(standalone, blocked), None, None
+
+    with timer.stage("embed"):
+        vector = embedding.result()
+    with timer.stage("cache"):
+        cached, tier, fingerprint = _cache_lookup(retriever, standalone, vector, search_filter, use_cache)
+    if cached is not None:
+        timer.outcome = f"cache_{tier}"
+        return standalone, {**cached, "standalone_question": standalone, "cache_hit": tier}, None, None
+    return standalone, None, fingerprint, vector
+
+async def _aprepare(condense_chain, retriever, question: str, chat_history_str: str, timer: StageTimer,
+                    search_filter=None, use_cache: bool = True):
+    """Async version of `_prepare`; the embedding runs in a worker thread."""
+    with timer.stage("guardrail"):
+        blocked = _check_guardrail(question)
+    if blocked is not None:
+        timer.outcome = "blocked"
+        return question, _blocked_result(question, blocked), None, None
+
+    standalone = question
+    if _needs_condense(question, chat_history_str):
+        with timer.stage("condense"):
+            standalone = await condense_chain.ainvoke(_condense_inputs(question, chat_history_str))
+
+    embedding = asyncio.ensure_future(asyncio.to_thread(_embed_query, retriever, standalone))
+    if standalone != question:
+        with timer.stage("guardrail"):
+            blocked = _check_guardrail(standalone)
+        if blocked is not None:
+            timer.outcome = "blocked"
+            return standalone, _blocked_result(standalone, blocked), None, None
+
+    with timer.stage("embed"):
+        vector = await embedding
+    with timer.stage("cache"):
+        cached, tier, fingerprint = _cache_lookup(retriever, standalone, vector, search_filter, use_cache)
+    if cached is not None:
+        timer.outcome = f"cache_{tier}"
+        return standalone, {**cached, "standalone_question": standalone, "cache_hit": tier}, None, None
+    return standalone, None, fingerprint, vector
+
+def _run_config(timer: StageTimer, search_filter) -> dict:
+    config = {"callbacks": [timer]}
+    if search_filter:
+        # Read by ShardedRetriever; other retrievers search the whole index.
+        config["configurable"] = {"search_filter": search_filter}
+    return config
+
+def _store(standalone: str, fingerprint, result: dict, vector):
+    if ANSWER_CACHE_ENABLED and fingerprint is not None:
+        get_answer_cache().store(standalone, fingerprint, result, vector)
+
+def run_rag(rag_chain, condense_chain, retriever, question: str, chat_history_str: str,
+            search_filter: dict = None, use_cache: bool = True) -> dict:
+    """
+    Guardrail -> condense (follow-ups only) -> guardrail || query embedding
+    -> answer cache -> single-pass RAG chain.
+
+    Returns a dict with `answer`, `context_documents` (cite these),
+    `source_documents` (ranked retrieval, for evaluation), `standalone_question`,
+    `context_stats` (prompt tokens packed and saved), `cache_hit` (None,
+    "exact" or "semantic") and `timings` (ms per stage). `search_filter`
+    ({field: value or [values]}, e.g. {"source": "a.pdf"}) scopes retrieval
+    on a sharded index (SHARD_BY). `use_cache=False` neither reads nor fills
+    the answer cache (e.g. for evaluation).
+    """
+    timer = StageTimer()
+    standalone, early, fingerprint, vector = _prepare(condense_chain, retriever, question, chat_history_str, timer,
+                                                      search_filter, use_cache)
+    if early is not None:
+        return {**early, "timings": timer.finish()}
+
+    result = rag_chain.invoke(standalone, config=_run_config(timer, search_filter))
+    _store(standalone, fingerprint, result, vector)
+    return {**result, "cache_hit": None, "timings": timer.finish()}
+
+async def arun_rag(rag_chain, condense_chain, retriever, question: str, chat_history_str: str,
+                   search_filter: dict = None, use_cache: bool = True) -> dict:
+    """Async version of run_rag, built on `rag_chain.ainvoke`."""
+    timer = StageTimer()
+    standalone, early, fingerprint, vector = await _aprepare(condense_chain, retriever, question, chat_history_str, timer,
+                                                             search_filter, use_cache)
+    if early is not None:
+        return {**early, "timings": timer.finish()}
+
+    result = await rag_chain.ainvoke(standalone, config=_run_config(timer, search_filter))
+    _store(standalone, fingerprint, result, vector)
+    return {**result, "cache_hit": None, "timings": timer.finish()}
+
+def _chunk_events(chunk: dict, result: dict):
+    if "source_documents" in chunk:
+        result["source_documents"] = chunk["source_documents"]   # ranked list: kept with the cached answer, not streamed
+    if "context_documents" in chunk:
+        yield {"type": "sources", "content": chunk["context_documents"]}
+    if "context_stats" in chunk:
+        yield {"type": "context", "content": chunk["context_stats"]}
+    if chunk.get("answer"):
+        yield {"type": "token", "content": chunk["answer"]}
+
+def _early_events(early: dict, timer: StageTimer):
+    yield {"type": "sources", "content": early.get("context_documents", early["source_documents"])}
+    yield {"type": "token", "content": early["answer"]}
+    yield {"type": "timings", "content": timer.finish()}
+
+def stream_rag(rag_chain, condense_chain, retriever, question: str, chat_history_str: str,
+               search_filter: dict = None):
+    """
+    Streaming variant of run_rag built on `rag_chain.stream`.
+
+    Yields events in order:
+        {"type": "question", "content": standalone question}
+        {"type": "sources",  "content": [Document, ...]}  (the chunks packed into the prompt)
+        {"type": "context",  "content": {tokens, tokens_saved, ...}}  (not for cached/blocked answers)
+        {"type": "token",    "content": answer token}  (repeated)
+        {"type": "timings",  "content": {stage: ms}}
+
+    A cached or blocked answer is emitted as a single token event.
+    """
+    timer = StageTimer()
+    standalone, early, fingerprint, vector = _prepare(condense_chain, retriever, question, chat_history_str, timer, search_filter)
+    yield {"type": "question", "content": standalone}
+    if early is not None:
+        yield from _early_events(early, timer)
+        return
+
+    result = {"standalone_question": standalone, "source_documents": [], "context_documents": [], "answer": ""}
+    for chunk in rag_chain.stream(standalone, config=_run_config(timer, search_filter)):
+        for event in _chunk_events(chunk, result):
+            _accumulate(result, event)
+            yield event
+    _store(standalone, fingerprint, result, vector)
+    yield {"type": "timings", "content": timer.finish()}
+
+async def astream_rag(rag_chain, condense_chain, retriever, question: str, chat_history_str: str,
+                      search_filter: dict = None):
+    """Async generator version of stream_rag, built on `rag_chain.astream`."""
+    timer = StageTimer()
+    standalone, early, fingerprint, vector = await _aprepare(condense_chain, retriever, question, chat_history_str, timer, search_filter)
+    yield {"type": "question", "content": standalone}
+    if early is not None:
+        for event in _early_events(early, timer):
+            yield event
+        return
+
+    result = {"standalone_question": standalone, "source_documents": [], "context_documents": [], "answer": ""}
+    async for chunk in rag_chain.astream(standalone, config=_run_config(timer, search_filter)):
+        for event in _chunk_events(chunk, result):
+            _accumulate(result, event)
+            yield event
+    _store(standalone, fingerprint, result, vector)
+    yield {"type": "timings", "content": timer.finish()}
+
+def _accumulate(result: dict, event: dict):
+    if event["type"] == "sources":
+        result["context_documents"] = event["content"]
+    elif event["type"] == "context":
+        result["context_stats"] = event["content"]
+    else:
+        result["answer"] += event["content"]
+
+def run_summary(summary_chain, docs: list, mode: str = SUMMARY_MODE) -> str:
+    """
+    "map_reduce" summarizes every chunk (see summarization.MapReduceSummarizer);
+    "stuff" sends only the first six chunks in a single call.
+    """
+    if mode == "map_reduce" and len(docs) > 6:
+        from .summarization import get_summarizer
+        return get_summarizer().summarize(summary_chain, docs)
     combined = "\n\n".join(d.page_content for d in docs[:6])
     return summary_chain.invoke({"text": combined})
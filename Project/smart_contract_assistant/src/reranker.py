@@ -0,0 +1,183 @@
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import ensure_config
+from . import metrics
+from ..config import (
+    TOP_K, RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_BUDGET_MS, RERANK_CACHE_SIZE, RERANK_PAIR_COST_MS
+)
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores (query, chunk) pairs with a CPU cross-encoder and keeps the best `k`.
+
+    Pairs are scored in batches under a per-query time budget: before each
+    batch, the expected cost (running average per pair) is checked against
+    the time left, and after each batch, the time actually spent. If the
+    candidates cannot all be scored in time, the query falls back to the
+    incoming (vector) order. Until a batch has been timed, the cost is the
+    conservative `pair_cost_ms`. Scores are cached per (query, chunk text),
+    so partially scored queries finish on a repeat.
+    """
+
+    def __init__(self, score_pairs, batch_size: int = RERANK_BATCH_SIZE, budget_ms: float = RERANK_BUDGET_MS,
+                 cache_size: int = RERANK_CACHE_SIZE, pair_cost_ms: float = RERANK_PAIR_COST_MS):
+        self.score_pairs = score_pairs   # list of (query, text) -> list of float
+        self.batch_size  = batch_size
+        self.budget_ms   = budget_ms
+        self.cache_size  = cache_size
+        self._cache      = OrderedDict()
+        self._lock       = threading.Lock()
+        self._pair_cost  = pair_cost_ms / 1000   # seconds per pair, exponential moving average
+        self._measured   = False
+        self._counts     = {"queries": 0, "fallbacks": 0, "pairs_scored": 0, "cache_hits": 0}
+
+    @staticmethod
+    def _key(query: str, text: str) -> str:
+        return hashlib.sha256(f"{query}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _cached(self, keys: list) -> dict:
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            self._counts["cache_hits"] += len(found)
+            return found
+
+    def _store(self, items: list, elapsed: float):
+        with self._lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            cost = elapsed / len(items)
+            self._pair_cost = 0.8 * self._pair_cost + 0.2 * cost if self._measured else cost
+            self._measured  = True
+            self._counts["pairs_scored"] += len(items)
+
+    def rerank(self, query: str, docs: list, k: int = TOP_K) -> tuple:
+        """Returns (top `k` docs, info) where info has `ms`, `scored` and `fallback`."""
+        start    = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        keys     = [self._key(query, d.page_content) for d in docs]
+        scores   = self._cached(keys)
+        missing  = [i for i, key in enumerate(keys) if key not in scores]
+
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            if time.perf_counter() + self._pair_cost * len(batch) > deadline:
+                break
+            batch_start = time.perf_counter()
+            batch_scores = self.score_pairs([(query, docs[j].page_content) for j in batch])
+            computed = [(keys[j], float(s)) for j, s in zip(batch, batch_scores)]
+            self._store(computed, time.perf_counter() - batch_start)
+            scores.update(computed)
+            if time.perf_counter() > deadline:
+                break
+
+        fallback = len(scores) < len(set(keys))
+        if fallback:
+            ranked = docs[:k]
+        else:
+            order  = sorted(range(len(docs)), key=lambda j: scores[keys[j]], reverse=True)
+            ranked = [docs[j] for j in order[:k]]
+
+        with self._lock:
+            self._counts["queries"]   += 1
+            self._counts["fallbacks"] += int(fallback)
+        return ranked, {"ms": (time.perf_counter() - start) * 1000, "scored": len(scores), "fallback": fallback}
+
+    def warm_up(self):
+        """Score one placeholder batch: absorbs the model's cold start and seeds the per-pair cost."""
+        start = time.perf_counter()
+        self.score_pairs([("warm-up", "warm-up")] * self.batch_size)
+        with self._lock:
+            self._pair_cost = (time.perf_counter() - start) / self.batch_size
+            self._measured  = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counts, "cached_pairs": len(self._cache), "ms_per_pair": round(self._pair_cost * 1000, 3)}
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Process-wide reranker; the cross-encoder is loaded (and warmed up) by the first rerank."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                from sentence_transformers import CrossEncoder
+                print(f"[Rerank] Loading {RERANK_MODEL} ...")
+                model    = CrossEncoder(RERANK_MODEL, device="cpu", max_length=512)
+                reranker = CrossEncoderReranker(
+                    lambda pairs: model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+                )
+                reranker.warm_up()
+                _reranker = reranker
+                metrics.register_collector(_collect)
+                print(f"[Rerank] Loaded ({reranker.stats()['ms_per_pair']} ms per pair).")
+    return _reranker
+
+
+def _collect() -> list:
+    stats = _reranker.stats()
+    return [
+        *metrics.cache_metrics("rerank", stats["cache_hits"], stats["pairs_scored"]),
+        ("rerank_fallbacks_total", "counter", "Queries that kept the first-stage order (budget exceeded).",
+         [({}, stats["fallbacks"])]),
+    ]
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Over-fetches candidates from `base` and keeps the `k` the reranker scores
+    highest. Exposes the base store as `vectorstore`, so answer-cache
+    fingerprinting and query-embedding reuse work unchanged.
+
+    The base retriever runs as a child of this run, with the same
+    `configurable` (e.g. a ShardedRetriever's search_filter). Without an
+    explicit `reranker`, the process-wide one is fetched on the first query,
+    so building the chain does not load the cross-encoder.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    base: Any
+    reranker: Any = None
+    k: int = TOP_K
+
+    @property
+    def vectorstore(self):
+        return self.base.vectorstore
+
+    def invoke(self, input, config=None, **kwargs):
+        return super().invoke(input, config, configurable=ensure_config(config).get("configurable", {}), **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await super().ainvoke(input, config, configurable=ensure_config(config).get("configurable", {}), **kwargs)
+
+    def _get_relevant_documents(self, query: str, *, run_manager, configurable=None) -> list:
+        docs = self.base.invoke(query, config={"callbacks": run_manager.get_child(), "configurable": configurable or {}})
+        ranked, info = (self.reranker or get_reranker()).rerank(query, docs, self.k)
+        run_manager.get_child().on_custom_event("rerank", info)
+        return ranked
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager, configurable=None) -> list:
+        docs = await self.base.ainvoke(query, config={"callbacks": run_manager.get_child(),
+                                                      "configurable": configurable or {}})
+        ranked, info = await asyncio.to_thread(lambda: (self.reranker or get_reranker()).rerank(query, docs, self.k))
+        await run_manager.get_child().on_custom_event("rerank", info)
+        return ranked
@@ -0,0 +1,363 @@
+
+import asyncio
+import hashlib
+import heapq
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+import faiss
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import ensure_config
+from .ann_index import search_params
+from .docstore import SQLiteDocstore, metadata_matches
+from .hybrid_retriever import reciprocal_rank_fusion
+from .vector_store import (
+    IndexManager, VERSION_FILE, current_index_dir, get_embeddings, index_write_lock, load_lexical_index,
+    load_vector_store, read_index_version,
+)
+from ..config import (
+    SHARD_BY, SHARDS_DIR, SHARD_CACHE_MB, SHARD_SEARCH_THREADS, INDEX_LOAD_MODE,
+    RETRIEVAL_MODE, TOP_K, HYBRID_FETCH_K, RRF_K
+)
+
+DEFAULT_SHARD = "default"     # shard for chunks without the SHARD_BY field (e.g. no tenant given)
+_FILTER_CACHE_SIZE = 32        # matching-position sets kept per loaded shard
+_EXACT_SCAN_MAX = 4096         # filtered HNSW searches this small fall back to an exact scan
+
+_search_pool = None
+
+
+def shard_name(value: str) -> str:
+    """Directory name for a shard: readable prefix plus a hash, so any value is filesystem-safe and unique."""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", value)[:40].strip("-.") or "shard"
+    return f"{slug}-{hashlib.sha256(value.encode('utf-8')).hexdigest()[:10]}"
+
+def normalize_filter(search_filter) -> dict:
+    """{field: value or [values]} -> {field: [values]}; None values are dropped."""
+    normalized = {}
+    for field, values in (search_filter or {}).items():
+        if values is None:
+            continue
+        normalized[field] = list(values) if isinstance(values, (list, tuple, set)) else [values]
+    return normalized
+
+def _dir_bytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class ShardedIndex:
+    """
+    One index per source document or tenant (SHARD_BY), each a regular
+    IndexManager directory under SHARDS_DIR, plus a manifest (`version.json`
+    in SHARDS_DIR) listing the shards with their value, sources, size and
+    version. Every shard change bumps the manifest version, so IndexService
+    reloads a sharded index exactly like a single one.
+
+    Searches are pre-filtered by metadata before any vector is scanned: the
+    SHARD_BY field of the filter selects the shards, and other fields become
+    a FAISS IDSelector (and a BM25 allow-list) inside each shard. The chosen
+    shards are searched in parallel and their top-k merged by distance.
+
+    Shards are loaded on first use and unloaded least recently used first
+    once the loaded ones exceed SHARD_CACHE_MB.
+    """
+
+    def __init__(self, root: str = SHARDS_DIR, shard_by: str = SHARD_BY or "source",
+                 mode: str = INDEX_LOAD_MODE, cache_mb: float = SHARD_CACHE_MB, reuse=None):
+        self.root        = root
+        self.shard_by    = shard_by
+        self.mode        = mode
+        self.cache_bytes = cache_mb * 2 ** 20
+        self.manifest    = read_index_version(root) or {"version": 0}
+        self._loaded     = OrderedDict()   # shard name -> loaded shard, least recently used first
+        self._loading    = {}              # shard name -> lock held while it loads
+        self._lock       = threading.Lock()
+        if reuse is not None:
+            # Shards unchanged since the previous snapshot stay loaded.
+            for name, shard in reuse._loaded.items():
+                if self.shards.get(name, {}).get("version") == shard["version"]:
+                    self._loaded[name] = shard
+
+    @property
+    def shards(self) -> dict:
+        return self.manifest.get("shards", {})
+
+    @property
+    def embeddings(self):
+        return get_embeddings()
+
+    @property
+    def ntotal(self) -> int:
+        return sum(entry["chunks"] for entry in self.shards.values())
+
+    def sources(self) -> list:
+        return sorted({source for entry in self.shards.values() for source in entry["sources"]})
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = list(self._loaded.values())
+        return {"shards": len(self.shards), "loaded": len(loaded), "loaded_mb": round(sum(s["bytes"] for s in loaded) / 2 ** 20, 1)}
+
+    # ---- reads ----
+
+    def route(self, search_filter) -> tuple:
+        """(shard names to search, filter left to apply inside them)."""
+        remaining = normalize_filter(search_filter)
+        values = remaining.pop(self.shard_by, None)
+        if values is None:
+            return list(self.shards), remaining
+        names = [shard_name(str(v)) for v in dict.fromkeys(values)]
+        return [name for name in names if name in self.shards], remaining
+
+    def _shard(self, name: str) -> dict:
+        with self._lock:
+            shard = self._loaded.get(name)
+            if shard is not None:
+                self._loaded.move_to_end(name)
+                return shard
+            loading = self._loading.setdefault(name, threading.Lock())
+        with loading:
+            with self._lock:
+                if name in self._loaded:
+                    return self._loaded[name]
+            path = current_index_dir(os.path.join(self.root, name))
+            try:
+                vs    = load_vector_store(path, mode=self.mode)
+                shard = {
+                    "version":      (read_index_version(path) or {}).get("version"),
+                    "vector_store": vs,
+                    "lexical":      load_lexical_index(path, vs),
+                    "bytes":        _dir_bytes(path),
+                    "filters":      OrderedDict(),
+                }
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+            with self._lock:
+                self._loaded[name] = shard
+                self._evict()
+        return shard
+
+    def _evict(self):
+        total = sum(s["bytes"] for s in self._loaded.values())
+        while total > self.cache_bytes and len(self._loaded) > 1:
+            name, shard = self._loaded.popitem(last=False)
+            total -= shard["bytes"]
+            print(f"[Shards] Unloaded '{name}' ({shard['bytes'] / 2 ** 20:.1f} MB) to stay under {self.cache_bytes / 2 ** 20:.0f} MB.")
+
+    def _matching(self, shard: dict, metadata_filter: dict) -> dict:
+        """FAISS positions -> ids of the shard's chunks matching `metadata_filter`, with their IDSelector."""
+        key = json.dumps(metadata_filter, sort_keys=True, default=str)
+        with self._lock:
+            cached = shard["filters"].get(key)
+        if cached is not None:
+            return cached
+        vs = shard["vector_store"]
+        if isinstance(vs.docstore, SQLiteDocstore):
+            positions = dict(vs.docstore.positions_where(metadata_filter))
+        else:
+            positions = {
+                pos: doc_id for pos, doc_id in vs.index_to_docstore_id.items()
+                if metadata_matches(vs.docstore.search(doc_id).metadata, metadata_filter)
+            }
+        ids   = np.fromiter(positions, dtype=np.int64, count=len(positions))
+        match = {"positions": positions, "ids": set(positions.values()), "array": ids,
+                 "selector": faiss.IDSelectorBatch(ids) if len(ids) else None}
+        with self._lock:
+            shard["filters"][key] = match
+            if len(shard["filters"]) > _FILTER_CACHE_SIZE:
+                shard["filters"].popitem(last=False)
+        return match
+
+    def _search_shard(self, name: str, query: str, vector, k: int, metadata_filter: dict, lexical: bool) -> tuple:
+        try:
+            shard = self._shard(name)
+        except FileNotFoundError:
+            return [], []   # deleted after this snapshot's manifest was read
+        vs    = shard["vector_store"]
+        match = self._matching(shard, metadata_filter) if metadata_filter else None
+        if match is not None and match["selector"] is None:
+            return [], []
+
+        params = search_params(vs.index, match["selector"]) if match else None
+        distances, positions = vs.index.search(vector, k, params=params)
+        hits = [(float(d), int(p)) for d, p in zip(distances[0], positions[0]) if p >= 0]
+        if match and isinstance(vs.index, faiss.IndexHNSW) and len(hits) < min(k, len(match["ids"])) <= _EXACT_SCAN_MAX:
+            # A selective filter can cut HNSW's graph walk short; score the few allowed vectors exactly.
+            candidates = vs.index.reconstruct_batch(match["array"])
+            scores     = ((candidates - vector) ** 2).sum(axis=1)
+            hits       = sorted(zip(scores.tolist(), match["array"].tolist()))[:k]
+
+        dense = [(d, name, vs.index_to_docstore_id[p]) for d, p in hits]
+        lex   = []
+        if lexical:
+            allowed = match["ids"] if match else None
+            lex = [(score, name, doc_id) for doc_id, score in shard["lexical"].search(query, k, allowed)]
+        return dense, lex
+
+    def search(self, query: str, vector, k: int, search_filter=None, lexical: bool = False) -> tuple:
+        """
+        Top `k` over the shards selected by `search_filter`, as
+        (dense [(distance, shard, id)], lexical [(bm25 score, shard, id)]), best first.
+
+        Distances compare across shards, so dense hits merge by distance. BM25
+        scores do not: each shard has its own IDF and average length. So the
+        shards' lexical rankings are merged by reciprocal rank fusion instead.
+        """
+        global _search_pool
+        names, metadata_filter = self.route(search_filter)
+        if not names:
+            return [], []
+        if len(names) == 1:
+            results = [self._search_shard(names[0], query, vector, k, metadata_filter, lexical)]
+        else:
+            if _search_pool is None:
+                _search_pool = ThreadPoolExecutor(max_workers=SHARD_SEARCH_THREADS, thread_name_prefix="shard-search")
+            results = list(_search_pool.map(
+                lambda name: self._search_shard(name, query, vector, k, metadata_filter, lexical), names
+            ))
+        dense = heapq.nsmallest(k, (hit for d, _ in results for hit in d))
+        scores = {(name, doc_id): score for _, l in results for score, name, doc_id in l}
+        fused  = reciprocal_rank_fusion([[(name, doc_id) for _, name, doc_id in l] for _, l in results], k)
+        return dense, [(scores[key], *key) for key in fused]
+
+    def documents(self, keys: list) -> list:
+        """Documents for (shard, id) keys, in order."""
+        return [self._shard(name)["vector_store"].docstore.search(doc_id) for name, doc_id in keys]
+
+    # ---- writes ----
+
+    def _value(self, metadata: dict) -> str:
+        return str(metadata.get(self.shard_by) or DEFAULT_SHARD)
+
+    def upsert(self, docs: list, progress=None) -> dict:
+        """
+        Route `docs` to their shards and upsert each with its own IndexManager,
+        so only the shards being changed are loaded. Returns summed stats.
+        """
+        groups = {}
+        for d in docs:
+            groups.setdefault(self._value(d.metadata), []).append(d)
+
+        os.makedirs(self.root, exist_ok=True)
+        totals, offset = Counter(), 0
+        for value, group in groups.items():
+            name    = shard_name(value)
+            manager = IndexManager(os.path.join(self.root, name))
+            report  = (lambda done, _, base=offset: progress(base + done, len(docs))) if progress else None
+            totals.update(manager.upsert(group, progress=report))
+            self._record(name, value, manager)
+            offset += len(group)
+        print(f"[Shards] Upserted {len(docs)} chunks into {len(groups)} shard(s) by '{self.shard_by}'.")
+        return {key: totals[key] for key in ("added", "removed", "unchanged", "deduplicated")}
+
+    def delete_source(self, source: str) -> int:
+        """Remove `source` from every shard holding it; shards left empty are deleted."""
+        self.manifest = read_index_version(self.root) or {"version": 0}
+        removed = 0
+        for name, entry in list(self.shards.items()):
+            if source not in entry["sources"]:
+                continue
+            path    = os.path.join(self.root, name)
+            manager = IndexManager(path)
+            removed += manager.delete_source(source)
+            if manager.vector_store is None or manager.vector_store.index.ntotal == 0:
+                with index_write_lock(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                manager = None
+            self._record(name, entry["value"], manager)
+        return removed
+
+    def _record(self, name: str, value: str, manager):
+        """Update the shard's manifest entry (removed if `manager` is None) and bump the manifest version."""
+        with index_write_lock(self.root):
+            manifest = read_index_version(self.root) or {"version": 0}
+            shards   = dict(manifest.get("shards", {}))
+            if manager is None:
+                shards.pop(name, None)
+            else:
+                shards[name] = {
+                    "value":   value,
+                    "version": manager.version["version"],
+                    "chunks":  manager.vector_store.index.ntotal,
+                    "sources": manager.sources(),
+                }
+            self.manifest = {
+                "version":  manifest.get("version", 0) + 1,
+                "saved_at": time.time(),
+                "shard_by": self.shard_by,
+                "chunks":   sum(entry["chunks"] for entry in shards.values()),
+                "shards":   shards,
+            }
+            fd, tmp = tempfile.mkstemp(prefix=".version-", dir=self.root)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp, os.path.join(self.root, VERSION_FILE))
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Retriever over a ShardedIndex (dense, or hybrid with per-shard BM25 fused
+    by reciprocal rank fusion). The search scope comes from the run config,
+    `configurable={"search_filter": {field: value or [values]}}`, so one
+    chain serves every scope; no filter searches all shards.
+
+    Exposes the index as `vectorstore` (with `embeddings`), so answer-cache
+    fingerprinting and query-embedding reuse work unchanged.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    k: int = TOP_K
+    mode: str = RETRIEVAL_MODE
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    search_filter: Optional[dict] = None   # default scope when the run config has none
+
+    def _scope(self, config) -> Optional[dict]:
+        return ensure_config(config).get("configurable", {}).get("search_filter", self.search_filter)
+
+    def invoke(self, input, config=None, **kwargs):
+        return super().invoke(input, config, search_filter=self._scope(config), **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await super().ainvoke(input, config, search_filter=self._scope(config), **kwargs)
+
+    def _search(self, query: str, search_filter) -> list:
+        index  = self.vectorstore
+        vector = np.asarray([index.embeddings.embed_query(query)], dtype=np.float32)
+        if self.mode != "hybrid":
+            dense, _ = index.search(query, vector, self.k, search_filter)
+            return index.documents([(name, doc_id) for _, name, doc_id in dense])
+        dense, lexical = index.search(query, vector, self.fetch_k, search_filter, lexical=True)
+        fused = reciprocal_rank_fusion(
+            [[(name, doc_id) for _, name, doc_id in dense], [(name, doc_id) for _, name, doc_id in lexical]],
+            self.k, self.rrf_k,
+        )
+        return index.documents(fused)
+
+    def _get_relevant_documents(self, query: str, *, run_manager, search_filter=None) -> list:
+        return self._search(query, search_filter)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager, search_filter=None) -> list:
+        return await asyncio.to_thread(self._search, query, search_filter)
+
+
+_sharded_index = None
+
+def get_sharded_index() -> ShardedIndex:
+    """Process-wide ShardedIndex for writers (the UI); readers get theirs from IndexService snapshots."""
+    global _sharded_index
+    if _sharded_index is None:
+        _sharded_index = ShardedIndex()
+    return _sharded_index
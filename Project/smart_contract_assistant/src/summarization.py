@@ -0,0 +1,144 @@
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from .tokens import count_tokens, truncate_tokens
+from ..config import (
+    LLM_MODEL, MAX_TOKENS, TEMPERATURE,
+    SUMMARY_CONCURRENCY, SUMMARY_GROUP_TOKENS, SUMMARY_REDUCE_TOKENS, SUMMARY_CACHE_SIZE,
+    SUMMARY_MAP_PROMPT, SUMMARY_REDUCE_PROMPT
+)
+
+# A group may end early (past half its budget) on a chunk whose hash hits this
+# divisor, so boundaries follow content rather than position: inserting or
+# changing a chunk only reshapes the groups around it.
+_BOUNDARY_DIVISOR = 4
+
+_CONFIG_FINGERPRINT = hashlib.sha256(
+    f"{LLM_MODEL}\x00{MAX_TOKENS}\x00{TEMPERATURE}\x00{SUMMARY_MAP_PROMPT}\x00{SUMMARY_REDUCE_PROMPT}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def group_chunks(docs: list, budget: int = SUMMARY_GROUP_TOKENS) -> list:
+    """
+    Split chunks, in order, into groups of at most `budget` tokens that never
+    span two source files. Returns a list of lists of chunk texts.
+    """
+    groups, current, tokens, source = [], [], 0, None
+    for doc in docs:
+        text, n = doc.page_content, count_tokens(doc.page_content)
+        doc_source = doc.metadata.get("source")
+        if current and (doc_source != source or tokens + n > budget):
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(text)
+        tokens += n
+        source = doc_source
+        if tokens >= budget // 2 and int(_hash(text)[:8], 16) % _BOUNDARY_DIVISOR == 0:
+            groups.append(current)
+            current, tokens = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _pack(texts: list, budget: int) -> list:
+    """Pack partial summaries into reduce batches of at least two, up to `budget` tokens."""
+    batches, current, tokens = [], [], 0
+    for text in texts:
+        n = count_tokens(text)
+        if len(current) >= 2 and tokens + n > budget:
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(text)
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+class MapReduceSummarizer:
+    """
+    Whole-document summary in three steps:
+
+      - map   : each chunk group is summarized, SUMMARY_CONCURRENCY calls at a time
+      - reduce: partial summaries are merged in batches, recursively, until
+                they fit SUMMARY_REDUCE_TOKENS
+      - final : the existing 5-point summary chain runs on what is left
+
+    Map and reduce outputs are cached by the hash of their input text, so
+    re-summarizing after an incremental upload only calls the LLM for groups
+    that changed (plus the reduce steps above them).
+    """
+
+    def __init__(self, llm, cache_size: int = SUMMARY_CACHE_SIZE):
+        self.map_chain    = ChatPromptTemplate.from_messages([
+            ("system", SUMMARY_MAP_PROMPT), ("human", "{text}"),
+        ]) | llm | StrOutputParser()
+        self.reduce_chain = ChatPromptTemplate.from_messages([
+            ("system", SUMMARY_REDUCE_PROMPT), ("human", "{text}"),
+        ]) | llm | StrOutputParser()
+        self.cache_size   = cache_size
+        self._cache       = OrderedDict()
+        self._lock        = threading.Lock()
+        self.last_run     = {}
+
+    def _run_cached(self, chain, texts: list, concurrency: int, kind: str) -> list:
+        keys    = [f"{_CONFIG_FINGERPRINT}:{kind}:{_hash(t)}" for t in texts]
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+
+        missing = list(dict.fromkeys(k for k in keys if k not in results))
+        if missing:
+            by_key  = dict(zip(keys, texts))
+            outputs = chain.batch([{"text": by_key[k]} for k in missing], config={"max_concurrency": concurrency})
+            with self._lock:
+                for key, output in zip(missing, outputs):
+                    results[key] = self._cache[key] = output
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        self.last_run[f"{kind}_calls"]  = self.last_run.get(f"{kind}_calls", 0) + len(missing)
+        self.last_run[f"{kind}_cached"] = self.last_run.get(f"{kind}_cached", 0) + len(keys) - len(missing)
+        return [results[k] for k in keys]
+
+    def summarize(self, summary_chain, docs: list, concurrency: int = SUMMARY_CONCURRENCY) -> str:
+        start = time.perf_counter()
+        self.last_run = {"chunks": len(docs)}
+
+        groups   = group_chunks(docs)
+        partials = self._run_cached(self.map_chain, ["\n\n".join(g) for g in groups], concurrency, "map")
+        self.last_run["groups"] = len(groups)
+
+        levels = 0
+        while len(partials) > 1 and count_tokens("\n\n".join(partials)) > SUMMARY_REDUCE_TOKENS:
+            batches  = _pack(partials, SUMMARY_REDUCE_TOKENS)
+            partials = self._run_cached(self.reduce_chain, ["\n\n".join(b) for b in batches], concurrency, "reduce")
+            levels  += 1
+
+        summary = summary_chain.invoke({"text": truncate_tokens("\n\n".join(partials), SUMMARY_REDUCE_TOKENS)})
+        self.last_run.update(reduce_levels=levels, seconds=round(time.perf_counter() - start, 3))
+        print(f"[Summary] map-reduce: {self.last_run}")
+        return summary
+
+
+_summarizer = None
+
+def get_summarizer() -> MapReduceSummarizer:
+    global _summarizer
+    if _summarizer is None:
+        from .rag_chain import get_llm
+        _summarizer = MapReduceSummarizer(get_llm())
+    return _summarizer
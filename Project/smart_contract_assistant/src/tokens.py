@@ -0,0 +1,21 @@
+
+import re
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Fast approximate token count (words + punctuation marks). Tracks BPE
+    counts closely enough for budgeting English prose, without loading a tokenizer.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the first `max_tokens` tokens of `text`, cutting at a token boundary."""
+    if max_tokens <= 0:
+        return ""
+    for i, match in enumerate(_TOKEN_RE.finditer(text)):
+        if i == max_tokens:
+            return text[:match.start()].rstrip()
+    return text
@@ -2,82 +2,124 @@
 import gradio as gr
 import pathlib
 import os
+import threading
 
-from .ingestion import ingest_document
-from .vector_store import build_vector_store, load_vector_store
-from .rag_chain import build_rag_chain, build_summary_chain, run_rag, run_summary
-from .evaluation import evaluate
-from ..config import QA_SYSTEM_PROMPT
+from .ingestion import ingest_documents
+from .vector_store import current_index_dir, get_index_manager, load_vector_store, load_lexical_index
+from .shards import ShardedIndex, get_sharded_index
+from .rag_chain import build_rag_chain, build_summary_chain, build_memory_summarizer, stream_rag, run_summary
+from .dedup import DUPLICATES
+from .evaluation import evaluate, format_report, parse_cases
+from .memory import ConversationMemory
+from ..config import FAISS_DIR, QA_SYSTEM_PROMPT, UI_CONCURRENCY, MEMORY_SUMMARIZE, SHARD_BY
 
 DEFAULT_EVAL = """What are the main topics covered?
 Key concepts explained?
 Conclusions mentioned?
 Main definitions?"""
 
-_vector_store   = None
-_rag_chain      = None
-_condense_chain = None
-_retriever      = None
-_summary_chain  = None
-_all_docs       = []
-_chat_history_list = [] 
-_chat_history_str  = "" 
-
-def ui_upload(file):
-    global _vector_store, _rag_chain, _condense_chain, _retriever, _summary_chain, _all_docs, _chat_history_list, _chat_history_str
-    
-    if file is None:
-        return "❌ Please upload a PDF or DOCX file."
+# Shared by all sessions and treated as read-only: a snapshot of the index plus
+# the chains built over it. Uploads publish a new snapshot by swapping the
+# reference, so chat handlers read it without taking a lock.
+_pipeline      = None
+_pipeline_lock = threading.Lock()
+
+# Per-session state (held in gr.State, copied for every browser session).
+NEW_SESSION = {"docs": [], "memory": ConversationMemory()}
+
+def _publish_pipeline() -> dict:
+    """Load a read-only snapshot of the saved index, build its chains and swap it in."""
+    global _pipeline
+    with _pipeline_lock:
+        if SHARD_BY:
+            previous     = _pipeline["vector_store"] if _pipeline else None
+            vector_store = ShardedIndex(reuse=previous)
+            if not vector_store.shards:
+                raise FileNotFoundError("No saved index. Please upload a document first.")
+            lexical = None
+        else:
+            path         = current_index_dir(FAISS_DIR)
+            vector_store = load_vector_store(path)
+            lexical      = load_lexical_index(path, vector_store)
+        rag_chain, condense_chain, retriever = build_rag_chain(vector_store, lexical)
+        _pipeline = {
+            "vector_store":   vector_store,
+            "rag_chain":      rag_chain,
+            "condense_chain": condense_chain,
+            "retriever":      retriever,
+            "summary_chain":  build_summary_chain(),
+            "summarize_memory": build_memory_summarizer() if MEMORY_SUMMARIZE else None,
+        }
+    return _pipeline
+
+def ui_upload(files, session, progress=gr.Progress()):
+    if not files:
+        return "❌ Please upload a PDF or DOCX file.", session
     
     try:
-        _all_docs = ingest_document(file.name)
-        _vector_store = build_vector_store(_all_docs)
-        _rag_chain, _condense_chain, _retriever = build_rag_chain(_vector_store)
-        _summary_chain = build_summary_chain()
-        
-        _chat_history_list = []
-        _chat_history_str = ""
+        docs = ingest_documents([f.name for f in files])
+        manager = get_sharded_index() if SHARD_BY else get_index_manager()
+        stats = manager.upsert(
+            docs,
+            progress=lambda done, total: progress(done / total, desc=f"Embedding {done}/{total} chunks"),
+        )
+        _publish_pipeline()
+
+        session = {"docs": docs, "memory": ConversationMemory()}
         
         return (
             f"✅ **Document processed!**\n\n"
-            f"- File: `{pathlib.Path(file.name).name}`\n"
-            f"- Chunks: `{len(_all_docs)}`\n"
-            f"- LCEL Chain: `retriever | format_docs | prompt | llm | StrOutputParser`\n\n"
+            f"- Files: {', '.join(f'`{pathlib.Path(f.name).name}`' for f in files)}\n"
+            f"- Chunks: `{len(docs)}` (embedded `{stats['added']}`, unchanged `{stats['unchanged']}`, "
+            f"duplicates `{stats.get('deduplicated', 0)}`, removed `{stats['removed']}`)\n"
+            f"- Indexed documents: `{len(manager.sources())}`\n"
+            f"- LCEL Chain: `retriever -> pack_context -> {{source_documents, prompt | llm | StrOutputParser}}`\n\n"
             f"Go to **Chat** to ask questions!"
-        )
+        ), session
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        return f"❌ Error: {str(e)}", session
 
-def ui_load_index():
-    global _vector_store, _rag_chain, _condense_chain, _retriever, _summary_chain, _chat_history_list, _chat_history_str
+def ui_load_index(session):
     try:
-        _vector_store = load_vector_store()
-        _rag_chain, _condense_chain, _retriever = build_rag_chain(_vector_store)
-        _summary_chain = build_summary_chain()
+        _publish_pipeline()
         
         # Reset chat
-        _chat_history_list = []
-        _chat_history_str = ""
+        session = {**session, "memory": ConversationMemory()}
         
-        return "✅ Loaded index. LCEL RAG chain ready!"
+        return "✅ Loaded index. LCEL RAG chain ready!", session
     except Exception as e:
-        return f"❌ {str(e)}"
+        return f"❌ {str(e)}", session
 
-def ui_chat(user_message, history):
-    global _rag_chain, _condense_chain, _retriever, _chat_history_str, _chat_history_list
+def ui_chat(user_message, history, session):
+    """Streams the answer into the Chatbot token by token, then appends the sources."""
+    pipeline = _pipeline
     
     if not user_message.strip():
-        return "", history
+        yield "", history, session
+        return
 
     if history is None:
         history = []
 
 
-    if _rag_chain is None:
-        return "", history + [{"role": "user", "content": user_message}, {"role": "assistant", "content": "⚠️ No document loaded. Please upload first."}]
+    if pipeline is None:
+        yield "", history + [{"role": "user", "content": user_message}, {"role": "assistant", "content": "⚠️ No document loaded. Please upload first."}], session
+        return
+
+    history = history + [{"role": "user", "content": user_message}, {"role": "assistant", "content": ""}]
 
     try:
-        answer, sources, _ = run_rag(_rag_chain, _condense_chain, _retriever, user_message, _chat_history_str)
+        answer, sources = "", []
+        for event in stream_rag(
+            pipeline["rag_chain"], pipeline["condense_chain"], pipeline["retriever"],
+            user_message, session["memory"].render(),
+        ):
+            if event["type"] == "sources":
+                sources = event["content"]
+            elif event["type"] == "token":
+                answer += event["content"]
+                history[-1]["content"] = answer
+                yield "", history, session
         
         seen, src_lines = set(), []
         for doc in sources:
@@ -87,47 +129,52 @@ def ui_chat(user_message, history):
             if key not in seen:
                 seen.add(key)
                 preview = doc.page_content[:80].replace("\n", " ")
-                src_lines.append(f"📄 {src} (chunk {idx}): {preview}...")
+                shared  = sorted({r.get("source", "?") for r in doc.metadata.get(DUPLICATES, ())} - {src})
+                also    = f" — also in {', '.join(shared)}" if shared else ""
+                src_lines.append(f"📄 {src} (chunk {idx}): {preview}...{also}")
 
-        full_response = str(answer)
+        full_response = answer
         if src_lines:
             full_response += "\n\n**Sources**:\n" + "\n".join(src_lines)
 
-        history.append({"role": "user", "content": user_message})
-        history.append({"role": "assistant", "content": full_response})
-        _chat_history_str += f"\nHuman: {user_message}\nAssistant: {full_response}"
-        
-        return "", history
+        history[-1]["content"] = full_response
+        yield "", history, session
+
+        session["memory"].add_turn(user_message, full_response, summarize=pipeline["summarize_memory"])
+        yield "", history, session
 
     except Exception as e:
-        return "", history + [{"role": "user", "content": user_message}, {"role": "assistant", "content": f"❌ Error: {str(e)}"}]
+        history[-1]["content"] = f"❌ Error: {str(e)}"
+        yield "", history, session
 
-def ui_clear():
-    global _chat_history_list, _chat_history_str
-    _chat_history_list = []
-    _chat_history_str = ""
-    return []
+def ui_clear(session):
+    return [], {**session, "memory": ConversationMemory()}
 
-def ui_summarize():
-    if not _all_docs or _summary_chain is None:
+def ui_summarize(session):
+    pipeline = _pipeline
+    if not session["docs"] or pipeline is None:
         return "⚠️ No document loaded."
     try:
-        summary = run_summary(_summary_chain, _all_docs)
+        summary = run_summary(pipeline["summary_chain"], session["docs"])
         return f"## Summary\n\n{summary}"
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
-def ui_evaluate(questions_text):
-    if _rag_chain is None:
-        return "⚠️ No document loaded."
-    questions = [q.strip() for q in questions_text.strip().split("\n") if q.strip()]
-    if not questions:
-        return "⚠️ Enter at least one question."
+def ui_evaluate(questions_text, retrieval_only=False):
+    pipeline = _pipeline
+    if pipeline is None:
+        return "⚠️ No document loaded.", None
+    cases = parse_cases(questions_text.strip().split("\n"))
+    if not cases:
+        return "⚠️ Enter at least one question.", None
     try:
-        from .rag_chain import run_rag 
-        return evaluate(questions, _rag_chain, _condense_chain, _retriever)
+        report = evaluate(
+            cases, pipeline["rag_chain"], pipeline["condense_chain"], pipeline["retriever"],
+            retrieval_only=retrieval_only,
+        )
+        return format_report(report), report
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        return f"❌ Error: {str(e)}", None
 
 
 def build_app():
@@ -136,17 +183,18 @@ def build_app():
 # 📜 Smart Contract Assistant
 **Modular Architecture** | **LCEL Pipeline** | **RAG & Summarization**
 """)
+        session = gr.State(NEW_SESSION)
         
         with gr.Tab("📁 Upload & Process"):
-            gr.Markdown("### Upload your PDF or DOCX document")
-            file_input    = gr.File(label="Upload File", file_types=[".pdf", ".docx"])
+            gr.Markdown("### Upload one or more PDF or DOCX documents")
+            file_input    = gr.File(label="Upload Files", file_types=[".pdf", ".docx"], file_count="multiple")
             with gr.Row():
                 upload_btn    = gr.Button("⚙️ Process Document", variant="primary")
                 load_btn      = gr.Button("📂 Load Saved Index",  variant="secondary")
             upload_status = gr.Markdown("*No document loaded yet.*")
             
-            upload_btn.click(ui_upload,   inputs=file_input, outputs=upload_status)
-            load_btn.click(ui_load_index, inputs=None,       outputs=upload_status)
+            upload_btn.click(ui_upload,   inputs=[file_input, session], outputs=[upload_status, session])
+            load_btn.click(ui_load_index, inputs=session,                outputs=[upload_status, session])
 
 
 
@@ -158,21 +206,25 @@ def build_app():
                 send_btn  = gr.Button("Send", variant="primary")
                 clear_btn = gr.Button("🗑️ Clear Chat", variant="secondary")
             
-            send_btn.click(ui_chat,  inputs=[msg_input, chatbot], outputs=[msg_input, chatbot])
-            msg_input.submit(ui_chat, inputs=[msg_input, chatbot], outputs=[msg_input, chatbot])
-            clear_btn.click(ui_clear, outputs=chatbot)
+            send_btn.click(ui_chat,  inputs=[msg_input, chatbot, session], outputs=[msg_input, chatbot, session])
+            msg_input.submit(ui_chat, inputs=[msg_input, chatbot, session], outputs=[msg_input, chatbot, session])
+            clear_btn.click(ui_clear, inputs=session, outputs=[chatbot, session])
 
         with gr.Tab("📋 Summarize"):
             gr.Markdown("### Generate Executive Summary")
             sum_btn = gr.Button("✨ Generate 5-Point Summary", variant="primary")
             sum_out = gr.Markdown("*Click button to generate.*")
-            sum_btn.click(ui_summarize, outputs=sum_out)
+            sum_btn.click(ui_summarize, inputs=session, outputs=sum_out)
 
         with gr.Tab("🧪 Evaluate"):
             gr.Markdown("### Batch Evaluation Pipeline")
-            eval_in  = gr.Textbox(value=DEFAULT_EVAL, label="Test Questions", lines=6)
-            eval_btn = gr.Button("▶️ Run Evaluation", variant="primary")
-            eval_out = gr.Textbox(label="Evaluation Report", lines=20, interactive=False)
-            eval_btn.click(ui_evaluate, inputs=eval_in, outputs=eval_out)
-
+            eval_in   = gr.Textbox(value=DEFAULT_EVAL, label="Test Questions", lines=6)
+            gr.Markdown("Optionally label gold chunks for recall@k / MRR: `question || file.pdf#12, file.pdf#13`")
+            eval_ret  = gr.Checkbox(label="Retrieval only (skip the LLM)", value=False)
+            eval_btn  = gr.Button("▶️ Run Evaluation", variant="primary")
+            eval_out  = gr.Textbox(label="Evaluation Report", lines=20, interactive=False)
+            eval_json = gr.JSON(label="JSON Report")
+            eval_btn.click(ui_evaluate, inputs=[eval_in, eval_ret], outputs=[eval_out, eval_json])
+
+    demo.queue(default_concurrency_limit=UI_CONCURRENCY)
     return demo
@@ -1,33 +1,580 @@
 
 import os
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from ..config import EMBEDDING_MODEL, FAISS_DIR
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from . import metrics
+from .ann_index import create_faiss_index, train_size, index_type_of, supports_removal, apply_search_params
+from .dedup import DUPLICATES, MinHashIndex, minhash, same_text
+from .docstore import DOCSTORE_FILE, SQLiteDocstore, SQLiteIndexMap, read_docstore, write_docstore
+from .embedding_cache import CachedEmbeddings
+from .lexical_index import BM25Index
+from ..config import (
+    EMBEDDING_MODEL, EMBEDDING_BACKEND, FAISS_DIR, DEDUP_THRESHOLD, EMBED_BATCH_SIZE, EMBED_ENCODE_THREADS, EMBED_TORCH_THREADS,
+    INDEX_TYPE, INDEX_LOAD_MODE
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+INDEX_FILE   = "index.faiss"
+VERSION_FILE = "version.json"
+CURRENT_FILE = "CURRENT"        # names the live version subdirectory, e.g. "v000042"
 
 _embeddings = None
+_change_listeners = []
 
-def get_embeddings():
-    global _embeddings
-    if _embeddings is None:
-        print(f"[Embeddings] Loading {EMBEDDING_MODEL} ...")
-        _embeddings = HuggingFaceEmbeddings(
+def load_embedding_model(backend: str = EMBEDDING_BACKEND):
+    """
+    The raw CPU encoder for EMBEDDING_MODEL: "torch" (sentence-transformers,
+    fp32), or "onnx" / "onnx-int8" (an onnxruntime export, see onnx_embeddings).
+    """
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        model = HuggingFaceEmbeddings(
             model_name=EMBEDDING_MODEL,
             model_kwargs={"device": "cpu"},
             encode_kwargs={"normalize_embeddings": True},
         )
-        print("[Embeddings] Loaded.")
+        set_torch_threads(EMBED_TORCH_THREADS)
+        return model
+    if backend in ("onnx", "onnx-int8"):
+        from .onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}' (expected torch, onnx or onnx-int8).")
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    The encoder from load_embedding_model, loaded on the first embed call:
+    importing this module, building a vector store and loading a saved index
+    do not import torch/onnxruntime or read the model weights.
+    """
+
+    def __init__(self, backend: str = EMBEDDING_BACKEND):
+        self.backend = backend
+        self._model  = None
+        self._lock   = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> Embeddings:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    print(f"[Embeddings] Loading {EMBEDDING_MODEL} ({self.backend}) ...")
+                    start = time.perf_counter()
+                    self._model = load_embedding_model(self.backend)
+                    metrics.observe("embedding_model", time.perf_counter() - start, family="startup_seconds")
+                    print(f"[Embeddings] Loaded in {time.perf_counter() - start:.2f}s.")
+        return self._model
+
+    def embed_documents(self, texts: list) -> list:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.model.embed_query(text)
+
+
+def get_embeddings():
+    """Process-wide embeddings (model loaded on first use), wrapped in the persistent content-addressed cache."""
+    global _embeddings
+    if _embeddings is None:
+        # Cached vectors are keyed per backend; torch keeps the original key.
+        cache_name  = EMBEDDING_MODEL if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL}:{EMBEDDING_BACKEND}"
+        _embeddings = CachedEmbeddings(LazyEmbeddings(), model_name=cache_name)
+        metrics.register_collector(_collect_embeddings)
     return _embeddings
 
+def warm_up_embeddings(text: str = "warm-up"):
+    """Load the encoder and run one forward pass, bypassing the embedding cache."""
+    get_embeddings().underlying.embed_query(text)
+
+def _collect_embeddings() -> list:
+    stats = _embeddings.stats()
+    return [
+        *metrics.cache_metrics("embedding_doc", stats["doc_hits"], stats["doc_misses"]),
+        *metrics.cache_metrics("embedding_query", stats["query_hits"], stats["query_misses"]),
+    ]
+
+def set_torch_threads(n: int):
+    """Set intra-op threads used by the CPU encoder (process-wide). 0 keeps torch's default."""
+    if n > 0:
+        import torch
+        torch.set_num_threads(n)
+
+def _embed_timed(embeddings, batch: list) -> list:
+    with metrics.span("embed"):
+        return embeddings.embed_documents(batch)
+
+def embed_batches(texts, embeddings=None, batch_size: int = EMBED_BATCH_SIZE,
+                  encode_threads: int = EMBED_ENCODE_THREADS):
+    """
+    Yields (batch_texts, vectors) in input order as batches finish encoding.
+
+    Up to `encode_threads` batches are encoded concurrently, so tokenizing one
+    batch overlaps the forward pass of another. At most encode_threads + 1
+    batches are in flight, which bounds memory and applies backpressure to
+    a lazy `texts` iterator.
+    """
+    embeddings = embeddings or get_embeddings()
+    with ThreadPoolExecutor(max_workers=encode_threads) as executor:
+        in_flight, batch = deque(), []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                in_flight.append((batch, executor.submit(_embed_timed, embeddings, batch)))
+                batch = []
+                if len(in_flight) > encode_threads:
+                    done, future = in_flight.popleft()
+                    yield done, future.result()
+        if batch:
+            in_flight.append((batch, executor.submit(_embed_timed, embeddings, batch)))
+        while in_flight:
+            done, future = in_flight.popleft()
+            yield done, future.result()
+
+def on_index_change(listener):
+    """Register `listener()` to be called after every change to the saved index."""
+    _change_listeners.append(listener)
+
+def chunk_ids(docs: list) -> list:
+    """
+    Content-addressed docstore ids: sha256(source + chunk text).
+    Identical chunks repeated inside one source get an occurrence suffix.
+    """
+    seen, ids = Counter(), []
+    for d in docs:
+        digest = hashlib.sha256(
+            f"{d.metadata.get('source', '')}\x00{d.page_content}".encode("utf-8")
+        ).hexdigest()
+        ids.append(f"{digest}-{seen[digest]}")
+        seen[digest] += 1
+    return ids
+
+
+def _new_store(index) -> FAISS:
+    return FAISS(get_embeddings(), index, InMemoryDocstore(), {})
+
+
+class IndexManager:
+    """
+    Owns the persistent FAISS index and updates it incrementally:
+
+      - new documents are appended with `add_embeddings`,
+      - re-uploading a source replaces only the chunks whose content changed,
+      - every change is saved as a new version subdirectory, made live by
+        atomically replacing the `CURRENT` pointer.
+
+    The index type (flat / ivf / hnsw / ivfpq) comes from INDEX_TYPE when the
+    index is first created; `rebuild()` migrates an existing index. A BM25
+    lexical index over the same chunk ids is kept in step and saved alongside.
+
+    With DEDUP_THRESHOLD > 0, a MinHash index finds new chunks that
+    duplicate a stored one (boilerplate repeated within a document or across
+    the corpus): at 1.0, only chunks with the same text; below, also
+    near-duplicates, which are then answered with the stored chunk's wording.
+    Those are not embedded; their metadata is appended to the stored chunk's
+    `duplicates`, so it answers for every source. A stored chunk whose own
+    source goes away is handed over to its first duplicate.
+
+    Every save bumps `version.json`. Writers in other processes (API workers,
+    the UI) are serialized with a file lock, and a manager whose copy is older
+    than the saved version reloads it before changing anything.
+    """
+
+    def __init__(self, index_dir: str = FAISS_DIR):
+        self.index_dir    = index_dir
+        self.vector_store = None
+        self.lexical      = BM25Index()
+        self.near_dups    = None   # MinHashIndex, loaded on the first write when dedup is on
+        self.version      = None
+        self._lock        = threading.Lock()
+        self._load()
+
+    def _load(self):
+        path           = current_index_dir(self.index_dir)
+        self.version   = read_index_version(path)
+        self.near_dups = None
+        if self.version is None:
+            self.vector_store, self.lexical = None, BM25Index()
+            return
+        self.vector_store = load_vector_store(path, mode="memory")
+        self.lexical      = load_lexical_index(path, self.vector_store)
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access to the saved index, with this copy brought up to date first."""
+        with self._lock, index_write_lock(self.index_dir):
+            if read_index_version(self.index_dir) != self.version:
+                self._load()
+            if self.near_dups is None and DEDUP_THRESHOLD > 0:
+                self.near_dups = load_near_dup_index(self.index_dir, self.vector_store)
+                self.near_dups.threshold = DEDUP_THRESHOLD
+            yield
+
+    def _metadatas(self):
+        if self.vector_store is None:
+            return
+        docstore = self.vector_store.docstore
+        for doc_id in self.vector_store.index_to_docstore_id.values():
+            yield doc_id, docstore.search(doc_id).metadata
+
+    def source_ids(self, source: str) -> list:
+        """Ids of the chunks stored for `source` (not those it only shares as a duplicate)."""
+        return [doc_id for doc_id, metadata in self._metadatas() if metadata.get("source") == source]
+
+    def sources(self) -> list:
+        sources = set()
+        for _, metadata in self._metadatas():
+            sources.add(metadata.get("source", "?"))
+            sources.update(ref.get("source", "?") for ref in metadata.get(DUPLICATES, ()))
+        return sorted(sources)
+
+    def upsert(self, docs: list, progress=None) -> dict:
+        """
+        Add `docs` to the index, replacing any previous version of their sources.
+        Only chunks whose content hash is not already indexed get embedded, and
+        (with dedup on) only those that duplicate no stored chunk.
+
+        `progress(done, total)` is called after each embedded batch.
+        """
+        ids     = chunk_ids(docs)
+        sources = {d.metadata.get("source") for d in docs}
+        with self._writing():
+            existing = set()
+            for source in sources:
+                existing.update(self.source_ids(source))
+            self._drop_references(sources)   # re-derived from `docs` below
+
+            stale = existing - set(ids)
+            if stale:
+                self._retire(list(stale))
+
+            # Unchanged chunks keep their vectors; only refresh metadata (e.g. chunk_index).
+            for i, d in zip(ids, docs):
+                if i in existing:
+                    stored = self.vector_store.docstore.search(i)
+                    refs   = stored.metadata.get(DUPLICATES)
+                    stored.metadata = {**d.metadata, DUPLICATES: refs} if refs else dict(d.metadata)
+
+            fresh, merged = self._deduplicate([(i, d) for i, d in zip(ids, docs) if i not in existing])
+            if fresh:
+                self._add_in_batches(fresh, progress)
+
+            self._save()
+
+        stats = {"added": len(fresh), "removed": len(stale), "unchanged": len(docs) - len(fresh) - merged,
+                 "deduplicated": merged}
+        print(f"[VectorStore] Upsert: {stats['added']} embedded, {stats['unchanged']} unchanged, "
+              f"{stats['deduplicated']} duplicates stored as references, {stats['removed']} removed.")
+        return stats
+
+    def _deduplicate(self, new: list) -> tuple:
+        """
+        Split new (id, doc) pairs into chunks to embed and (near-)duplicates of a
+        stored (or earlier new) chunk, which become references on it.
+        Returns (chunks to embed, number merged).
+        """
+        if self.near_dups is None:
+            return new, 0
+        fresh, pending, merged = [], {}, 0
+        with metrics.span("dedup"):
+            for i, d in new:
+                signature = minhash(d.page_content)
+                target    = None
+                for doc_id, _ in self.near_dups.query(signature):
+                    candidate = pending.get(doc_id) or self.vector_store.docstore.search(doc_id)
+                    # A MinHash estimate of 1.0 can hide a changed figure; exact mode compares the text.
+                    if DEDUP_THRESHOLD < 1 or same_text(candidate.page_content, d.page_content):
+                        target = candidate
+                        break
+                if target is None:
+                    doc = pending[i] = Document(page_content=d.page_content, metadata=dict(d.metadata))
+                    fresh.append((i, doc))
+                    self.near_dups.add(i, signature)
+                    continue
+                target.metadata.setdefault(DUPLICATES, []).append(dict(d.metadata))
+                merged += 1
+        return fresh, merged
+
+    def _drop_references(self, sources: set) -> int:
+        """Remove `sources` from every stored chunk's duplicates. Returns how many references went."""
+        dropped = 0
+        for _, metadata in self._metadatas():
+            refs = metadata.get(DUPLICATES)
+            if not refs:
+                continue
+            kept = [ref for ref in refs if ref.get("source") not in sources]
+            if len(kept) < len(refs):
+                dropped += len(refs) - len(kept)
+                if kept:
+                    metadata[DUPLICATES] = kept
+                else:
+                    del metadata[DUPLICATES]
+        return dropped
+
+    def _retire(self, ids: list):
+        """Delete chunks whose source is gone; one still shared by other sources passes to its first duplicate."""
+        gone = []
+        for doc_id in ids:
+            doc  = self.vector_store.docstore.search(doc_id)
+            refs = doc.metadata.get(DUPLICATES)
+            if refs:
+                doc.metadata = {**refs[0], DUPLICATES: refs[1:]} if len(refs) > 1 else dict(refs[0])
+            else:
+                gone.append(doc_id)
+        if gone:
+            self._delete(gone)
+
+    def _add_in_batches(self, fresh: list, progress=None, index_type: str = INDEX_TYPE):
+        """
+        Embed in batches and add each batch to FAISS as soon as it is encoded.
+        If the index does not exist yet and needs training (IVF), batches are
+        held back until enough vectors are available to train it.
+        """
+        start, done, pending = time.perf_counter(), 0, []
+        for texts, vectors in embed_batches(d.page_content for _, d in fresh):
+            batch = fresh[done:done + len(texts)]
+            pending.append((texts, vectors, [d.metadata for _, d in batch], [i for i, _ in batch]))
+            done += len(texts)
+            if self.vector_store is not None or done >= train_size(index_type):
+                self._add_embedded(pending, index_type)
+                pending = []
+            if progress:
+                progress(done, len(fresh))
+        if pending:
+            self._add_embedded(pending, index_type)
+
+        elapsed = time.perf_counter() - start
+        print(f"[VectorStore] Embedded {done} chunks in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.1f} chunks/s).")
+
+    def _add_embedded(self, batches: list, index_type: str):
+        with metrics.span("index_add"):
+            if self.vector_store is None:
+                train = [v for _, vectors, _, _ in batches for v in vectors]
+                self.vector_store = _new_store(create_faiss_index(len(train[0]), index_type, train))
+            for texts, vectors, metadatas, ids in batches:
+                self.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+                self.lexical.add(ids, texts)
+
+    def _delete(self, ids: list):
+        self.lexical.remove(ids)
+        if self.near_dups is not None:
+            self.near_dups.remove(ids)
+        if supports_removal(self.vector_store.index):
+            self.vector_store.delete(ids)
+        else:
+            self._rebuild(index_type_of(self.vector_store.index), exclude=set(ids))
+
+    def rebuild(self, index_type: str = INDEX_TYPE):
+        """Re-create the whole index, e.g. to switch index type or retrain IVF centroids."""
+        with self._writing():
+            self._rebuild(index_type)
+            self._save()
+
+    def _rebuild(self, index_type: str, exclude=frozenset()):
+        """Vectors are re-read through the embedding cache, so nothing is re-encoded."""
+        old  = self.vector_store
+        keep = [
+            (doc_id, old.docstore.search(doc_id))
+            for doc_id in old.index_to_docstore_id.values() if doc_id not in exclude
+        ]
+        self.vector_store = None
+        if keep:
+            self._add_in_batches(keep, index_type=index_type)
+        else:
+            empty_type = index_type if train_size(index_type) == 1 else "flat"
+            self.vector_store = _new_store(create_faiss_index(old.index.d, empty_type))
+        print(f"[VectorStore] Rebuilt '{index_type}' index with {len(keep)} chunks.")
+
+    def delete_source(self, source: str) -> int:
+        with self._writing():
+            ids     = self.source_ids(source)
+            dropped = self._drop_references({source})
+            if ids:
+                self._retire(ids)
+            if ids or dropped:
+                self._save()
+        print(f"[VectorStore] Deleted {len(ids)} chunks of '{source}' and {dropped} duplicate references.")
+        return len(ids) + dropped
+
+    def reload(self):
+        with self._lock:
+            self._load()
+        return self.vector_store
+
+    def _save(self):
+        """
+        Write the new version to its own subdirectory, then point `CURRENT` at
+        it with one atomic rename. Readers always find a complete version.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        previous_dir = current_index_dir(self.index_dir)
+        previous     = read_index_version(self.index_dir) or {}
+        self.version = {
+            "version":    previous.get("version", 0) + 1,
+            "saved_at":   time.time(),
+            "chunks":     self.vector_store.index.ntotal,
+            "index_type": index_type_of(self.vector_store.index),
+        }
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.index_dir)
+        with metrics.span("index_save"):
+            save_vector_store(self.vector_store, tmp_dir, self.lexical, self.near_dups)
+        with open(os.path.join(tmp_dir, VERSION_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.version, f)
+
+        name = f"v{self.version['version']:06d}"
+        shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)   # left by a writer that died before switching
+        os.rename(tmp_dir, os.path.join(self.index_dir, name))
+        fd, tmp = tempfile.mkstemp(prefix=".current-", dir=self.index_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp, os.path.join(self.index_dir, CURRENT_FILE))
+
+        # Only now drop older versions. The previous one stays for readers that
+        # resolved CURRENT just before the switch and are still opening its files.
+        keep = {CURRENT_FILE, name}
+        if previous_dir != self.index_dir:
+            keep.add(os.path.basename(previous_dir))
+        for entry in os.scandir(self.index_dir):
+            if entry.name in keep:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)   # files of a flat, pre-versioning index
+        print(f"[VectorStore] Saved version {self.version['version']} to '{self.index_dir}/{name}'.")
+
+        for listener in _change_listeners:
+            listener()
+
+
+_index_manager = None
+
+def get_index_manager() -> IndexManager:
+    global _index_manager
+    if _index_manager is None:
+        _index_manager = IndexManager()
+    return _index_manager
+
 def build_vector_store(docs: list) -> FAISS:
-    print(f"[VectorStore] Embedding {len(docs)} chunks...")
-    vs = FAISS.from_documents(docs, get_embeddings())
-    vs.save_local(FAISS_DIR)
-    print(f"[VectorStore] Saved to '{FAISS_DIR}'.")
-    return vs
+    print(f"[VectorStore] Indexing {len(docs)} chunks...")
+    manager = get_index_manager()
+    manager.upsert(docs)
+    return manager.vector_store
 
-def load_vector_store() -> FAISS:
-    if not os.path.exists(FAISS_DIR):
+def save_vector_store(vs: FAISS, index_dir: str, lexical: BM25Index = None, near_dups: MinHashIndex = None):
+    """FAISS vectors in index.faiss, chunk text + metadata in a SQLite docstore (no pickle), BM25 postings, MinHash signatures."""
+    os.makedirs(index_dir, exist_ok=True)
+    faiss.write_index(vs.index, os.path.join(index_dir, INDEX_FILE))
+    write_docstore(os.path.join(index_dir, DOCSTORE_FILE), vs.docstore, vs.index_to_docstore_id)
+    if lexical is not None:
+        lexical.save(index_dir)
+    if near_dups is not None:
+        near_dups.save(index_dir)
+
+def current_index_dir(index_dir: str = FAISS_DIR) -> str:
+    """
+    The subdirectory holding the version `index_dir/CURRENT` names, or
+    `index_dir` itself for a flat index saved before versioned subdirectories.
+    Readers resolve it once and load every file from it.
+    """
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return os.path.join(index_dir, f.read().strip())
+    except (FileNotFoundError, NotADirectoryError):
+        return index_dir
+
+def read_index_version(index_dir: str = FAISS_DIR):
+    """
+    The saved index's `version.json` ({version, saved_at, chunks, index_type}),
+    {"version": 0} for an index saved before versioning, None if there is no index.
+    """
+    index_dir = current_index_dir(index_dir)
+    try:
+        with open(os.path.join(index_dir, VERSION_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 0} if os.path.exists(os.path.join(index_dir, INDEX_FILE)) else None
+
+@contextmanager
+def index_write_lock(index_dir: str):
+    """Serializes index writers across processes via an advisory lock on `<index_dir>.lock`."""
+    with open(os.path.abspath(index_dir) + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def load_lexical_index(index_dir: str, vs: FAISS) -> BM25Index:
+    """The BM25 index saved with `index_dir`, or one built from `vs` for indexes saved before it existed."""
+    index_dir = current_index_dir(index_dir)
+    lexical   = BM25Index.load(index_dir)
+    if lexical is None:
+        print(f"[VectorStore] No lexical index in '{index_dir}'; building it from the docstore.")
+        lexical = BM25Index.from_vector_store(vs)
+    return lexical
+
+def load_near_dup_index(index_dir: str, vs: FAISS) -> MinHashIndex:
+    """The MinHash index saved with `index_dir`, or one built from `vs` (empty if there is no index yet)."""
+    index_dir = current_index_dir(index_dir)
+    near_dups = MinHashIndex.load(index_dir)
+    if near_dups is None:
+        near_dups = MinHashIndex()
+        if vs is not None:
+            print(f"[VectorStore] No MinHash index in '{index_dir}'; building it from the docstore.")
+            near_dups = MinHashIndex.from_vector_store(vs)
+    return near_dups
+
+def _read_index_mmap(path: str):
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+def load_vector_store(index_dir: str = FAISS_DIR, mode: str = INDEX_LOAD_MODE) -> FAISS:
+    """
+    mode="memory": read vectors and the whole docstore into RAM (needed for writes).
+    mode="mmap"  : memory-map the vectors read-only and read chunk text from
+                   SQLite lazily per hit. Pages are shared between processes.
+    """
+    index_dir = current_index_dir(index_dir)
+    if read_index_version(index_dir) is None:
         raise FileNotFoundError("No saved index. Please upload a document first.")
-    vs = FAISS.load_local(FAISS_DIR, get_embeddings(), allow_dangerous_deserialization=True)
-    print(f"[VectorStore] Loaded from '{FAISS_DIR}'.")
+
+    docstore_path = os.path.join(index_dir, DOCSTORE_FILE)
+    index_path    = os.path.join(index_dir, INDEX_FILE)
+    if not os.path.exists(docstore_path):
+        vs = FAISS.load_local(index_dir, get_embeddings(), allow_dangerous_deserialization=True)
+        mode = "legacy pickle"
+    elif mode == "mmap":
+        docstore = SQLiteDocstore(docstore_path)
+        vs = FAISS(get_embeddings(), _read_index_mmap(index_path), docstore, SQLiteIndexMap(docstore))
+    else:
+        docs, index_map = read_docstore(docstore_path)
+        vs = FAISS(get_embeddings(), faiss.read_index(index_path), InMemoryDocstore(docs), index_map)
+
+    apply_search_params(vs.index)
+    print(f"[VectorStore] Loaded from '{index_dir}' ({mode}).")
     return vs
@@ -0,0 +1,63 @@
+"""Heading detection and running-line removal in structure-aware chunking. Run from Project/: python -m pytest tests"""
+import pytest
+
+from smart_contract_assistant.src.ingestion import _RUNNING_SAMPLE, _without_running_lines, is_heading
+
+
+@pytest.mark.parametrize("line", [
+    "ARTICLE IV",
+    "ARTICLE 4",
+    "Annex B",
+    "Schedule 3 - Pricing",
+    "Section 12. Notices",
+    "Clause 12.1 Notices",
+    "1. Definitions and Interpretation",
+    "4. Payment Terms",
+    "7.3 Limitation of Liability",
+    "12 NOTICES",
+    "TERMINATION",
+    "FORCE MAJEURE",
+])
+def test_headings(line):
+    assert is_heading(line)
+
+
+@pytest.mark.parametrize("line", [
+    "30 Business Days after receipt of the invoice, the Buyer shall pay the",
+    "12 Months from the Effective Date unless terminated earlier by either",
+    "USD 10,000",
+    "Section 4.2 of this Agreement shall apply to the",
+    "1. The Supplier shall deliver the goods to",
+    "10.5 per cent of the fees",
+    "4.2",
+    "The Supplier shall pay.",
+])
+def test_wrapped_body_lines_are_not_headings(line):
+    assert not is_heading(line)
+
+
+def _pdf(pages):
+    return [("a.pdf", n, "text", [(text, False)]) for n, text in enumerate(pages, 1)]
+
+def test_running_headers_and_page_numbers_are_dropped():
+    pages = _pdf(f"ACME MSA - CONFIDENTIAL\nARTICLE {n + 3}\nClause text {n}.\nPage {n} of 4" for n in range(1, 5))
+    texts = [unit[3][0][0] for unit in _without_running_lines(iter(pages))]
+    assert texts == [f"ARTICLE {n + 3}\nClause text {n}." for n in range(1, 5)]
+
+def test_lines_on_few_pages_are_kept():
+    pages = _pdf(["TERMINATION\nEither party may terminate.", "PAYMENT\nInvoices are due.",
+                  "TERMINATION\nNotice is required.", "GOVERNING LAW\nEngland and Wales."])
+    assert [unit[3][0][0] for unit in _without_running_lines(iter(pages))] == [unit[3][0][0] for unit in pages]
+
+def test_running_lines_are_removed_while_streaming():
+    read = []
+
+    def pages():
+        for n in range(1, 101):
+            read.append(n)
+            yield "a.pdf", n, "text", [(f"ACME MSA\nClause text {n}.\nPage {n}", False)]
+
+    units = _without_running_lines(pages())
+    assert next(units)[3][0][0] == "Clause text 1."
+    assert len(read) <= _RUNNING_SAMPLE + 1   # only the sample was read ahead
+    assert [unit[3][0][0] for unit in units][-1] == "Clause text 100."
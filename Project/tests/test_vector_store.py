@@ -0,0 +1,118 @@
+"""Incremental upserts, deletes and dedup hand-over in IndexManager, with fake embeddings. Run from Project/: python -m pytest tests"""
+import os
+
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+import smart_contract_assistant.src.vector_store as vector_store
+from smart_contract_assistant.src.dedup import DUPLICATES
+from smart_contract_assistant.src.vector_store import CURRENT_FILE, IndexManager, chunk_ids, read_index_version
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic vectors; remembers every text sent for embedding."""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    fake = RecordingEmbeddings(size=16, embedded=[])
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: fake)
+    monkeypatch.setattr(vector_store, "DEDUP_THRESHOLD", 1.0)
+    return fake
+
+
+@pytest.fixture
+def manager(tmp_path, embeddings):
+    return IndexManager(str(tmp_path / "faiss_index"))
+
+
+def _doc(source, text, chunk_index=0):
+    return Document(page_content=text, metadata={"source": source, "chunk_index": chunk_index})
+
+
+def _contract(source, *clauses):
+    return [_doc(source, text, n) for n, text in enumerate(clauses)]
+
+
+def test_reupload_embeds_only_changed_chunks(manager, embeddings):
+    manager.upsert(_contract("a.pdf", "Payment is due in 30 days.", "Notice is given in writing.", "Fees are in USD."))
+    embeddings.embedded.clear()
+
+    edited = _contract("a.pdf", "Payment is due in 45 days.", "Notice is given in writing.", "Fees are in USD.")
+    stats  = manager.upsert(edited)
+
+    assert embeddings.embedded == ["Payment is due in 45 days."]
+    assert stats == {"added": 1, "removed": 1, "unchanged": 2, "deduplicated": 0}
+    assert sorted(manager.source_ids("a.pdf")) == sorted(chunk_ids(edited))
+
+
+def test_unchanged_reupload_embeds_nothing(manager, embeddings):
+    docs = _contract("a.pdf", "Payment is due in 30 days.", "Notice is given in writing.")
+    manager.upsert(docs)
+    embeddings.embedded.clear()
+
+    stats = manager.upsert(docs)
+
+    assert embeddings.embedded == []
+    assert stats["added"] == 0 and stats["removed"] == 0
+
+
+def test_delete_source(manager):
+    manager.upsert(_contract("a.pdf", "Payment is due in 30 days.") + _contract("b.pdf", "Fees are in USD."))
+
+    assert manager.delete_source("a.pdf") == 1
+
+    assert manager.sources() == ["b.pdf"]
+    assert manager.source_ids("a.pdf") == []
+    assert manager.vector_store.index.ntotal == 1
+    assert [doc_id for doc_id, _ in manager.lexical.search("payment", 5)] == []
+
+
+def test_duplicate_is_stored_once_and_handed_over(manager, embeddings):
+    shared = "This Agreement is governed by the laws of England and Wales."
+    manager.upsert(_contract("a.pdf", shared, "Payment is due in 30 days."))
+    embeddings.embedded.clear()
+
+    stats = manager.upsert(_contract("b.pdf", shared, "Fees are in USD."))
+
+    assert embeddings.embedded == ["Fees are in USD."]
+    assert stats["deduplicated"] == 1
+    assert manager.sources() == ["a.pdf", "b.pdf"]
+
+    manager.delete_source("a.pdf")
+
+    docstore = manager.vector_store.docstore
+    kept = [doc for doc in map(docstore.search, manager.vector_store.index_to_docstore_id.values())
+            if doc.page_content == shared]
+    assert len(kept) == 1
+    assert kept[0].metadata["source"] == "b.pdf" and DUPLICATES not in kept[0].metadata
+    assert manager.sources() == ["b.pdf"]
+    assert manager.vector_store.index.ntotal == 2
+
+
+def test_changed_figure_is_not_a_duplicate(manager, embeddings):
+    manager.upsert(_contract("a.pdf", "The Supplier's liability is limited to 2 times the annual fees."))
+    embeddings.embedded.clear()
+
+    manager.upsert(_contract("b.pdf", "The Supplier's liability is limited to 3 times the annual fees."))
+
+    assert embeddings.embedded == ["The Supplier's liability is limited to 3 times the annual fees."]
+
+
+def test_saves_switch_versions_through_current(manager, tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    for n in range(3):
+        manager.upsert(_contract(f"{n}.pdf", f"Clause number {n}."))
+
+    with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+        assert f.read() == "v000003"
+    assert read_index_version(index_dir)["version"] == 3
+    assert sorted(os.listdir(index_dir)) == [CURRENT_FILE, "v000002", "v000003"]
+    assert IndexManager(index_dir).sources() == ["0.pdf", "1.pdf", "2.pdf"]